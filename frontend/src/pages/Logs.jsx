@@ -24,6 +24,8 @@ import { AuthContext } from '../App';
 import { useNavigate } from 'react-router-dom';
 import apiClient from '../lib/apiClient'; // Import the new API client
 
+const API_URL = process.env.REACT_APP_API_BASE_URL || 'http://localhost:8000';
+
 const Logs = () => {
   const { user, logout } = useContext(AuthContext);
   const navigate = useNavigate();
@@ -373,7 +375,7 @@ const Logs = () => {
                               <div className="aspect-video bg-black rounded-lg flex items-center justify-center">
                                 {selectedImageLog?.image_snapshot_ref ? (
                                   <img 
-                                    src={selectedImageLog.image_snapshot_ref} 
+                                    src={`${API_URL}/evidence/${selectedImageLog.id}?token=${localStorage.getItem('token')}`} 
                                     alt="Detection Snapshot" 
                                     className="max-h-full max-w-full object-contain" 
                                   />
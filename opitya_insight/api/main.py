@@ -1,4 +1,3 @@
-import asyncio
 import cv2
 import numpy as np
 import logging
@@ -7,7 +6,6 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware # Import CORSMiddleware
 import pathlib
-import base64
 import subprocess
 import threading
 from queue import Queue, Empty
@@ -21,8 +19,11 @@ from datetime import datetime # Import datetime for StreamWorker
 from database import models
 from database.database import SessionLocal, create_db_and_tables, get_db
 from database.models import PlateLog, Camera, Watchlist, User
-from api.routers import logs, cameras, auth, watchlist, admin, alerts, health, dashboard
+from api.routers import logs, cameras, auth, watchlist, admin, alerts, health, dashboard, streams, evidence
 from core import security # Re-import security
+from api.stream_protocol import STREAM_PROTOCOLS
+from api.stream_hub import stream_hub
+from processing.frame_renderer import select_rendition
 from core.worker_manager import active_stream_workers, latest_camera_data, _start_stream_worker_instance, _stop_all_stream_workers_instances, initialize_persistent_workers # Import worker management from new file
 
 # --- StreamWorker Imports and Definition (Modified) ---
@@ -95,6 +96,8 @@ app.include_router(admin.router)
 app.include_router(alerts.router)
 app.include_router(health.router)
 app.include_router(dashboard.router)
+app.include_router(streams.router)
+app.include_router(evidence.router)
 
 @app.on_event("startup")
 def on_startup():
@@ -118,6 +121,10 @@ async def websocket_anpr_stream(
     websocket: WebSocket,
     camera_id: int,
     token: str, # Token from query parameter
+    protocol: str = "json", # "json" (base64 image) or "binary" (raw JPEG frames), see api/stream_protocol.py
+    max_width: int | None = None, # Widest frame the client will display; picks the smallest rendition that covers it
+    quality: int | None = None, # Minimum JPEG quality wanted
+    fps: float | None = None, # Caps the frame rate sent to this viewer
     db: Session = Depends(get_db)
 ):
     await websocket.accept()
@@ -125,6 +132,7 @@ async def websocket_anpr_stream(
     
     user_camera = None
     current_user = None
+    subscriber = None
 
     try:
         # --- WebSocket Authentication ---
@@ -138,6 +146,10 @@ async def websocket_anpr_stream(
             await websocket.close(code=1008, reason="Invalid token")
             return
 
+        if protocol not in STREAM_PROTOCOLS:
+            await websocket.close(code=1008, reason=f"Unsupported protocol. Choose one of {', '.join(STREAM_PROTOCOLS)}.")
+            return
+
         # --- Camera Selection Logic ---
         user_camera = db.query(Camera).filter(
             Camera.id == camera_id,
@@ -160,38 +172,20 @@ async def websocket_anpr_stream(
             logger.warning(f"Stream worker for camera {camera_id} was not active. Starting it now.")
             _start_stream_worker_instance(camera_id, rtsp_url, SessionLocal, latest_camera_data)
         
-        await websocket.send_json({"status": f"Connected to live stream for camera {camera_id}."})
+        # Viewers share a fixed ladder of renditions (see processing/frame_renderer.py) instead of per-viewer encodes
+        rendition = select_rendition(max_width, quality)
+        await websocket.send_json({"status": f"Connected to live stream for camera {camera_id}.", "protocol": protocol, "rendition": rendition})
 
+        # Frames are serialized once per camera by the broadcast hub and queued for this viewer;
+        # if this socket is slow, its queue drops old frames instead of delaying other viewers
+        subscriber = stream_hub.subscribe(camera_id, protocol, rendition, fps)
         while True:
             try:
-                # Read latest data from the shared global dictionary
-                if camera_id in latest_camera_data and latest_camera_data[camera_id]:
-                    data = latest_camera_data[camera_id]
-                    
-                    # Ensure data is fresh enough, or send a "waiting" message
-                    # This logic can be refined based on how often StreamWorker updates
-                    
-                    # Check if 'image' key exists and is not None before encoding
-                    if "image" in data and data["image"] is not None:
-                        jpg_as_text = base64.b64encode(data["image"]).decode('utf-8')
-                        # Ensure plates are sent as a list of dictionaries with full details
-                        # The stream_worker.py is now storing full detection objects in 'plates'
-                        plates_to_send = data.get("plates", [])
-                        logger.debug(f"WebSocket sending plates: {plates_to_send}") # Debug log for plates data
-                        await websocket.send_json({
-                            "image": jpg_as_text,
-                            "plates": plates_to_send, 
-                            "frame": data.get("frame", None),
-                            "latency": data.get("latency", 0),
-                            "health": data.get("health", 0),
-                            "status": data.get("status", "offline")
-                        })
-                    else:
-                        await websocket.send_json({"status": "Waiting for stream data (no image yet)..."})
+                kind, message = await subscriber.next_message()
+                if kind == "bytes":
+                    await websocket.send_bytes(message)
                 else:
-                    await websocket.send_json({"status": "Waiting for stream data..."})
-
-                await asyncio.sleep(0.01) # Send updates at ~100 FPS for smoother video
+                    await websocket.send_text(message)
 
             except WebSocketDisconnect:
                 logger.info(f"Client disconnected from camera {camera_id}.")
@@ -203,6 +197,8 @@ async def websocket_anpr_stream(
 
     finally:
         logger.info(f"Cleaning up WebSocket connection for camera {camera_id}.")
+        if subscriber is not None:
+            stream_hub.unsubscribe(subscriber)
         try:
             await websocket.close()
         except RuntimeError as e:
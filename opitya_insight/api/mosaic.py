@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+from api.stream_hub import StreamSubscriber, stream_hub
+from api.stream_protocol import encode_mjpeg_part
+from processing.frame_renderer import select_rendition
+
+logger = logging.getLogger(__name__)
+
+MOSAIC_MAX_CAMERAS = int(os.getenv("MOSAIC_MAX_CAMERAS", "16"))
+MOSAIC_DEFAULT_TILE_WIDTH = int(os.getenv("MOSAIC_DEFAULT_TILE_WIDTH", "320"))
+MOSAIC_MAX_TILE_WIDTH = 800 # The medium rendition; wider tiles would need full frames from every camera
+MOSAIC_DEFAULT_FPS = float(os.getenv("MOSAIC_DEFAULT_FPS", "5"))
+MOSAIC_MAX_FPS = 15.0
+MOSAIC_JPEG_QUALITY = int(os.getenv("MOSAIC_JPEG_QUALITY", "70"))
+BACKGROUND_COLOR = (32, 32, 32)
+LABEL_COLOR = (255, 255, 255)
+
+
+class MosaicCompositor:
+    """
+    One wall layout: a fixed grid of cameras composited into a single JPEG stream.
+    Each camera is consumed as the smallest shared rendition covering a tile, so the workers do not
+    encode anything extra for the wall. Every frame of the grid is composited and encoded once, then
+    offered to all viewers of the same layout. Only tiles whose camera sent a new frame are redecoded.
+    """
+
+    def __init__(self, key: tuple, cameras: list[tuple[int, str]], tile_width: int, fps: float):
+        self.key = key
+        self.cameras = cameras # [(camera_id, label)], in grid order
+        self.tile_width = tile_width
+        self.tile_height = (tile_width * 9 // 16) & ~1 # 16:9 tiles; odd sizes upset some JPEG decoders
+        self.columns = int(np.ceil(np.sqrt(len(cameras))))
+        self.rows = int(np.ceil(len(cameras) / self.columns))
+        self.interval = 1.0 / fps
+        self.rendition = select_rendition(tile_width)
+        self.subscribers: set[StreamSubscriber] = set()
+        self.frames_composited = 0
+        self.tiles_decoded = 0
+        self._canvas = np.empty((self.rows * self.tile_height, self.columns * self.tile_width, 3), dtype=np.uint8)
+        self._canvas[:] = BACKGROUND_COLOR
+        for index, (camera_id, label) in enumerate(self.cameras):
+            self._draw_label(index, f"{label} - waiting for stream")
+        self._sources: list[StreamSubscriber] = []
+        self._last_part: bytes | None = None
+        self._task: asyncio.Task | None = None
+
+    def add(self, subscriber: StreamSubscriber):
+        self.subscribers.add(subscriber)
+        if self._last_part is not None:
+            subscriber.offer(("bytes", self._last_part)) # The current grid right away, not after the next tick
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def remove(self, subscriber: StreamSubscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _tile_origin(self, index: int) -> tuple[int, int]:
+        row, column = divmod(index, self.columns)
+        return column * self.tile_width, row * self.tile_height
+
+    def _draw_label(self, index: int, label: str):
+        x, y = self._tile_origin(index)
+        cv2.putText(self._canvas, label, (x + 8, y + self.tile_height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, LABEL_COLOR, 1, cv2.LINE_AA)
+
+    def _compose(self, updates: dict[int, bytes]) -> bytes | None:
+        """Decodes the updated tiles into the canvas and encodes it. Runs in a worker thread; cv2 releases the GIL."""
+        for index, jpeg in updates.items():
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                continue
+            self.tiles_decoded += 1
+            # Fit the frame inside its tile without distorting it
+            x, y = self._tile_origin(index)
+            tile = self._canvas[y:y + self.tile_height, x:x + self.tile_width]
+            height, width = frame.shape[:2]
+            scale = min(self.tile_width / width, self.tile_height / height)
+            fitted_width, fitted_height = max(1, int(width * scale)), max(1, int(height * scale))
+            pad_x, pad_y = (self.tile_width - fitted_width) // 2, (self.tile_height - fitted_height) // 2
+            tile[:] = BACKGROUND_COLOR
+            tile[pad_y:pad_y + fitted_height, pad_x:pad_x + fitted_width] = cv2.resize(
+                frame, (fitted_width, fitted_height), interpolation=cv2.INTER_AREA)
+            self._draw_label(index, self.cameras[index][1])
+        success, buffer = cv2.imencode(".jpg", self._canvas, [cv2.IMWRITE_JPEG_QUALITY, MOSAIC_JPEG_QUALITY])
+        return encode_mjpeg_part(buffer) if success else None
+
+    async def _run(self):
+        # Each camera's frames come through the stream hub like any other viewer's, throttled to the wall's rate
+        self._sources = [stream_hub.subscribe(camera_id, "jpeg", self.rendition, 1.0 / self.interval) for camera_id, _ in self.cameras]
+        try:
+            force = True # Publish the placeholder grid so viewers see something before the first camera frame
+            while self.subscribers:
+                started = time.monotonic()
+                updates = {}
+                for index, source in enumerate(self._sources):
+                    message = None
+                    while not source.queue.empty(): # Only the newest frame of each camera matters
+                        message = source.queue.get_nowait()
+                    if message is not None:
+                        updates[index] = message[1]
+                # An unchanged grid is not re-encoded; idle walls cost nothing
+                if updates or force:
+                    part = await asyncio.to_thread(self._compose, updates)
+                    if part is not None:
+                        force = False
+                        self.frames_composited += 1
+                        self._last_part = part
+                        for subscriber in list(self.subscribers):
+                            subscriber.offer(("bytes", part))
+                await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Mosaic error for cameras {[camera_id for camera_id, _ in self.cameras]}: {e}", exc_info=True)
+        finally:
+            for source in self._sources:
+                stream_hub.unsubscribe(source)
+            self._sources = []
+
+    def get_stats(self) -> dict:
+        return {
+            "cameras": [camera_id for camera_id, _ in self.cameras],
+            "grid": f"{self.columns}x{self.rows}",
+            "tile_width": self.tile_width,
+            "rendition": self.rendition,
+            "viewers": len(self.subscribers),
+            "frames_composited": self.frames_composited,
+            "tiles_decoded": self.tiles_decoded,
+        }
+
+
+class MosaicHub:
+    """Registry of mosaic layouts, shared by every viewer asking for the same cameras, tile size and rate."""
+
+    def __init__(self):
+        self.compositors: dict[tuple, MosaicCompositor] = {}
+        self._layouts: dict[StreamSubscriber, tuple] = {}
+
+    def subscribe(self, cameras: list[tuple[int, str]], tile_width: int | None = None, fps: float | None = None) -> StreamSubscriber:
+        tile_width = max(64, min(tile_width or MOSAIC_DEFAULT_TILE_WIDTH, MOSAIC_MAX_TILE_WIDTH))
+        fps = max(0.2, min(fps or MOSAIC_DEFAULT_FPS, MOSAIC_MAX_FPS))
+        key = (tuple(camera_id for camera_id, _ in cameras), tile_width, fps)
+        compositor = self.compositors.get(key)
+        if compositor is None:
+            compositor = self.compositors[key] = MosaicCompositor(key, cameras, tile_width, fps)
+        subscriber = StreamSubscriber(None, "mjpeg")
+        self._layouts[subscriber] = key
+        compositor.add(subscriber)
+        logger.info(f"Viewer subscribed to mosaic {key}; {len(compositor.subscribers)} viewer(s).")
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber):
+        key = self._layouts.pop(subscriber, None)
+        compositor = self.compositors.get(key)
+        if compositor is None:
+            return
+        compositor.remove(subscriber)
+        if not compositor.subscribers:
+            del self.compositors[key]
+
+    def get_stats(self) -> list:
+        return [compositor.get_stats() for compositor in self.compositors.values()]
+
+
+mosaic_hub = MosaicHub()
@@ -6,6 +6,14 @@ from database import models, database
 from core.security import get_current_user, require_admin
 from pydantic import BaseModel
 
+from processing.batch_scheduler import get_scheduler_stats, DETECTION_MAX_BATCH_SIZE, DETECTION_MAX_WAIT_MS
+from processing.detector_backends import DETECTOR_BACKEND
+from core.worker_manager import WORKER_MODE, configure_detection_scheduler, get_cpu_budget_stats, get_worker_process_stats
+from api.stream_hub import stream_hub
+from api.mosaic import mosaic_hub
+from core.snapshot_writer import get_snapshot_writer_stats
+from core.evidence_store import get_evidence_store_stats
+
 router = APIRouter(
     prefix="/admin",
     tags=["admin"],
@@ -16,17 +24,23 @@ router = APIRouter(
 class AdminSettings(BaseModel):
     retention_days: int
     concurrent_streams_limit: int = 10 # Default as per BRD
+    detection_max_batch_size: int = DETECTION_MAX_BATCH_SIZE
+    detection_max_wait_ms: float = DETECTION_MAX_WAIT_MS
 
 class AdminSettingsUpdate(BaseModel):
     retention_days: Optional[int] = None
     concurrent_streams_limit: Optional[int] = None
+    detection_max_batch_size: Optional[int] = None
+    detection_max_wait_ms: Optional[float] = None
 
 # Placeholder for actual settings storage (e.g., in DB or config file)
 # For now, we'll use a simple in-memory dictionary.
 # In a real application, these would be persisted.
 _admin_settings = {
     "retention_days": 30,
-    "concurrent_streams_limit": 10
+    "concurrent_streams_limit": 10,
+    "detection_max_batch_size": DETECTION_MAX_BATCH_SIZE,
+    "detection_max_wait_ms": DETECTION_MAX_WAIT_MS,
 }
 
 @router.get("/settings", response_model=AdminSettings)
@@ -45,5 +59,34 @@ def update_admin_settings(settings_update: AdminSettingsUpdate):
         _admin_settings["retention_days"] = settings_update.retention_days
     if settings_update.concurrent_streams_limit is not None:
         _admin_settings["concurrent_streams_limit"] = settings_update.concurrent_streams_limit
+    if settings_update.detection_max_batch_size is not None or settings_update.detection_max_wait_ms is not None:
+        if settings_update.detection_max_batch_size is not None:
+            _admin_settings["detection_max_batch_size"] = settings_update.detection_max_batch_size
+        if settings_update.detection_max_wait_ms is not None:
+            _admin_settings["detection_max_wait_ms"] = settings_update.detection_max_wait_ms
+        # Apply to the running scheduler(s) without restarting any camera
+        configure_detection_scheduler(
+            max_batch_size=_admin_settings["detection_max_batch_size"],
+            max_wait_ms=_admin_settings["detection_max_wait_ms"],
+        )
     
     return _admin_settings
+
+@router.get("/inference-stats")
+def get_inference_stats():
+    """
+    Retrieve batch size and latency stats of the shared inference schedulers,
+    alongside the stream limit they should be tuned against.
+    """
+    return {
+        "concurrent_streams_limit": _admin_settings["concurrent_streams_limit"],
+        "worker_mode": WORKER_MODE,
+        "detector_backend": DETECTOR_BACKEND,
+        "cpu_budget": get_cpu_budget_stats(),
+        "schedulers": get_scheduler_stats(),
+        "worker_processes": get_worker_process_stats(),
+        "streams": stream_hub.get_stats(),
+        "mosaics": mosaic_hub.get_stats(),
+        "snapshot_writer": get_snapshot_writer_stats(),
+        "evidence": get_evidence_store_stats(), # This process's writer; worker processes report theirs under worker_processes
+    }
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy.orm import Session
+
+from database import models, database
+from core import security
+from core.evidence_store import LocalEvidenceBackend, get_evidence_store
+
+# Authenticated with a token query parameter, since evidence images are shown in <img> tags
+router = APIRouter(
+    prefix="/evidence",
+    tags=["evidence"],
+    responses={404: {"description": "Not found"}},
+)
+
+EVIDENCE_IMAGES = ("context", "plate_crop")
+
+
+@router.get("/{log_id}")
+def get_plate_log_evidence(log_id: int, token: str, image: str = "context", db: Session = Depends(database.get_db)):
+    """
+    Return an evidence image of a plate log: the downscaled context frame (default) or the plate crop.
+    Local files are streamed; images in S3 are served through a short-lived presigned redirect.
+    """
+    current_user = security.get_current_user_ws(token=token, db=db)
+    if image not in EVIDENCE_IMAGES:
+        raise HTTPException(status_code=400, detail=f"image must be one of {', '.join(EVIDENCE_IMAGES)}")
+    plate_log = db.query(models.PlateLog).filter(models.PlateLog.id == log_id, models.PlateLog.user_id == current_user.id).first()
+    if plate_log is None:
+        raise HTTPException(status_code=404, detail="Plate log not found")
+
+    refs = (plate_log.extra_metadata or {}).get("evidence") or {"context": plate_log.image_snapshot_ref}
+    ref = refs.get(image)
+    if not ref:
+        raise HTTPException(status_code=404, detail="No evidence image for this plate log")
+
+    backend = get_evidence_store().backend
+    if ref.startswith("s3://"):
+        url = backend.presigned_url(ref) if backend is not None else None
+        if url is None:
+            raise HTTPException(status_code=404, detail="Evidence image is in a bucket this server is not configured for")
+        return RedirectResponse(url)
+
+    # Refs written while the local backend was active stay readable after switching backends
+    path = (backend if isinstance(backend, LocalEvidenceBackend) else LocalEvidenceBackend()).resolve(ref)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Evidence image not found (it may still be being written)")
+    # Content-addressed, so the bytes behind a reference never change
+    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "private, max-age=31536000, immutable"})
@@ -0,0 +1,105 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from database import models, database
+from core import security
+from core.worker_manager import active_stream_workers, latest_camera_data, _start_stream_worker_instance
+from database.database import SessionLocal
+from api.mosaic import MOSAIC_MAX_CAMERAS, mosaic_hub
+from api.stream_hub import stream_hub
+from api.stream_protocol import MJPEG_MEDIA_TYPE
+from processing.frame_renderer import select_rendition
+
+logger = logging.getLogger(__name__)
+
+# Authenticated with a token query parameter, like the live WebSocket, since <img> tags cannot send headers
+router = APIRouter(
+    prefix="/streams",
+    tags=["streams"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Keep intermediaries from buffering or caching the never-ending response
+STREAM_HEADERS = {"Cache-Control": "no-cache, no-store", "X-Accel-Buffering": "no"}
+
+
+def _ensure_worker(camera: models.Camera):
+    if camera.rtsp_url and (camera.id not in active_stream_workers or not active_stream_workers[camera.id].is_alive()):
+        logger.warning(f"Stream worker for camera {camera.id} was not active. Starting it now.")
+        _start_stream_worker_instance(camera.id, camera.rtsp_url, SessionLocal, latest_camera_data)
+
+async def _stream(subscribe, unsubscribe):
+    """
+    Yields ready-made MJPEG parts until the client goes away. Subscribes on the first iteration, so the
+    subscription lives on the event loop and is never left behind by a client that vanishes before it starts.
+    """
+    subscriber = subscribe()
+    try:
+        while True:
+            _, part = await subscriber.next_message()
+            yield part
+    finally:
+        unsubscribe(subscriber)
+
+@router.get("/mosaic")
+def mosaic_stream(
+    token: str,
+    camera_ids: str | None = Query(None, description="Comma-separated camera IDs in grid order; all of the user's cameras if omitted"),
+    tile_width: int | None = None,
+    fps: float | None = None,
+    db: Session = Depends(database.get_db),
+):
+    """
+    One MJPEG stream compositing several cameras into a downscaled grid, for wall monitors:
+    a single connection and a single decode in the browser instead of one per camera.
+    """
+    current_user = security.get_current_user_ws(token=token, db=db)
+    query = db.query(models.Camera).filter(models.Camera.owner_id == current_user.id)
+    if camera_ids:
+        try:
+            requested = [int(camera_id) for camera_id in camera_ids.split(",") if camera_id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="camera_ids must be a comma-separated list of integers")
+        cameras_by_id = {camera.id: camera for camera in query.filter(models.Camera.id.in_(requested)).all()}
+        missing = [camera_id for camera_id in requested if camera_id not in cameras_by_id]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Camera(s) {missing} not found or unauthorized")
+        cameras = [cameras_by_id[camera_id] for camera_id in dict.fromkeys(requested)]
+    else:
+        cameras = query.order_by(models.Camera.id).all()
+    if not cameras:
+        raise HTTPException(status_code=404, detail="No cameras to show")
+    if len(cameras) > MOSAIC_MAX_CAMERAS:
+        raise HTTPException(status_code=400, detail=f"A mosaic shows at most {MOSAIC_MAX_CAMERAS} cameras")
+
+    for camera in cameras:
+        _ensure_worker(camera)
+    layout = [(camera.id, camera.name) for camera in cameras]
+    return StreamingResponse(_stream(lambda: mosaic_hub.subscribe(layout, tile_width, fps), mosaic_hub.unsubscribe), media_type=MJPEG_MEDIA_TYPE, headers=STREAM_HEADERS)
+
+@router.get("/{camera_id}/mjpeg")
+def mjpeg_stream(
+    camera_id: int,
+    token: str,
+    max_width: int | None = None,
+    quality: int | None = None,
+    fps: float | None = None,
+    db: Session = Depends(database.get_db),
+):
+    """
+    The camera's annotated live view as multipart/x-mixed-replace MJPEG, usable directly as an <img> src.
+    Served from the same shared renditions as the WebSocket; max_width / quality / fps work the same way.
+    """
+    current_user = security.get_current_user_ws(token=token, db=db)
+    camera = db.query(models.Camera).filter(models.Camera.id == camera_id, models.Camera.owner_id == current_user.id).first()
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Camera not found or unauthorized")
+    if not camera.rtsp_url:
+        raise HTTPException(status_code=400, detail="RTSP URL is required for this camera.")
+
+    _ensure_worker(camera)
+    rendition = select_rendition(max_width, quality)
+    return StreamingResponse(_stream(lambda: stream_hub.subscribe(camera_id, "mjpeg", rendition, fps), stream_hub.unsubscribe), media_type=MJPEG_MEDIA_TYPE, headers=STREAM_HEADERS)
@@ -5,6 +5,8 @@ from typing import List, Optional
 from database import models, database
 from api.schemas import watchlist as watchlist_schema
 from core.security import get_current_user
+from core.watchlist_index import watchlist_entry_to_dict
+from core.worker_manager import publish_watchlist_change
 
 router = APIRouter(
     prefix="/watchlist",
@@ -38,6 +40,7 @@ def create_watchlist_entry(entry: watchlist_schema.WatchlistCreate, db: Session
         db.add(db_entry)
         db.commit()
         db.refresh(db_entry)
+        publish_watchlist_change("upsert", watchlist_entry_to_dict(db_entry), None) # Keep the stream workers' index current
         
         # Populate created_by for the response model
         response_entry = watchlist_schema.Watchlist.from_orm(db_entry)
@@ -80,6 +83,7 @@ def update_watchlist_entry(
     if db_entry is None:
         raise HTTPException(status_code=404, detail="Watchlist entry not found")
 
+    old_plate_text = db_entry.plate_text
     db_entry.plate_text = entry_update.plate_text # Changed from entry_update.plate to entry_update.plate_text
     db_entry.description = entry_update.description # Changed from entry_update.label to entry_update.description
     db_entry.notify_sms = int(entry_update.notify_sms)
@@ -88,6 +92,7 @@ def update_watchlist_entry(
     db.add(db_entry)
     db.commit()
     db.refresh(db_entry)
+    publish_watchlist_change("upsert", watchlist_entry_to_dict(db_entry), old_plate_text)
 
     response_entry = watchlist_schema.Watchlist.from_orm(db_entry)
     response_entry.created_by = current_user.email
@@ -102,6 +107,8 @@ def delete_watchlist_entry(entry_id: int, db: Session = Depends(database.get_db)
     db_entry = db.query(models.Watchlist).filter(models.Watchlist.id == entry_id, models.Watchlist.owner_id == current_user.id).first()
     if db_entry is None:
         raise HTTPException(status_code=404, detail="Watchlist entry not found")
+    owner_id, plate_text, entry_id = db_entry.owner_id, db_entry.plate_text, db_entry.id
     db.delete(db_entry)
     db.commit()
+    publish_watchlist_change("remove", owner_id, plate_text, entry_id)
     return
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+import time
+
+from core.frame_notifier import frame_notifier
+from core.worker_manager import get_latest_frame, latest_camera_data, set_stream_demand
+from api.stream_protocol import build_frame_header, encode_binary_message, encode_json_message, encode_mjpeg_part
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 2 # Frames buffered per viewer before the oldest is dropped
+STREAM_IDLE_STATUS_SECONDS = 5 # Send a status message when a camera has published nothing for this long
+
+
+class StreamSubscriber:
+    """
+    One viewer of a camera. Holds a bounded queue of ready-to-send (kind, payload) messages.
+    rendition is the shared JPEG size it is served (see processing/frame_renderer.py); max_fps, if set,
+    thins out the frames it is offered without affecting other viewers.
+    """
+
+    def __init__(self, camera_id: int, protocol: str, rendition: str = "full", max_fps: float | None = None,
+                 queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.camera_id = camera_id
+        self.protocol = protocol
+        self.rendition = rendition
+        self.min_interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.last_frame_at = 0.0
+
+    @property
+    def message_key(self) -> tuple[str, str]:
+        """Viewers with the same key receive the very same serialized message."""
+        return self.protocol, self.rendition
+
+    def wants_frame(self, now: float) -> bool:
+        return now - self.last_frame_at >= self.min_interval
+
+    def offer(self, message: tuple):
+        """Queues a message without ever blocking; a slow viewer loses its oldest frame instead of delaying others."""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.messages_dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(message)
+
+    async def next_message(self) -> tuple:
+        message = await self.queue.get()
+        self.messages_sent += 1
+        return message
+
+
+class CameraBroadcaster:
+    """
+    Fans one camera's frames out to all of its viewers. Each new frame is serialized once per
+    (protocol, rendition) in use, no matter how many viewers share it, and then offered to every subscriber queue.
+    """
+
+    def __init__(self, camera_id: int):
+        self.camera_id = camera_id
+        self.subscribers: set[StreamSubscriber] = set()
+        self.frames_serialized = 0
+        self._joined: set[StreamSubscriber] = set() # Viewers that have not received the current frame yet
+        self._task: asyncio.Task | None = None
+
+    def add(self, subscriber: StreamSubscriber):
+        self.subscribers.add(subscriber)
+        self._joined.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        else:
+            frame_notifier.notify(self.camera_id) # Wake the running task so the new viewer gets the current frame now
+
+    def remove(self, subscriber: StreamSubscriber):
+        self.subscribers.discard(subscriber)
+        self._joined.discard(subscriber)
+        set_stream_demand(self.camera_id, self._demand()) # With no viewers left the worker stops encoding
+        if not self.subscribers:
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    def _broadcast(self, messages: dict, subscribers=None):
+        for subscriber in list(subscribers if subscribers is not None else self.subscribers):
+            message = messages.get(subscriber.message_key, messages.get(subscriber.protocol))
+            if message is not None:
+                subscriber.offer(message)
+
+    def _demand(self) -> dict[str, int]:
+        demand: dict[str, int] = {}
+        for subscriber in self.subscribers:
+            demand[subscriber.rendition] = demand.get(subscriber.rendition, 0) + 1
+        return demand
+
+    def _status_message(self, status: str) -> tuple:
+        return ("text", json.dumps({"status": status}))
+
+    async def _run(self):
+        last_seq = 0
+        try:
+            while self.subscribers:
+                # Re-asserted every pass, so a worker restarted with a fresh ring learns what its viewers want
+                set_stream_demand(self.camera_id, self._demand())
+                # Take the wake-up event before looking at the ring so a frame published in between is not missed
+                frame_event = frame_notifier.next_frame_event(self.camera_id)
+
+                packet = get_latest_frame(self.camera_id)
+                # Slots published while nobody watched carry no image; wait for the first encoded one
+                if packet is not None and len(packet.image) and (packet.seq != last_seq or self._joined):
+                    now = time.monotonic()
+                    # A new frame goes to everyone not throttled by its fps cap; the current one only to viewers that just joined
+                    if packet.seq != last_seq:
+                        targets = {subscriber for subscriber in self.subscribers if subscriber.wants_frame(now)} | self._joined
+                    else:
+                        targets = set(self._joined)
+                    last_seq = packet.seq
+                    # The worker marks the camera offline in latest_camera_data when it stops
+                    status = latest_camera_data.get(self.camera_id, packet.meta).get("status", "offline")
+                    header = build_frame_header(packet.meta, status)
+                    messages = {}
+                    for protocol, rendition in {subscriber.message_key for subscriber in targets}:
+                        # A viewer that just switched size may briefly get the frame before its rendition is encoded
+                        image = packet.rendition(rendition)
+                        if image is None:
+                            continue
+                        rendition_header = dict(header, rendition=rendition)
+                        if protocol == "mjpeg":
+                            messages[(protocol, rendition)] = ("bytes", encode_mjpeg_part(image))
+                        elif protocol == "jpeg": # Bare JPEG bytes, for the mosaic compositor
+                            messages[(protocol, rendition)] = ("bytes", bytes(image))
+                        elif protocol == "binary":
+                            messages[(protocol, rendition)] = ("bytes", encode_binary_message(rendition_header, image))
+                        else:
+                            messages[(protocol, rendition)] = ("text", encode_json_message(rendition_header, image))
+                    # Only send if the worker did not overwrite the slot while we were serializing it
+                    if packet.is_valid() and messages:
+                        self.frames_serialized += len(messages)
+                        served = {subscriber for subscriber in targets if subscriber.message_key in messages}
+                        self._joined -= served
+                        for subscriber in served:
+                            subscriber.last_frame_at = now
+                        self._broadcast(messages, served)
+                    if messages:
+                        continue
+                    # Otherwise the viewers waiting on the current frame need a rendition it lacks: wait for the next one
+
+                # Sleep until the worker publishes a new frame; an idle camera costs nothing per viewer
+                if not await frame_notifier.wait(frame_event, STREAM_IDLE_STATUS_SECONDS):
+                    # Nothing new for a while: tell the viewers, which also lets their handlers notice closed connections
+                    if packet is None:
+                        message = self._status_message("Waiting for stream data...")
+                    else:
+                        message = self._status_message(latest_camera_data.get(self.camera_id, {}).get("status", "offline"))
+                    self._broadcast({"json": message, "binary": message})
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Broadcast error for camera {self.camera_id}: {e}", exc_info=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "viewers": len(self.subscribers),
+            "renditions": self._demand(),
+            "frames_serialized": self.frames_serialized,
+            "messages_sent": sum(subscriber.messages_sent for subscriber in self.subscribers),
+            "messages_dropped": sum(subscriber.messages_dropped for subscriber in self.subscribers),
+        }
+
+
+class StreamHub:
+    """Registry of per-camera broadcasters. Only used from the API event loop."""
+
+    def __init__(self):
+        self.broadcasters: dict[int, CameraBroadcaster] = {}
+
+    def subscribe(self, camera_id: int, protocol: str, rendition: str = "full", max_fps: float | None = None) -> StreamSubscriber:
+        broadcaster = self.broadcasters.get(camera_id)
+        if broadcaster is None:
+            broadcaster = self.broadcasters[camera_id] = CameraBroadcaster(camera_id)
+        subscriber = StreamSubscriber(camera_id, protocol, rendition, max_fps)
+        broadcaster.add(subscriber)
+        logger.info(f"Viewer subscribed to camera {camera_id} ({protocol}, {rendition}); {len(broadcaster.subscribers)} viewer(s).")
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber):
+        broadcaster = self.broadcasters.get(subscriber.camera_id)
+        if broadcaster is None:
+            return
+        broadcaster.remove(subscriber)
+        if not broadcaster.subscribers:
+            del self.broadcasters[subscriber.camera_id]
+        logger.info(f"Viewer unsubscribed from camera {subscriber.camera_id}; {len(broadcaster.subscribers)} viewer(s) left.")
+
+    def get_stats(self) -> dict:
+        return {camera_id: broadcaster.get_stats() for camera_id, broadcaster in self.broadcasters.items()}
+
+
+stream_hub = StreamHub()
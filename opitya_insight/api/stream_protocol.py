@@ -0,0 +1,59 @@
+"""
+Wire formats for the live stream WebSocket.
+
+"json" (default, used by LiveViewer.jsx): one text message per frame,
+    {"image": <base64 JPEG>, "plates": [...], "frame": int, "latency": float, "health": int, "status": str}
+
+"binary": one binary message per frame, laid out as
+    [4-byte big-endian header length][compact JSON header, UTF-8][raw JPEG bytes]
+    The header carries the same fields as the JSON mode minus "image". This avoids the ~33%
+    base64 overhead and the cost of base64-encoding and JSON-escaping every frame.
+
+Every frame header also names its "rendition" (thumb, medium or full, see processing/frame_renderer.py),
+chosen at connect time with the max_width / quality query parameters. Plate boxes are always in
+source-frame pixels, whatever the rendition's size.
+
+Status and error messages are always sent as JSON text in both modes.
+
+Plain HTTP viewers (<img> tags, proxies, VLC) get "mjpeg" instead, served by api/routers/streams.py:
+a multipart/x-mixed-replace response with one JPEG part per frame and no per-frame metadata.
+"""
+import base64
+import json
+import struct
+
+STREAM_PROTOCOLS = ("json", "binary")
+MJPEG_BOUNDARY = "frame"
+MJPEG_MEDIA_TYPE = f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+
+_HEADER_LENGTH = struct.Struct(">I")
+
+
+def build_frame_header(meta: dict, status: str) -> dict:
+    """Picks the per-frame fields sent to viewers from the worker's frame metadata."""
+    return {
+        "plates": meta.get("plates", []),
+        "frame": meta.get("frame", None),
+        "latency": meta.get("latency", 0),
+        "health": meta.get("health", 0),
+        "status": status,
+    }
+
+def encode_json_message(header: dict, image) -> str:
+    """Builds the text message of the json protocol."""
+    message = dict(header)
+    message["image"] = base64.b64encode(image).decode('utf-8')
+    return json.dumps(message)
+
+def encode_binary_message(header: dict, image) -> bytes:
+    """Builds the binary message of the binary protocol."""
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return b"".join((_HEADER_LENGTH.pack(len(header_bytes)), header_bytes, image))
+
+def encode_mjpeg_part(image) -> bytes:
+    """Builds one part of a multipart/x-mixed-replace MJPEG response."""
+    return b"".join((
+        f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(image)}\r\n\r\n".encode("ascii"),
+        image,
+        b"\r\n",
+    ))
@@ -0,0 +1,117 @@
+"""
+Compares plate detection latency and recall across inference sizes.
+
+Run from the opitya_insight directory:
+    python benchmark_detection.py                                  # ../test_image.jpg
+    python benchmark_detection.py --video /path/to/clip.mp4 --frames 100   # or an rtsp:// URL
+    python benchmark_detection.py --sizes 320 480 640 --runs 50 --output results.md
+
+Needs the detector weights (models/weights/LP-detection.pt, or DETECTOR_BACKEND=onnx with
+DETECTION_ONNX_PATH), which are not checked in. No sample video ships either; ANPRVv.mp4.xspf
+in the repo root is a VLC playlist pointing at a local file.
+
+Recall is measured against the detections at the largest size (no labelled ground truth ships
+with the repo): a reference box counts as found if a box at the tested size overlaps it with
+IoU >= 0.5. Boxes below the stream worker's 0.70 confidence threshold are ignored.
+"""
+import argparse
+import pathlib
+import statistics
+import time
+
+import cv2
+
+from processing.inference_engine import InferenceEngine
+from processing.plate_tracker import box_iou
+
+CONFIDENCE_THRESHOLD = 0.70
+DEFAULT_IMAGE = pathlib.Path(__file__).resolve().parent.parent / "test_image.jpg"
+
+
+def load_frames(args) -> list:
+    if not args.video:
+        frame = cv2.imread(str(args.image))
+        if frame is None:
+            raise SystemExit(f"Could not read image {args.image}")
+        return [frame]
+    cap = cv2.VideoCapture(args.video)
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Could not read frames from {args.video}")
+    return frames
+
+def confident_boxes(detections) -> list:
+    return [row[:4] for row in detections.tolist() if row[4] >= CONFIDENCE_THRESHOLD]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", type=pathlib.Path, default=DEFAULT_IMAGE)
+    parser.add_argument("--video", help="Sample frames from this video instead of using --image")
+    parser.add_argument("--frames", type=int, default=100, help="Frames to sample from --video")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[320, 480, 640])
+    parser.add_argument("--runs", type=int, default=20, help="Timed passes over the frames per size")
+    parser.add_argument("--output", type=pathlib.Path, help="Also write the results table here, as Markdown, to keep with the change it justifies")
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    engine = InferenceEngine()
+    if not engine.load():
+        raise SystemExit("Could not load the detection model")
+    print(f"Benchmarking {len(frames)} frame(s) of {frames[0].shape[1]}x{frames[0].shape[0]} at sizes {args.sizes}")
+
+    sizes = sorted(args.sizes)
+    results = {}
+    for imgsz in sizes:
+        for frame in frames[:3]: # Warm up and allocate this size's preprocessing buffers
+            engine.detect(frame, imgsz)
+        latencies = []
+        detections = []
+        for run in range(args.runs):
+            for frame in frames:
+                start = time.perf_counter()
+                output = engine.detect(frame, imgsz)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if run == 0:
+                    detections.append(confident_boxes(output))
+        results[imgsz] = (latencies, detections)
+
+    reference = results[sizes[-1]][1]
+    reference_count = sum(len(boxes) for boxes in reference)
+    print(f"\nReference: {reference_count} plate(s) at imgsz={sizes[-1]}\n")
+    print(f"{'imgsz':>6} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'plates':>7} {'recall':>7}")
+    rows = []
+    for imgsz in sizes:
+        latencies, detections = results[imgsz]
+        found = sum(
+            any(box_iou(reference_box, box) >= 0.5 for box in boxes)
+            for reference_boxes, boxes in zip(reference, detections)
+            for reference_box in reference_boxes
+        )
+        recall = found / reference_count if reference_count else 1.0
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) >= 2 else latencies[0]
+        row = (imgsz, statistics.mean(latencies), statistics.median(latencies), p95, sum(len(boxes) for boxes in detections), recall)
+        rows.append(row)
+        print(f"{row[0]:>6} {row[1]:>9.1f} {row[2]:>8.1f} {row[3]:>8.1f} {row[4]:>7} {row[5]:>7.1%}")
+
+    if args.output:
+        source = args.video or args.image.name
+        lines = [
+            f"Detection benchmark: {len(frames)} frame(s) of {source} ({frames[0].shape[1]}x{frames[0].shape[0]}), "
+            f"{engine.detector.name} backend, {args.runs} run(s), recall against imgsz={sizes[-1]}",
+            "",
+            "| imgsz | mean ms | p50 ms | p95 ms | plates | recall |",
+            "|------:|--------:|-------:|-------:|-------:|-------:|",
+        ]
+        lines += [f"| {imgsz} | {mean:.1f} | {p50:.1f} | {p95:.1f} | {plates} | {recall:.1%} |" for imgsz, mean, p50, p95, plates, recall in rows]
+        args.output.write_text("\n".join(lines) + "\n")
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on inference calls (detection or OCR) running at once across all worker processes;
+# 0 derives it from the core count and INFERENCE_MIN_THREADS_PER_CALL
+INFERENCE_MAX_CONCURRENCY = int(os.getenv("INFERENCE_MAX_CONCURRENCY", "0"))
+INFERENCE_MIN_THREADS_PER_CALL = int(os.getenv("INFERENCE_MIN_THREADS_PER_CALL", "2"))
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects container CPU pinning where the OS exposes it)."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError: # Not available on every platform
+        return os.cpu_count() or 1
+
+def inference_concurrency_limit(cores: int | None = None) -> int:
+    cores = cores or available_cores()
+    if INFERENCE_MAX_CONCURRENCY > 0:
+        return INFERENCE_MAX_CONCURRENCY
+    return max(1, cores // max(1, INFERENCE_MIN_THREADS_PER_CALL))
+
+def plan_thread_budget(inference_engines: int, cores: int | None = None) -> dict:
+    """
+    Splits the cores between the inference engines that can run at once.
+    Each engine (one per process) runs at most one detection and one OCR call at a time, and the
+    shared slot semaphore caps the total, so intra-op threads per call = cores / concurrent calls.
+    """
+    cores = cores or available_cores()
+    max_concurrency = inference_concurrency_limit(cores)
+    concurrent_calls = max(1, min(max_concurrency, 2 * max(1, inference_engines)))
+    return {
+        "cores": cores,
+        "inference_engines": inference_engines,
+        "max_concurrency": max_concurrency,
+        "intra_op_threads": max(1, cores // concurrent_calls),
+    }
+
+
+class CpuUsageMonitor:
+    """Per-core utilization from /proc/stat, measured between successive calls to sample()."""
+
+    def __init__(self, proc_stat_path: str = "/proc/stat"):
+        self.proc_stat_path = proc_stat_path
+        self._previous: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict[str, tuple[int, int]]:
+        """{cpu name: (busy jiffies, total jiffies)}"""
+        times = {}
+        with open(self.proc_stat_path) as stat_file:
+            for line in stat_file:
+                if not line.startswith("cpu") or line.startswith("cpu "):
+                    continue
+                name, *values = line.split()
+                values = [int(value) for value in values]
+                idle = values[3] + (values[4] if len(values) > 4 else 0) # idle + iowait
+                times[name] = (sum(values) - idle, sum(values))
+        return times
+
+    def sample(self) -> dict | None:
+        """Returns {"per_core": [percent, ...], "average": percent}, or None where /proc/stat is unavailable."""
+        try:
+            current = self._read()
+        except OSError:
+            return None
+        with self._lock:
+            previous, self._previous = self._previous, current
+        per_core = []
+        for name, (busy, total) in current.items():
+            previous_busy, previous_total = previous.get(name, (0, 0))
+            elapsed = total - previous_total
+            per_core.append(round(100.0 * (busy - previous_busy) / elapsed, 1) if elapsed > 0 else 0.0)
+        return {
+            "per_core": per_core,
+            "average": round(sum(per_core) / len(per_core), 1) if per_core else 0.0,
+        }
+
+
+cpu_usage_monitor = CpuUsageMonitor()
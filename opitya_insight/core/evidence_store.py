@@ -0,0 +1,287 @@
+"""
+Evidence images for plate logs: the plate crop and a downscaled context frame of every logged detection.
+
+Images are JPEG-encoded and named by the SHA-256 of their bytes, under date-sharded keys
+(YYYY/MM/DD/ab/<sha256>.jpg), so the same image is never stored twice. Writes go through a bounded
+queue drained by one writer thread per process; a full queue drops the evidence rather than
+holding up the camera. Select the backend with EVIDENCE_BACKEND:
+
+    local  files under EVIDENCE_DIR, fsynced in batches (default)
+    s3     an S3-compatible bucket (AWS, MinIO, ...) through boto3
+    none   no evidence is kept
+
+A log's image_snapshot_ref holds the context frame's reference (the file path or s3://bucket/key);
+both references are kept in extra_metadata["evidence"]. api/routers/evidence.py serves them.
+"""
+import hashlib
+import logging
+import os
+import pathlib
+import threading
+import time
+from datetime import datetime
+from queue import Empty, Full, Queue
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+EVIDENCE_BACKEND = os.getenv("EVIDENCE_BACKEND", "local").lower()
+EVIDENCE_DIR = pathlib.Path(os.getenv("EVIDENCE_DIR", "static/evidence"))
+EVIDENCE_S3_BUCKET = os.getenv("EVIDENCE_S3_BUCKET", "")
+EVIDENCE_S3_PREFIX = os.getenv("EVIDENCE_S3_PREFIX", "evidence")
+EVIDENCE_S3_ENDPOINT_URL = os.getenv("EVIDENCE_S3_ENDPOINT_URL") # For MinIO and other S3-compatible stores
+EVIDENCE_S3_REGION = os.getenv("EVIDENCE_S3_REGION")
+EVIDENCE_QUEUE_SIZE = int(os.getenv("EVIDENCE_QUEUE_SIZE", "256")) # Images waiting to be written
+EVIDENCE_WRITE_BATCH_SIZE = int(os.getenv("EVIDENCE_WRITE_BATCH_SIZE", "32")) # Images per fsync batch
+EVIDENCE_WRITE_BATCH_SECONDS = float(os.getenv("EVIDENCE_WRITE_BATCH_SECONDS", "0.5")) # Longest wait to fill a batch
+EVIDENCE_CONTEXT_WIDTH = int(os.getenv("EVIDENCE_CONTEXT_WIDTH", "640"))
+EVIDENCE_JPEG_QUALITY = int(os.getenv("EVIDENCE_JPEG_QUALITY", "85"))
+EVIDENCE_CROP_PADDING = 0.15 # Margin kept around the plate box, as a fraction of its size
+
+EVIDENCE_BACKENDS = ("local", "s3", "none")
+
+
+def evidence_key(data: bytes, captured_at: datetime) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{captured_at:%Y/%m/%d}/{digest[:2]}/{digest}.jpg"
+
+def prepare_evidence(frame, boxes: list) -> list[tuple]:
+    """
+    Cuts the evidence images of the given plate boxes out of a frame: [(plate crop, context frame)].
+    Called on the inference thread, so it only slices and downscales; encoding and writing happen later.
+    The context frame is shared by every plate of the frame.
+    """
+    height, width = frame.shape[:2]
+    if width > EVIDENCE_CONTEXT_WIDTH:
+        context = cv2.resize(frame, (EVIDENCE_CONTEXT_WIDTH, max(1, height * EVIDENCE_CONTEXT_WIDTH // width)), interpolation=cv2.INTER_AREA)
+    else:
+        context = frame.copy()
+    evidence = []
+    for x1, y1, x2, y2 in boxes:
+        pad_x, pad_y = int((x2 - x1) * EVIDENCE_CROP_PADDING), int((y2 - y1) * EVIDENCE_CROP_PADDING)
+        crop = frame[max(0, y1 - pad_y):min(height, y2 + pad_y), max(0, x1 - pad_x):min(width, x2 + pad_x)].copy()
+        evidence.append((crop, context))
+    return evidence
+
+
+class LocalEvidenceBackend:
+    """Files under a directory. A batch is written, then fsynced together, then renamed into place."""
+
+    name = "local"
+
+    def __init__(self, root: pathlib.Path = EVIDENCE_DIR):
+        self.root = root
+
+    def ref(self, key: str) -> str:
+        return str(self.root / key)
+
+    def write_batch(self, items: list[tuple[str, bytes]]) -> int:
+        """Writes [(key, data)] and returns how many were new; a key already on disk holds the same bytes."""
+        pending = []
+        seen = set()
+        for key, data in items:
+            path = self.root / key
+            if key in seen or path.exists():
+                continue
+            seen.add(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(".tmp")
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            pending.append((temp_path, path))
+        # Flush the whole batch at once instead of after every file, then make the renames durable
+        for temp_path, _ in pending:
+            fd = os.open(temp_path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        for temp_path, path in pending:
+            os.replace(temp_path, path)
+        for directory in {path.parent for _, path in pending}:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            except OSError: # Directories cannot be fsynced on every platform
+                pass
+            finally:
+                os.close(fd)
+        return len(pending)
+
+    def resolve(self, ref: str) -> pathlib.Path | None:
+        """The file behind a reference, or None if it is not inside this backend's directory."""
+        path = pathlib.Path(ref).resolve()
+        root = self.root.resolve()
+        return path if path.is_relative_to(root) and path.is_file() else None
+
+    def presigned_url(self, ref: str, expires_in: int = 300) -> str | None:
+        return None # Local files are streamed by the API instead
+
+
+class S3EvidenceBackend:
+    """An S3-compatible bucket. boto3 is only imported when this backend is used."""
+
+    name = "s3"
+
+    def __init__(self, bucket: str = EVIDENCE_S3_BUCKET, prefix: str = EVIDENCE_S3_PREFIX,
+                 endpoint_url: str | None = EVIDENCE_S3_ENDPOINT_URL, region: str | None = EVIDENCE_S3_REGION):
+        if not bucket:
+            raise ValueError("EVIDENCE_S3_BUCKET must be set for the s3 evidence backend")
+        import boto3
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        # Credentials come from the usual AWS environment variables / config files
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def ref(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._object_key(key)}"
+
+    def write_batch(self, items: list[tuple[str, bytes]]) -> int:
+        # Keys are content-addressed, so re-uploading an existing one is harmless and cheaper than checking first
+        for key, data in items:
+            self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data, ContentType="image/jpeg")
+        return len(items)
+
+    def resolve(self, ref: str) -> pathlib.Path | None:
+        return None # Objects are fetched by the client through presigned_url()
+
+    def presigned_url(self, ref: str, expires_in: int = 300) -> str | None:
+        """A short-lived GET URL for a reference in this bucket, or None if it points elsewhere."""
+        bucket_prefix = f"s3://{self.bucket}/"
+        if not ref.startswith(bucket_prefix):
+            return None
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": ref[len(bucket_prefix):]}, ExpiresIn=expires_in)
+
+
+def create_evidence_backend(name: str = EVIDENCE_BACKEND):
+    """Builds the backend selected by EVIDENCE_BACKEND, or None when evidence is disabled or unusable."""
+    if name == "none":
+        return None
+    if name == "s3":
+        try:
+            return S3EvidenceBackend()
+        except Exception as e:
+            logger.error(f"S3 evidence backend unavailable ({e}); plate logs will have no evidence images.")
+            return None
+    if name != "local":
+        logger.warning(f"Unknown EVIDENCE_BACKEND '{name}', expected one of {EVIDENCE_BACKENDS}; using local.")
+    return LocalEvidenceBackend()
+
+
+class EvidenceStore(threading.Thread):
+    """
+    Encodes evidence images and hands them to a writer thread through a bounded queue.
+    store() is called from the worker's plate logging thread: it returns the references right away,
+    before the images reach the disk or bucket, and never blocks.
+    """
+
+    def __init__(self, backend, queue_size: int = EVIDENCE_QUEUE_SIZE,
+                 batch_size: int = EVIDENCE_WRITE_BATCH_SIZE, batch_seconds: float = EVIDENCE_WRITE_BATCH_SECONDS):
+        super().__init__(name="evidence-writer", daemon=True)
+        self.backend = backend
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.queue: Queue = Queue(maxsize=queue_size)
+        self.images_queued = 0
+        self.images_written = 0
+        self.images_deduplicated = 0
+        self.images_dropped = 0
+        self.write_batches = 0
+        self.write_errors = 0
+        self.last_batch_ms = 0.0
+
+    def _submit(self, image, captured_at: datetime) -> str | None:
+        success, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, EVIDENCE_JPEG_QUALITY])
+        if not success:
+            return None
+        data = buffer.tobytes()
+        key = evidence_key(data, captured_at)
+        try:
+            self.queue.put_nowait((key, data))
+        except Full:
+            self.images_dropped += 1
+            return None
+        self.images_queued += 1
+        return self.backend.ref(key)
+
+    def store(self, evidence: list[tuple], captured_at: datetime) -> list[dict | None]:
+        """
+        Queues the images from prepare_evidence() and returns, per detection, {"plate_crop": ref, "context": ref},
+        or None if nothing could be queued. A context frame shared by several detections is encoded once.
+        """
+        if self.backend is None:
+            return [None] * len(evidence)
+        results = []
+        context_refs = {}
+        for crop, context in evidence:
+            if id(context) not in context_refs:
+                context_refs[id(context)] = self._submit(context, captured_at)
+            refs = {"plate_crop": self._submit(crop, captured_at), "context": context_refs[id(context)]}
+            if refs["plate_crop"] is None and refs["context"] is None:
+                logger.warning("Evidence queue is full; a plate log is saved without its images.")
+                refs = None
+            results.append(refs)
+        return results
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.batch_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except Empty:
+                    break
+            start = time.perf_counter()
+            try:
+                written = self.backend.write_batch(batch)
+                self.images_written += written
+                self.images_deduplicated += len(batch) - written
+                self.write_batches += 1
+            except Exception as e:
+                self.write_errors += 1
+                logger.error(f"Failed to write {len(batch)} evidence image(s) to {self.backend.name}: {e}")
+            finally:
+                self.last_batch_ms = (time.perf_counter() - start) * 1000
+                for _ in batch:
+                    self.queue.task_done()
+
+    def get_stats(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend is not None else "none",
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "images_queued": self.images_queued,
+            "images_written": self.images_written,
+            "images_deduplicated": self.images_deduplicated, # Identical images already stored
+            "images_dropped": self.images_dropped, # Refused because the queue was full
+            "write_batches": self.write_batches,
+            "write_errors": self.write_errors,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+        }
+
+
+_evidence_store: EvidenceStore | None = None
+_evidence_store_lock = threading.Lock()
+
+def get_evidence_store() -> EvidenceStore:
+    """Returns the process-wide evidence store, starting its writer thread on first use."""
+    global _evidence_store
+    if _evidence_store is None:
+        with _evidence_store_lock:
+            if _evidence_store is None:
+                _evidence_store = EvidenceStore(create_evidence_backend())
+                _evidence_store.start()
+    return _evidence_store
+
+def get_evidence_store_stats() -> dict | None:
+    """Stats of this process's evidence store, or None if nothing has used it yet. Never starts it."""
+    return _evidence_store.get_stats() if _evidence_store is not None else None
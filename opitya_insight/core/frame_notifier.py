@@ -0,0 +1,55 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FrameNotifier:
+    """
+    Wakes coroutines waiting for a camera's next frame.
+    notify() is called by the stream workers (or the process-mode relay thread) from any thread;
+    the waiting side lives on the API event loop, so an idle camera costs its viewers nothing.
+    """
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None # Bound by the first waiter
+        self._events: dict[int, asyncio.Event] = {}
+
+    def notify(self, camera_id: int):
+        """Signals that camera_id published a frame or changed status. Thread-safe."""
+        loop = self._loop
+        if loop is None or loop.is_closed(): # Nobody has waited yet, so nobody needs waking
+            return
+        try:
+            loop.call_soon_threadsafe(self._notify_in_loop, camera_id)
+        except RuntimeError: # Loop closed between the check and the call during shutdown
+            pass
+
+    def _notify_in_loop(self, camera_id: int):
+        event = self._events.pop(camera_id, None)
+        if event is not None:
+            event.set()
+
+    def next_frame_event(self, camera_id: int) -> asyncio.Event:
+        """
+        Returns the event the camera's next notify() will set. Must be called from the event loop.
+        Take it before checking the frame ring so a frame published in between is not missed.
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        event = self._events.get(camera_id)
+        if event is None:
+            event = self._events[camera_id] = asyncio.Event()
+        return event
+
+    @staticmethod
+    async def wait(event: asyncio.Event, timeout: float) -> bool:
+        """Waits for an event from next_frame_event(). Returns False on timeout."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+frame_notifier = FrameNotifier()
@@ -0,0 +1,126 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Characters the OCR model tends to confuse with each other. Substituting within a group is cheap.
+CONFUSION_GROUPS = ("0OQD", "1IL", "2Z", "4A", "5S", "6G", "7T", "8B")
+CONFUSION_SUBSTITUTION_COST = 0.3
+EDIT_COST = 1.0
+MIN_CHAR_CONFIDENCE = 0.1 # Floor so a very unsure character is cheap to change, but never free
+
+_CANONICAL_CHAR = {char: group[0] for group in CONFUSION_GROUPS for char in group}
+
+
+def normalize_plate(plate_text: str) -> str:
+    """Uppercases and drops everything that is not a letter or digit."""
+    return "".join(char for char in plate_text.upper() if char.isalnum())
+
+def canonical_plate(plate_text: str) -> str:
+    """Maps every confusable character to its group representative, so 'B0L' and '8O1' share a key."""
+    return "".join(_CANONICAL_CHAR.get(char, char) for char in normalize_plate(plate_text))
+
+def _single_deletions(key: str) -> set[str]:
+    return {key[:index] + key[index + 1:] for index in range(len(key))}
+
+def _substitution_cost(observed: str, expected: str) -> float:
+    if observed == expected:
+        return 0.0
+    if _CANONICAL_CHAR.get(observed, observed) == _CANONICAL_CHAR.get(expected, expected):
+        return CONFUSION_SUBSTITUTION_COST
+    return EDIT_COST
+
+def weighted_edit_distance(observed: str, expected: str, char_confidences: list[float] | None = None) -> float:
+    """
+    Levenshtein distance where confusable substitutions are cheap and, when per-character OCR
+    confidences are given, edits to characters the OCR was unsure about cost proportionally less.
+    """
+    def weight(index: int) -> float:
+        if char_confidences is None or index >= len(char_confidences):
+            return 1.0
+        return max(MIN_CHAR_CONFIDENCE, min(1.0, char_confidences[index]))
+
+    previous = [float(column) * EDIT_COST for column in range(len(expected) + 1)]
+    for row, observed_char in enumerate(observed, start=1):
+        char_weight = weight(row - 1)
+        current = [previous[0] + EDIT_COST * char_weight]
+        for column, expected_char in enumerate(expected, start=1):
+            current.append(min(
+                previous[column] + EDIT_COST * char_weight, # Observed character is spurious
+                current[column - 1] + EDIT_COST, # Expected character was missed by the OCR
+                previous[column - 1] + _substitution_cost(observed_char, expected_char) * char_weight,
+            ))
+        previous = current
+    return previous[-1]
+
+
+class FuzzyPlateIndex:
+    """
+    Indexed fuzzy matcher over one owner's watchlist.
+    Plates are keyed by their confusion-canonical form plus every single-character deletion of it
+    (a symmetric-delete index), so candidates within one arbitrary edit plus any number of OCR
+    confusions are found with a handful of dict lookups, independent of watchlist size. Candidates
+    are then scored with the confusion- and confidence-weighted edit distance.
+    """
+
+    def __init__(self, entries=()):
+        self._by_canonical: dict[str, dict[int, dict]] = {} # canonical key -> {entry id: entry}
+        self._by_deletion: dict[str, set[str]] = {} # deletion variant -> canonical keys it came from
+        self._lock = threading.Lock()
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._by_canonical.values())
+
+    def add(self, entry: dict):
+        key = canonical_plate(entry["plate_text"])
+        with self._lock:
+            self._by_canonical.setdefault(key, {})[entry["id"]] = entry
+            for variant in _single_deletions(key):
+                self._by_deletion.setdefault(variant, set()).add(key)
+
+    def remove(self, entry: dict):
+        key = canonical_plate(entry["plate_text"])
+        with self._lock:
+            entries = self._by_canonical.get(key)
+            if not entries or entries.pop(entry["id"], None) is None:
+                return
+            if entries:
+                return
+            del self._by_canonical[key]
+            for variant in _single_deletions(key):
+                keys = self._by_deletion.get(variant)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_deletion[variant]
+
+    def _candidate_keys(self, key: str) -> set[str]:
+        candidates = set()
+        if key in self._by_canonical: # Same plate up to OCR confusions
+            candidates.add(key)
+        candidates.update(self._by_deletion.get(key, ())) # OCR missed one character
+        for variant in _single_deletions(key):
+            if variant in self._by_canonical: # OCR added one character
+                candidates.add(variant)
+            candidates.update(self._by_deletion.get(variant, ())) # One other substitution
+        return candidates
+
+    def search(self, plate_text: str, char_confidences: list[float] | None = None, max_cost: float = EDIT_COST) -> list[tuple[dict, float]]:
+        """Returns [(entry, similarity)] for entries within max_cost of plate_text, best first. Similarity is in [0, 1]."""
+        observed = normalize_plate(plate_text)
+        if not observed:
+            return []
+        key = canonical_plate(observed)
+        with self._lock:
+            candidates = [entry for candidate_key in self._candidate_keys(key) for entry in self._by_canonical[candidate_key].values()]
+
+        matches = []
+        for entry in candidates:
+            expected = normalize_plate(entry["plate_text"])
+            cost = weighted_edit_distance(observed, expected, char_confidences)
+            if cost <= max_cost:
+                matches.append((entry, 1.0 - cost / max(len(observed), len(expected))))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
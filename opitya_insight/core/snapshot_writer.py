@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+from queue import Full, Queue
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_WRITE_QUEUE_SIZE = int(os.getenv("SNAPSHOT_WRITE_QUEUE_SIZE", "64"))
+
+
+class SnapshotWriter(threading.Thread):
+    """
+    Writes snapshot files on its own thread so request handlers never wait on the disk.
+    The queue is bounded: when the disk cannot keep up, new snapshots are refused instead of piling up in memory.
+    """
+
+    def __init__(self, queue_size: int = SNAPSHOT_WRITE_QUEUE_SIZE):
+        super().__init__(name="snapshot-writer", daemon=True)
+        self.queue: Queue = Queue(maxsize=queue_size)
+        self.files_written = 0
+        self.write_errors = 0
+        self.writes_refused = 0
+
+    def submit(self, path: str, data: bytes) -> bool:
+        """Queues data to be written to path. Never blocks; False if the queue is full."""
+        try:
+            self.queue.put_nowait((path, data))
+            return True
+        except Full:
+            self.writes_refused += 1
+            logger.warning(f"Snapshot write queue is full; not saving {path}.")
+            return False
+
+    def run(self):
+        while True:
+            path, data = self.queue.get()
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path) # Readers never see a half-written file
+                self.files_written += 1
+            except OSError as e:
+                self.write_errors += 1
+                logger.error(f"Failed to write snapshot {path}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def get_stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "files_written": self.files_written,
+            "write_errors": self.write_errors,
+            "writes_refused": self.writes_refused,
+        }
+
+
+_snapshot_writer: SnapshotWriter | None = None
+_snapshot_writer_lock = threading.Lock()
+
+def get_snapshot_writer() -> SnapshotWriter:
+    """Returns the process-wide snapshot writer, starting its thread on first use."""
+    global _snapshot_writer
+    if _snapshot_writer is None:
+        with _snapshot_writer_lock:
+            if _snapshot_writer is None:
+                _snapshot_writer = SnapshotWriter()
+                _snapshot_writer.start()
+    return _snapshot_writer
+
+def get_snapshot_writer_stats() -> dict | None:
+    """Stats of this process's snapshot writer, or None if nothing has used it yet. Never starts it."""
+    return _snapshot_writer.get_stats() if _snapshot_writer is not None else None
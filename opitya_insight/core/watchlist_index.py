@@ -0,0 +1,151 @@
+import logging
+import os
+import threading
+
+from database import models
+from database.database import SessionLocal
+from core.plate_matcher import FuzzyPlateIndex
+
+logger = logging.getLogger(__name__)
+
+WATCHLIST_FUZZY_MATCHING = os.getenv("WATCHLIST_FUZZY_MATCHING", "true").lower() == "true"
+WATCHLIST_FUZZY_MAX_COST = float(os.getenv("WATCHLIST_FUZZY_MAX_COST", 0.6)) # Weighted edits allowed between a read and a watchlist plate; below EDIT_COST so only confusable or unsure characters may differ
+WATCHLIST_FUZZY_MIN_SCORE = float(os.getenv("WATCHLIST_FUZZY_MIN_SCORE", 0.8)) # Similarity needed to raise a fuzzy hit
+
+
+def watchlist_entry_to_dict(entry: models.Watchlist) -> dict:
+    """Detached snapshot of a Watchlist row, safe to keep after its session is closed and to send to worker processes."""
+    return {
+        "id": entry.id,
+        "owner_id": entry.owner_id,
+        "plate_text": entry.plate_text,
+        "description": entry.description,
+        "notify_email": entry.notify_email,
+        "notify_sms": entry.notify_sms,
+    }
+
+
+class WatchlistIndex:
+    """
+    Process-wide watchlist lookup, owner_id -> {plate_text: entry}, plus a FuzzyPlateIndex per owner.
+    An owner's entries are loaded from the database on a background thread (preload() at worker startup,
+    or on first use) and then kept up to date incrementally by the watchlist router, so matching a
+    plate never waits for the index to be built.
+    """
+
+    def __init__(self, db_session_factory=SessionLocal):
+        self.db_session_factory = db_session_factory
+        self._owners: dict[int, dict[str, dict]] = {}
+        self._fuzzy: dict[int, FuzzyPlateIndex] = {}
+        self._loading: dict[int, list[tuple]] = {} # owner_id -> changes received while its index is being built
+        self._lock = threading.Lock() # Guards publishing and mutation; lookups read a fully built dict
+
+    def preload(self, owner_id: int):
+        """Starts building the owner's index on a background thread, unless it is loaded or already loading."""
+        with self._lock:
+            if owner_id in self._owners or owner_id in self._loading:
+                return
+            self._loading[owner_id] = []
+        threading.Thread(target=self._load_owner, args=(owner_id,), name=f"watchlist-load-{owner_id}", daemon=True).start()
+
+    def _load_owner(self, owner_id: int):
+        try:
+            # The query and the index build (seconds for a large watchlist) run without the lock
+            db = self.db_session_factory()
+            try:
+                rows = db.query(models.Watchlist).filter(models.Watchlist.owner_id == owner_id).all()
+                entries = {row.plate_text: watchlist_entry_to_dict(row) for row in rows}
+            finally:
+                db.close()
+            fuzzy_index = FuzzyPlateIndex(entries.values())
+        except Exception as e:
+            logger.error(f"Failed to load the watchlist of user {owner_id}: {e}")
+            with self._lock:
+                self._loading.pop(owner_id, None) # The next lookup retries
+            return
+        with self._lock:
+            # Replay the changes that raced with the query, then swap the finished index in
+            for change in self._loading.pop(owner_id, []):
+                self._apply(entries, fuzzy_index, *change)
+            self._fuzzy[owner_id] = fuzzy_index
+            self._owners[owner_id] = entries
+        logger.info(f"Loaded {len(entries)} watchlist entries for user {owner_id} into the index.")
+
+    def entries(self, owner_id: int) -> dict[str, dict] | None:
+        """Returns the owner's {plate_text: entry} map, or None while it is still being loaded."""
+        entries = self._owners.get(owner_id)
+        if entries is None:
+            self.preload(owner_id)
+        return entries
+
+    def _query_plate(self, owner_id: int, plate_text: str) -> dict | None:
+        db = self.db_session_factory()
+        try:
+            row = db.query(models.Watchlist).filter(models.Watchlist.owner_id == owner_id, models.Watchlist.plate_text == plate_text).first()
+            return watchlist_entry_to_dict(row) if row is not None else None
+        finally:
+            db.close()
+
+    def lookup(self, owner_id: int, plate_text: str) -> dict | None:
+        """O(1) exact match of a plate against the owner's watchlist; a single-row query until the index is loaded."""
+        entries = self.entries(owner_id)
+        if entries is None:
+            return self._query_plate(owner_id, plate_text)
+        return entries.get(plate_text)
+
+    def match(self, owner_id: int, plate_text: str, char_confidences: list[float] | None = None) -> tuple[dict, float] | None:
+        """
+        Returns (entry, similarity) for the best watchlist hit, or None.
+        An exact match scores 1.0; otherwise the fuzzy index is searched for plates within
+        WATCHLIST_FUZZY_MAX_COST weighted edits, e.g. a 0/O or 8/B misread or an unsure character.
+        """
+        entry = self.lookup(owner_id, plate_text)
+        if entry is not None:
+            return entry, 1.0
+        if not WATCHLIST_FUZZY_MATCHING:
+            return None
+        fuzzy_index = self._fuzzy.get(owner_id)
+        if fuzzy_index is None: # Still loading; exact matches only until then
+            return None
+        matches = fuzzy_index.search(plate_text, char_confidences, WATCHLIST_FUZZY_MAX_COST)
+        if matches and matches[0][1] >= WATCHLIST_FUZZY_MIN_SCORE:
+            return matches[0]
+        return None
+
+    @staticmethod
+    def _apply(entries: dict[str, dict], fuzzy_index: FuzzyPlateIndex, action: str, *args):
+        if action == "upsert":
+            entry, old_plate_text = args
+            if old_plate_text is not None and entries.get(old_plate_text, {}).get("id") == entry["id"]:
+                fuzzy_index.remove(entries.pop(old_plate_text))
+            if entry["plate_text"] in entries:
+                fuzzy_index.remove(entries[entry["plate_text"]])
+            entries[entry["plate_text"]] = entry
+            fuzzy_index.add(entry)
+        elif action == "remove":
+            plate_text, entry_id = args
+            if entries.get(plate_text, {}).get("id") == entry_id:
+                fuzzy_index.remove(entries.pop(plate_text))
+
+    def _change(self, owner_id: int, action: str, *args):
+        with self._lock:
+            pending = self._loading.get(owner_id)
+            if pending is not None: # Applied once the index being built is swapped in
+                pending.append((action, *args))
+                return
+            entries = self._owners.get(owner_id)
+            if entries is None: # Never loaded; it loads fresh on first lookup
+                return
+            updated = dict(entries) # Copy-on-write so lock-free lookups never see a half-applied change
+            self._apply(updated, self._fuzzy[owner_id], action, *args)
+            self._owners[owner_id] = updated
+
+    def upsert(self, entry: dict, old_plate_text: str | None = None):
+        """Adds or updates an entry. Owners that were never loaded are skipped; they load fresh on first lookup."""
+        self._change(entry["owner_id"], "upsert", entry, old_plate_text)
+
+    def remove(self, owner_id: int, plate_text: str, entry_id: int):
+        self._change(owner_id, "remove", plate_text, entry_id)
+
+
+watchlist_index = WatchlistIndex()
@@ -1,24 +1,310 @@
 import logging
+import multiprocessing
+import os
 import threading
 import inspect
 from datetime import datetime
+from queue import Empty
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
 
 from database import models
 from database.database import SessionLocal
 from processing.stream_worker import StreamWorker
+from processing.inference_engine import get_inference_engine
+from processing.rate_controller import CPU_BUDGET_PER_CAMERA
+from processing.batch_scheduler import get_detection_scheduler
+from processing.frame_ring import FrameRing
+from processing.frame_renderer import frame_slot_bytes
+from processing.snapshot_recorder import SNAPSHOT_RING_SLOTS, snapshot_slot_bytes
+from core.worker_process import run_worker_group
+from core.frame_notifier import frame_notifier
+from core.watchlist_index import watchlist_index
+from core.cpu_budget import available_cores, cpu_usage_monitor, inference_concurrency_limit, plan_thread_budget
 
 logger = logging.getLogger(__name__)
 
+# "thread" runs every camera as a thread of the API process; "process" runs cameras in separate
+# worker processes (CAMERAS_PER_PROCESS per process) so they are not bound by the API process's GIL
+WORKER_MODE = os.getenv("WORKER_MODE", "thread")
+CAMERAS_PER_PROCESS = int(os.getenv("CAMERAS_PER_PROCESS", "1"))
+WORKER_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("WORKER_SHUTDOWN_TIMEOUT_SECONDS", "30")) # Grace period before a worker process is terminated
+
 # Global dictionary to keep track of active stream workers
-active_stream_workers: dict[int, StreamWorker] = {}
+active_stream_workers: dict[int, "StreamWorker | ProcessStreamWorker"] = {}
 # Global dictionary to hold the latest processed data for each camera
-latest_camera_data: dict[int, dict] = {} # Stores {'image': bytes, 'plates': list, 'timestamp': datetime, 'latency_ms': int, 'cpu_usage': float}
+latest_camera_data: dict[int, dict] = {} # Stores {'seq': int, 'plates': list, 'timestamp': datetime, 'latency': float, ...}; frames live in frame_rings
+# Shared-memory ring of encoded frames per camera. Readers go through get_latest_frame() and never need the manager lock.
+frame_rings: dict[int, FrameRing] = {}
+# Shared-memory ring of recent raw frames per camera, timestamped, for snapshots. Read through get_snapshot().
+snapshot_rings: dict[int, FrameRing] = {}
 
 # Lock for synchronizing access to active_stream_workers and latest_camera_data
 _worker_manager_lock = threading.Lock()
 
+# Caps detection + OCR calls running at once across this process and every worker process, so
+# many cameras on a small box queue for a core instead of oversubscribing it
+_inference_concurrency = inference_concurrency_limit()
+_inference_slots = multiprocessing.get_context("spawn").BoundedSemaphore(_inference_concurrency)
+_thread_budget: dict = {} # Last plan from plan_thread_budget(), see _rebalance_cpu_budgets()
+
+
+class _WorkerProcessGroup:
+    """
+    A stream worker process hosting up to CAMERAS_PER_PROCESS cameras, plus the thread in the
+    API process that relays its notifications to the camera handles.
+    """
+
+    def __init__(self):
+        context = multiprocessing.get_context("spawn") # Forking a process that already runs torch threads is unsafe
+        self.command_queue = context.Queue()
+        self.event_queue = context.Queue()
+        self.handles: dict[int, ProcessStreamWorker] = {}
+        self.stats: dict = {}
+        self.process = context.Process(target=run_worker_group, args=(self.command_queue, self.event_queue, _inference_slots), daemon=True)
+        self.process.start()
+        self._event_thread = threading.Thread(target=self._relay_events, daemon=True)
+        self._event_thread.start()
+        logger.info(f"Started stream worker process {self.process.pid}.")
+
+    def _relay_events(self):
+        while self.process.is_alive() or not self.event_queue.empty():
+            try:
+                event = self.event_queue.get(timeout=1)
+            except Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            kind = event[0]
+            if kind == "frame":
+                handle = self.handles.get(event[1])
+                if handle is not None:
+                    handle._on_frame(event[2])
+            elif kind == "stopped":
+                handle = self.handles.pop(event[1], None)
+                if handle is not None:
+                    handle._on_stopped()
+            elif kind == "stats":
+                self.stats = event[2]
+
+        # The process is gone; none of its cameras will report anything anymore
+        logger.warning(f"Stream worker process {self.process.pid} exited with code {self.process.exitcode}.")
+        for camera_id in list(self.handles.keys()):
+            self.handles.pop(camera_id)._on_stopped()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def send(self, *command):
+        self.command_queue.put(command)
+
+    def shutdown(self, timeout: float = WORKER_SHUTDOWN_TIMEOUT_SECONDS):
+        """Asks the process to stop its cameras and exit; it is only terminated if it has not exited after timeout."""
+        if self.process.is_alive():
+            self.send("shutdown")
+            self.process.join(timeout)
+            if self.process.is_alive():
+                # A slot it holds is lost; other workers fall back to INFERENCE_SLOT_TIMEOUT_SECONDS instead of hanging
+                logger.warning(f"Stream worker process {self.process.pid} did not exit in {timeout}s; terminating it.")
+                self.process.terminate()
+                self.process.join()
+        logger.info(f"Stream worker process {self.process.pid} shut down.")
+
+
+class ProcessStreamWorker:
+    """
+    API-process handle for a camera whose StreamWorker runs in a worker process.
+    Mirrors the parts of the StreamWorker thread API the manager and routers use. Encoded frames
+    and their metadata are read from the camera's shared-memory FrameRing, never pickled.
+    """
+
+    def __init__(self, camera_id: int, rtsp_url: str, group: _WorkerProcessGroup, shared_data: dict, frame_ring: FrameRing, snapshot_ring: FrameRing):
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.group = group
+        self.shared_data = shared_data
+        self.frame_ring = frame_ring
+        self.snapshot_ring = snapshot_ring
+        self._last_seq = 0
+        self._stopped = threading.Event()
+
+    def start(self):
+        self.group.handles[self.camera_id] = self
+        self.group.send("start", self.camera_id, self.rtsp_url, self.frame_ring.name, self.snapshot_ring.name)
+
+    def _on_frame(self, seq: int):
+        if seq <= self._last_seq: # A newer frame was already picked up
+            return
+        packet = self.frame_ring.read_latest(min_seq=seq)
+        if packet is None:
+            return
+        self._last_seq = packet.seq
+        frame_data = packet.meta # Only the metadata is materialized; readers take the frame from the ring
+        frame_data["seq"] = packet.seq
+        self.shared_data[self.camera_id] = frame_data
+        frame_notifier.notify(self.camera_id)
+
+    def _on_stopped(self):
+        self._stopped.set()
+        if self.camera_id in self.shared_data:
+            self.shared_data[self.camera_id]["status"] = "offline"
+            self.shared_data[self.camera_id]["plates"] = [] # Clear plates
+        frame_notifier.notify(self.camera_id) # Wake viewers so they see the offline status
+
+    def is_alive(self) -> bool:
+        return not self._stopped.is_set() and self.group.is_alive()
+
+    def set_cpu_budget(self, cpu_budget: float):
+        self.group.send("cpu_budget", self.camera_id, cpu_budget)
+
+    def update_config(self, config: dict):
+        self.group.send("camera_config", self.camera_id, config)
+
+    def stop(self):
+        if self.is_alive():
+            self.group.send("stop", self.camera_id)
+
+    def join(self, timeout: float | None = None):
+        self._stopped.wait(timeout)
+
+
+_worker_process_groups: list[_WorkerProcessGroup] = []
+_detection_scheduler_config: dict = {} # Last admin override, replayed to worker processes started later
+
+def _get_worker_process_group() -> _WorkerProcessGroup:
+    """Returns a live worker process with room for another camera, starting a new one if needed. Caller holds _worker_manager_lock."""
+    _worker_process_groups[:] = [group for group in _worker_process_groups if group.is_alive()]
+    for group in _worker_process_groups:
+        if len(group.handles) < CAMERAS_PER_PROCESS:
+            return group
+    group = _WorkerProcessGroup()
+    if _detection_scheduler_config:
+        group.send("detection_scheduler", _detection_scheduler_config["max_batch_size"], _detection_scheduler_config["max_wait_ms"])
+    _worker_process_groups.append(group)
+    return group
+
+def _shutdown_idle_worker_processes():
+    """Shuts down worker processes that no longer host any camera. Caller holds _worker_manager_lock."""
+    for group in [group for group in _worker_process_groups if not group.handles]:
+        group.shutdown()
+        _worker_process_groups.remove(group)
+
+def publish_watchlist_change(action: str, *args):
+    """
+    Applies a watchlist change to this process's index and forwards it to every worker process.
+    action is "upsert" (entry, old_plate_text) or "remove" (owner_id, plate_text, entry_id).
+    """
+    getattr(watchlist_index, action)(*args)
+    if WORKER_MODE == "process":
+        with _worker_manager_lock:
+            for group in _worker_process_groups:
+                group.send("watchlist", action, args)
+
+def get_latest_frame(camera_id: int, min_seq: int = 1):
+    """
+    Returns the newest FramePacket for a camera (or None), whose image is a zero-copy view into
+    the camera's shared-memory ring. Safe to call from any thread or coroutine without locking.
+    """
+    frame_ring = frame_rings.get(camera_id)
+    if frame_ring is None:
+        return None
+    return frame_ring.read_latest(min_seq=min_seq)
+
+def get_snapshot(camera_id: int, timestamp: float | None = None):
+    """
+    Returns a copied FramePacket holding a raw JPEG snapshot of the camera: the newest one, or the one
+    recorded closest to timestamp (seconds since the epoch). None if the camera has no snapshot history.
+    Reads shared memory only, so it takes microseconds in both worker modes.
+    """
+    snapshot_ring = snapshot_rings.get(camera_id)
+    if snapshot_ring is None:
+        return None
+    if timestamp is None:
+        return snapshot_ring.read_latest(copy=True)
+    return snapshot_ring.read_nearest(timestamp)
+
+def get_snapshot_range(camera_id: int) -> tuple[float, float] | None:
+    """(oldest, newest) capture time of the camera's snapshot history, or None if it is empty."""
+    snapshot_ring = snapshot_rings.get(camera_id)
+    return snapshot_ring.recorded_range() if snapshot_ring is not None else None
+
+def set_stream_demand(camera_id: int, viewers: dict[str, int]):
+    """
+    Tells the camera's worker how many viewers each rendition has ({"thumb": 3, "full": 1}).
+    It encodes only the renditions somebody watches, and with no viewers stops annotating and encoding frames.
+    """
+    frame_ring = frame_rings.get(camera_id)
+    if frame_ring is not None:
+        frame_ring.set_viewers(viewers)
+
+def get_worker_process_stats() -> dict:
+    """Latest scheduler and evidence writer stats reported by each worker process, keyed by pid."""
+    return {
+        group.process.pid: {"cameras": sorted(group.handles.keys()), **group.stats}
+        for group in _worker_process_groups
+    }
+
+def configure_detection_scheduler(max_batch_size: int | None = None, max_wait_ms: float | None = None):
+    """Applies detection batching settings to this process and every worker process."""
+    if WORKER_MODE == "process":
+        with _worker_manager_lock:
+            _detection_scheduler_config.update(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+            for group in _worker_process_groups:
+                group.send("detection_scheduler", max_batch_size, max_wait_ms)
+    else:
+        get_detection_scheduler().configure(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+def update_stream_worker_config(camera_id: int, config: dict):
+    """Pushes a camera's updated config (see camera_config_to_dict) into its running worker, if any."""
+    with _worker_manager_lock:
+        worker = active_stream_workers.get(camera_id)
+    if worker is not None and worker.is_alive():
+        worker.update_config(config)
+
+def _rebalance_thread_budget():
+    """
+    Gives every inference engine (one per process) its share of intra-op threads, so the engines
+    that can run at once use the cores without oversubscribing them. Caller holds _worker_manager_lock.
+    """
+    global _thread_budget
+    if WORKER_MODE == "process":
+        live_groups = [group for group in _worker_process_groups if group.is_alive()]
+        plan = plan_thread_budget(len(live_groups))
+        for group in live_groups: # Sent to all, so a freshly started process gets the current plan too
+            group.send("threads", plan["intra_op_threads"])
+    else:
+        plan = plan_thread_budget(1)
+        engine = get_inference_engine()
+        engine.set_inference_slots(_inference_slots)
+        engine.set_threads(plan["intra_op_threads"])
+    if plan != _thread_budget:
+        logger.info(f"Thread budget: {plan['intra_op_threads']} intra-op threads per call for {plan['inference_engines']} engine(s), "
+                    f"at most {plan['max_concurrency']} concurrent inference calls on {plan['cores']} cores.")
+    _thread_budget = plan
+
+def _rebalance_cpu_budgets():
+    """Splits the machine's cores between running cameras so each worker's rate controller knows its share. Caller holds _worker_manager_lock."""
+    _rebalance_thread_budget()
+    running_workers = [worker for worker in active_stream_workers.values() if worker.is_alive()]
+    if not running_workers:
+        return
+    cpu_budget = min(CPU_BUDGET_PER_CAMERA, available_cores() / len(running_workers))
+    for worker in running_workers:
+        worker.set_cpu_budget(cpu_budget)
+    logger.info(f"CPU budget per camera set to {cpu_budget:.2f} cores for {len(running_workers)} running cameras.")
+
+def get_cpu_budget_stats() -> dict:
+    """Current thread plan, how many inference slots are busy, and per-core utilization since the last call."""
+    try:
+        slots_in_use = _inference_concurrency - _inference_slots.get_value()
+    except NotImplementedError: # sem_getvalue is missing on macOS
+        slots_in_use = None
+    return {
+        "thread_budget": _thread_budget,
+        "inference_slots": {"limit": _inference_concurrency, "in_use": slots_in_use, "timeouts": get_inference_engine().inference_slot_timeouts},
+        "cpu_usage": cpu_usage_monitor.sample(),
+    }
+
 def _stop_stream_worker_instance(camera_id: int):
     with _worker_manager_lock:
         if camera_id in active_stream_workers:
@@ -26,19 +312,29 @@ def _stop_stream_worker_instance(camera_id: int):
             worker.stop()
             worker.join() # Wait for the thread to finish
             del active_stream_workers[camera_id]
+            for ring in (frame_rings.pop(camera_id, None), snapshot_rings.pop(camera_id, None)):
+                if ring is not None:
+                    ring.unlink()
+            frame_notifier.notify(camera_id) # Wake viewers so they notice the stream is gone
             # Also remove from latest_camera_data
             if camera_id in latest_camera_data:
                 del latest_camera_data[camera_id]
+            _shutdown_idle_worker_processes()
+            _rebalance_cpu_budgets()
             logger.info(f"Stream worker for camera {camera_id} stopped and removed.")
         else:
             logger.warning(f"No active stream worker found for camera {camera_id}. It might have already stopped or never started.")
 
 def _stop_all_stream_workers_instances():
     logger.info("Stopping all active stream workers...")
-    # Iterate over a copy of keys to avoid RuntimeError due to dictionary size change during iteration
+    # Iterate over a copy of keys to avoid RuntimeError due to dictionary size change during iteration.
+    # _stop_stream_worker_instance takes the lock itself, so it must not be held here.
+    with _worker_manager_lock:
+        camera_ids = list(active_stream_workers.keys())
+    for camera_id in camera_ids:
+        _stop_stream_worker_instance(camera_id)
     with _worker_manager_lock:
-        for camera_id in list(active_stream_workers.keys()):
-            _stop_stream_worker_instance(camera_id)
+        _shutdown_idle_worker_processes()
     logger.info("All stream workers stopped.")
 
 def _start_stream_worker_instance(camera_id: int, rtsp_url: str, db_session_factory, shared_data: dict):
@@ -48,9 +344,31 @@ def _start_stream_worker_instance(camera_id: int, rtsp_url: str, db_session_fact
             logger.warning(f"Stream worker for camera {camera_id} is already running.")
             return
 
-        worker = StreamWorker(camera_id, rtsp_url, db_session_factory, shared_data)
+        for ring in (frame_rings.pop(camera_id, None), snapshot_rings.pop(camera_id, None)):
+            if ring is not None: # Left over from a worker that exited on its own
+                ring.unlink()
+        try:
+            frame_ring = frame_rings[camera_id] = FrameRing.create(camera_id, slot_bytes=frame_slot_bytes())
+            snapshot_ring = snapshot_rings[camera_id] = FrameRing.create(camera_id, slot_count=SNAPSHOT_RING_SLOTS, slot_bytes=snapshot_slot_bytes())
+        except OSError as e:
+            logger.error(f"Cannot start stream worker for camera {camera_id}: {e}")
+            ring = frame_rings.pop(camera_id, None)
+            if ring is not None:
+                ring.unlink()
+            return None
+
+        if WORKER_MODE == "process":
+            worker = ProcessStreamWorker(camera_id, rtsp_url, _get_worker_process_group(), shared_data, frame_ring, snapshot_ring)
+        else:
+            worker = StreamWorker(
+                camera_id, rtsp_url, db_session_factory, shared_data,
+                frame_ring=frame_ring,
+                on_frame=lambda seq, camera_id=camera_id: frame_notifier.notify(camera_id), # Push to waiting viewers
+                snapshot_ring=snapshot_ring,
+            )
         active_stream_workers[camera_id] = worker
         worker.start()
+        _rebalance_cpu_budgets()
         logger.info(f"Stream worker for camera {camera_id} started.")
         return worker
 
@@ -58,6 +376,11 @@ def initialize_persistent_workers():
     """Starts persistent stream workers for all active cameras on application startup."""
     _stop_all_stream_workers_instances() # Ensure no old workers are running
     logger.info(f"_start_stream_worker_instance signature on startup: {inspect.signature(_start_stream_worker_instance)}")
+
+    # Load the shared models once up front so N cameras do not trigger N model loads.
+    # In process mode each worker process loads its own copy instead.
+    if WORKER_MODE != "process" and not get_inference_engine().load():
+        logger.error("Shared inference engine failed to load on startup. Stream workers will report offline.")
     
     db = SessionLocal()
     try:
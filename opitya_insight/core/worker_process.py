@@ -0,0 +1,115 @@
+import logging
+import os
+import time
+from queue import Empty
+
+logger = logging.getLogger(__name__)
+
+STATS_INTERVAL_SECONDS = 5
+
+
+def run_worker_group(command_queue, event_queue, inference_slots=None):
+    """
+    Entry point of a stream worker process. Hosts the StreamWorkers of a group of cameras,
+    with their own copy of the models, and takes commands from the API process:
+    ("start", camera_id, rtsp_url, ring_name, snapshot_ring_name), ("stop", camera_id), ("cpu_budget", camera_id, budget),
+    ("detection_scheduler", max_batch_size, max_wait_ms), ("watchlist", action, args),
+    ("camera_config", camera_id, config), ("threads", intra_op_threads), ("shutdown",).
+    inference_slots is the API process's semaphore capping concurrent inference calls machine-wide.
+    Frames go back through each camera's FrameRing; event_queue only carries small notifications:
+    ("frame", camera_id, seq), ("stopped", camera_id), ("stats", pid, stats).
+    """
+    logging.basicConfig(level=logging.INFO)
+
+    # Imported here so the parent does not pay for them when it only spawns the process
+    from database.database import SessionLocal
+    from processing.stream_worker import StreamWorker
+    from processing.frame_ring import FrameRing
+    from processing.batch_scheduler import get_detection_scheduler, get_scheduler_stats
+    from core.watchlist_index import watchlist_index
+    from processing.inference_engine import get_inference_engine
+    from core.evidence_store import get_evidence_store_stats
+
+    pid = os.getpid()
+    workers: dict[int, StreamWorker] = {}
+    rings: dict[int, FrameRing] = {}
+    snapshot_rings: dict[int, FrameRing] = {}
+    shared_data: dict[int, dict] = {} # Local only; frames reach the API process through the rings
+    logger.info(f"Stream worker process {pid} started.")
+    get_inference_engine().set_inference_slots(inference_slots)
+
+    def stop_camera(camera_id: int):
+        worker = workers.pop(camera_id, None)
+        if worker is not None:
+            worker.stop()
+            worker.join()
+        for ring in (rings.pop(camera_id, None), snapshot_rings.pop(camera_id, None)):
+            if ring is not None:
+                ring.close()
+        event_queue.put(("stopped", camera_id))
+
+    last_stats_time = time.monotonic()
+    running = True
+    while running:
+        try:
+            command = command_queue.get(timeout=1)
+        except Empty:
+            command = None
+
+        if command is not None:
+            action = command[0]
+            try:
+                if action == "start":
+                    _, camera_id, rtsp_url, ring_name, snapshot_ring_name = command
+                    if camera_id in workers and workers[camera_id].is_alive():
+                        logger.warning(f"Stream worker for camera {camera_id} is already running in process {pid}.")
+                    else:
+                        ring = FrameRing.attach(ring_name)
+                        rings[camera_id] = ring
+                        snapshot_ring = snapshot_rings[camera_id] = FrameRing.attach(snapshot_ring_name)
+                        worker = StreamWorker(
+                            camera_id, rtsp_url, SessionLocal, shared_data,
+                            frame_ring=ring,
+                            on_frame=lambda seq, camera_id=camera_id: event_queue.put(("frame", camera_id, seq)),
+                            snapshot_ring=snapshot_ring,
+                        )
+                        workers[camera_id] = worker
+                        worker.start()
+                        logger.info(f"Stream worker for camera {camera_id} started in process {pid}.")
+                elif action == "stop":
+                    stop_camera(command[1])
+                elif action == "cpu_budget":
+                    _, camera_id, cpu_budget = command
+                    if camera_id in workers:
+                        workers[camera_id].set_cpu_budget(cpu_budget)
+                elif action == "camera_config":
+                    _, camera_id, config = command
+                    if camera_id in workers:
+                        workers[camera_id].update_config(config)
+                elif action == "threads":
+                    get_inference_engine().set_threads(command[1])
+                elif action == "detection_scheduler":
+                    _, max_batch_size, max_wait_ms = command
+                    get_detection_scheduler().configure(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+                elif action == "watchlist":
+                    _, watchlist_action, args = command
+                    if watchlist_action in ("upsert", "remove"):
+                        getattr(watchlist_index, watchlist_action)(*args)
+                elif action == "shutdown":
+                    running = False
+                else:
+                    logger.warning(f"Unknown worker process command: {command}")
+            except Exception as e:
+                logger.error(f"Error handling worker process command {command}: {e}", exc_info=True)
+
+        # Report cameras whose worker exited on its own, e.g. the stream could not be reconnected
+        for camera_id in [camera_id for camera_id, worker in workers.items() if not worker.is_alive()]:
+            stop_camera(camera_id)
+
+        if time.monotonic() - last_stats_time >= STATS_INTERVAL_SECONDS:
+            event_queue.put(("stats", pid, {"schedulers": get_scheduler_stats(), "inference_slot_timeouts": get_inference_engine().inference_slot_timeouts, "evidence": get_evidence_store_stats()}))
+            last_stats_time = time.monotonic()
+
+    for camera_id in list(workers.keys()):
+        stop_camera(camera_id)
+    logger.info(f"Stream worker process {pid} finished.")
@@ -0,0 +1,82 @@
+"""
+Exports LP-detection.pt to ONNX for the onnx / openvino detector backends.
+
+Run from the opitya_insight directory (needs ultralytics + torch, unlike the runtime backends):
+    python export_detector.py                                  # models/weights/LP-detection.onnx
+    python export_detector.py --int8 --calibration-dir ../runs # plus an INT8 copy, statically calibrated
+    python export_detector.py --int8                           # INT8 with dynamic quantization (no images needed)
+
+Then deploy with DETECTOR_BACKEND=onnx (or openvino) and, for the INT8 model,
+DETECTION_ONNX_PATH=models/weights/LP-detection-int8.onnx.
+"""
+import argparse
+import pathlib
+import shutil
+
+import cv2
+
+from processing.detector_backends import WEIGHTS_DIR
+from processing.letterbox import LetterboxBuffer
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+class _CalibrationReader:
+    """Feeds letterboxed images to onnxruntime's static quantization, preprocessed exactly as at runtime."""
+
+    def __init__(self, input_name: str, image_paths: list, imgsz: int):
+        self.input_name = input_name
+        self.image_paths = iter(image_paths)
+        self.letterbox = LetterboxBuffer(imgsz)
+
+    def get_next(self):
+        for path in self.image_paths:
+            frame = cv2.imread(str(path))
+            if frame is not None:
+                batch, _ = self.letterbox.prepare([frame])
+                return {self.input_name: batch.copy()}
+        return None
+
+
+def quantize(model_path: pathlib.Path, output_path: pathlib.Path, calibration_dir: pathlib.Path | None, imgsz: int, max_images: int):
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_dynamic, quantize_static
+
+    if calibration_dir is None:
+        quantize_dynamic(str(model_path), str(output_path), weight_type=QuantType.QUInt8)
+        print(f"Dynamically quantized INT8 model written to {output_path}")
+        return
+
+    image_paths = sorted(path for path in calibration_dir.rglob("*") if path.suffix.lower() in IMAGE_SUFFIXES)[:max_images]
+    if not image_paths:
+        raise SystemExit(f"No calibration images found under {calibration_dir}")
+    input_name = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    quantize_static(
+        str(model_path), str(output_path), _CalibrationReader(input_name, image_paths, imgsz),
+        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+    )
+    print(f"Statically quantized INT8 model ({len(image_paths)} calibration images) written to {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights", type=pathlib.Path, default=WEIGHTS_DIR / "LP-detection.pt")
+    parser.add_argument("--output", type=pathlib.Path, default=WEIGHTS_DIR / "LP-detection.onnx")
+    parser.add_argument("--imgsz", type=int, default=640, help="Export size; the model stays dynamic, so cameras may still use other sizes")
+    parser.add_argument("--int8", action="store_true", help="Also write an INT8-quantized copy next to --output")
+    parser.add_argument("--calibration-dir", type=pathlib.Path, help="Images for static INT8 calibration (dynamic quantization if omitted)")
+    parser.add_argument("--calibration-images", type=int, default=200)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    # Dynamic batch and spatial dims so one file serves every camera's imgsz and cross-camera batches
+    exported = pathlib.Path(YOLO(str(args.weights)).export(format="onnx", imgsz=args.imgsz, dynamic=True, simplify=True))
+    if exported.resolve() != args.output.resolve():
+        shutil.move(str(exported), str(args.output))
+    print(f"ONNX model written to {args.output}")
+
+    if args.int8:
+        quantize(args.output, args.output.with_name(f"{args.output.stem}-int8.onnx"), args.calibration_dir, args.imgsz, args.calibration_images)
+
+
+if __name__ == "__main__":
+    main()
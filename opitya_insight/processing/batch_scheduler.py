@@ -0,0 +1,265 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from processing.inference_engine import get_inference_engine
+
+logger = logging.getLogger(__name__)
+
+# Defaults can be overridden per deployment and tuned at runtime from the admin settings
+DETECTION_MAX_BATCH_SIZE = int(os.getenv("DETECTION_MAX_BATCH_SIZE", "4"))
+DETECTION_MAX_WAIT_MS = float(os.getenv("DETECTION_MAX_WAIT_MS", "15"))
+OCR_MAX_BATCH_SIZE = int(os.getenv("OCR_MAX_BATCH_SIZE", "32"))
+OCR_MAX_WAIT_MS = float(os.getenv("OCR_MAX_WAIT_MS", "5"))
+
+
+class _BatchRequest:
+    __slots__ = ("key", "items", "future", "submitted_at")
+
+    def __init__(self, key, items: list):
+        self.key = key
+        self.items = items
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+class BatchScheduler(threading.Thread):
+    """
+    Collects inference requests from many camera threads and runs them as one batch.
+    A batch is dispatched when it reaches max_batch_size items, when every registered
+    camera has a request pending, or when the oldest request has waited max_wait_ms.
+    batch_fn receives a flat list of items and must return one output per item.
+    """
+
+    def __init__(self, name: str, batch_fn, max_batch_size: int, max_wait_ms: float, stats_window: int = 500):
+        super().__init__(name=f"{name}-batch-scheduler", daemon=True)
+        self.scheduler_name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.running = True
+
+        self._condition = threading.Condition()
+        self._pending: deque[_BatchRequest] = deque()
+        self._pending_by_key: dict = {} # Latest pending request per key, e.g. one frame per camera
+        self._registered_keys: set = set()
+
+        # Stats
+        self._recent_batches = deque(maxlen=stats_window) # (batch_size, inference_ms, queue_wait_ms)
+        self._batches_total = 0
+        self._items_total = 0
+        self._superseded_total = 0
+
+    # --- Client API ---
+
+    def register(self, key):
+        """Marks key (a camera) as active so a batch can be dispatched as soon as every active camera has submitted."""
+        with self._condition:
+            self._registered_keys.add(key)
+            self._condition.notify()
+
+    def unregister(self, key):
+        with self._condition:
+            self._registered_keys.discard(key)
+            self._condition.notify()
+
+    def submit(self, items: list, key=None) -> Future:
+        """
+        Queues items for the next batch and returns a Future resolving to their outputs in order.
+        A newer submission for the same key replaces a still-pending older one, whose Future is cancelled.
+        """
+        request = _BatchRequest(key, items)
+        with self._condition:
+            if not self.running:
+                request.future.set_exception(RuntimeError(f"{self.scheduler_name} scheduler is stopped."))
+                return request.future
+            if key is not None:
+                stale = self._pending_by_key.get(key)
+                if stale is not None:
+                    self._pending.remove(stale)
+                    stale.future.cancel()
+                    self._superseded_total += 1
+                self._pending_by_key[key] = request
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+
+    def configure(self, max_batch_size: int | None = None, max_wait_ms: float | None = None):
+        with self._condition:
+            if max_batch_size is not None:
+                self.max_batch_size = max(1, int(max_batch_size))
+            if max_wait_ms is not None:
+                self.max_wait_ms = max(0.0, float(max_wait_ms))
+            self._condition.notify()
+        logger.info(f"{self.scheduler_name} scheduler configured: max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms}")
+
+    def stop(self):
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
+
+    # --- Scheduling ---
+
+    def _pending_item_count(self) -> int:
+        return sum(len(request.items) for request in self._pending)
+
+    def _batch_ready(self) -> bool:
+        if self._pending_item_count() >= self.max_batch_size:
+            return True
+        # Every active camera already has a frame waiting, so there is nothing more to wait for
+        if self._registered_keys and self._registered_keys.issubset(self._pending_by_key.keys()):
+            return True
+        return False
+
+    def _take_batch(self) -> list[_BatchRequest]:
+        batch = []
+        item_count = 0
+        while self._pending:
+            request = self._pending[0]
+            if batch and item_count + len(request.items) > self.max_batch_size:
+                break
+            self._pending.popleft()
+            if request.key is not None and self._pending_by_key.get(request.key) is request:
+                del self._pending_by_key[request.key]
+            batch.append(request)
+            item_count += len(request.items)
+        return batch
+
+    def run(self):
+        logger.info(f"{self.scheduler_name} batch scheduler started (max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms}).")
+        while True:
+            with self._condition:
+                while self.running and not self._pending:
+                    self._condition.wait()
+                if not self.running:
+                    break
+
+                deadline = self._pending[0].submitted_at + self.max_wait_ms / 1000
+                while self.running and not self._batch_ready():
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if not self.running:
+                    break
+                batch = self._take_batch()
+
+            self._run_batch(batch)
+
+        # Fail anything still queued so no camera thread waits forever
+        with self._condition:
+            while self._pending:
+                self._pending.popleft().future.set_exception(RuntimeError(f"{self.scheduler_name} scheduler is stopped."))
+            self._pending_by_key.clear()
+        logger.info(f"{self.scheduler_name} batch scheduler stopped.")
+
+    def _run_batch(self, batch: list[_BatchRequest]):
+        items = [item for request in batch for item in request.items]
+        if not items:
+            for request in batch:
+                request.future.set_result([])
+            return
+
+        dispatch_time = time.perf_counter()
+        queue_wait_ms = (dispatch_time - min(request.submitted_at for request in batch)) * 1000
+        try:
+            outputs = list(self.batch_fn(items))
+            if len(outputs) != len(items):
+                raise RuntimeError(f"{self.scheduler_name} batch returned {len(outputs)} outputs for {len(items)} items.")
+        except Exception as e:
+            logger.error(f"Error running {self.scheduler_name} batch of {len(items)} items: {e}", exc_info=True)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        inference_ms = (time.perf_counter() - dispatch_time) * 1000
+
+        offset = 0
+        for request in batch:
+            request.future.set_result(outputs[offset:offset + len(request.items)])
+            offset += len(request.items)
+
+        with self._condition:
+            self._recent_batches.append((len(items), inference_ms, queue_wait_ms))
+            self._batches_total += 1
+            self._items_total += len(items)
+
+    # --- Stats ---
+
+    def get_stats(self) -> dict:
+        """Returns batch size and latency stats over the recent window, for tuning max_batch_size and max_wait_ms."""
+        with self._condition:
+            recent = list(self._recent_batches)
+            stats = {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "active_cameras": len(self._registered_keys),
+                "pending_requests": len(self._pending),
+                "batches_total": self._batches_total,
+                "items_total": self._items_total,
+                "superseded_total": self._superseded_total,
+            }
+
+        if recent:
+            sizes = [size for size, _, _ in recent]
+            latencies = sorted(latency for _, latency, _ in recent)
+            waits = [wait for _, _, wait in recent]
+            stats.update({
+                "recent_batches": len(recent),
+                "avg_batch_size": sum(sizes) / len(sizes),
+                "max_batch_size_seen": max(sizes),
+                "avg_latency_ms": sum(latencies) / len(latencies),
+                "p50_latency_ms": latencies[len(latencies) // 2],
+                "p95_latency_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "avg_latency_per_item_ms": sum(latencies) / sum(sizes),
+                "avg_queue_wait_ms": sum(waits) / len(waits),
+            })
+        return stats
+
+
+_detection_scheduler: BatchScheduler | None = None
+_detection_scheduler_lock = threading.Lock()
+
+def get_detection_scheduler() -> BatchScheduler:
+    """Returns the process-wide plate detection scheduler, starting it on first use."""
+    global _detection_scheduler
+    if _detection_scheduler is None or not _detection_scheduler.is_alive():
+        with _detection_scheduler_lock:
+            if _detection_scheduler is None or not _detection_scheduler.is_alive():
+                _detection_scheduler = BatchScheduler(
+                    "detection",
+                    get_inference_engine().detect_batch,
+                    max_batch_size=DETECTION_MAX_BATCH_SIZE,
+                    max_wait_ms=DETECTION_MAX_WAIT_MS,
+                )
+                _detection_scheduler.start()
+    return _detection_scheduler
+
+_ocr_scheduler: BatchScheduler | None = None
+_ocr_scheduler_lock = threading.Lock()
+
+def get_ocr_scheduler() -> BatchScheduler:
+    """Returns the process-wide OCR scheduler, which batches plate crops from every camera into one OCR call."""
+    global _ocr_scheduler
+    if _ocr_scheduler is None or not _ocr_scheduler.is_alive():
+        with _ocr_scheduler_lock:
+            if _ocr_scheduler is None or not _ocr_scheduler.is_alive():
+                _ocr_scheduler = BatchScheduler(
+                    "ocr",
+                    get_inference_engine().recognize_batch,
+                    max_batch_size=OCR_MAX_BATCH_SIZE,
+                    max_wait_ms=OCR_MAX_WAIT_MS,
+                )
+                _ocr_scheduler.start()
+    return _ocr_scheduler
+
+def get_scheduler_stats() -> dict:
+    """Stats for every scheduler started in this process."""
+    stats = {}
+    if _detection_scheduler is not None:
+        stats["detection"] = _detection_scheduler.get_stats()
+    if _ocr_scheduler is not None:
+        stats["ocr"] = _ocr_scheduler.get_stats()
+    return stats
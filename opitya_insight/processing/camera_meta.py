@@ -0,0 +1,42 @@
+"""
+Readers for Camera.meta, the free-form JSON settings of a camera. A malformed or out-of-range value
+falls back to the default (or is clamped) with a warning instead of stopping the camera's worker.
+"""
+import logging
+
+from processing.roi import RegionOfInterest
+
+logger = logging.getLogger(__name__)
+
+
+def meta_number(meta: dict, key: str, default, cast=float, minimum=None, maximum=None):
+    """Reads a numeric camera setting, clamped to [minimum, maximum]; a malformed value falls back to default."""
+    value = meta.get(key)
+    if value is None:
+        return default
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring malformed camera setting {key}={value!r}; using {default}.")
+        return default
+    if minimum is not None and value < minimum or maximum is not None and value > maximum:
+        clamped = max(minimum, value) if minimum is not None else value
+        clamped = min(maximum, clamped) if maximum is not None else clamped
+        logger.warning(f"Camera setting {key}={value!r} is out of range; using {clamped}.")
+        value = clamped
+    return value
+
+def meta_flag(meta: dict, key: str, default: bool) -> bool:
+    """Reads a boolean camera setting, accepting JSON booleans and "true"/"false" strings."""
+    value = meta.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes", "on")
+    return bool(value)
+
+def motion_region(meta: dict, roi: RegionOfInterest | None) -> list[float]:
+    """
+    The motion gate's [x1, y1, x2, y2] from meta["motion_region"], which takes the same forms as meta["roi"]
+    and defaults to the ROI. Polygons are reduced to their bounding rectangle; [] means the whole frame.
+    """
+    region = RegionOfInterest.from_meta(meta["motion_region"]) if "motion_region" in meta else roi
+    return list(region.bounds) if region else []
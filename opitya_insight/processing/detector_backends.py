@@ -0,0 +1,160 @@
+"""
+Plate detector backends. All of them take the preprocessed float32 NCHW batch built by
+LetterboxBuffer and return one [N, 5] array of (x1, y1, x2, y2, conf) per image, in letterbox
+coordinates. Select one per deployment with DETECTOR_BACKEND:
+
+    ultralytics  LP-detection.pt through ultralytics + PyTorch (default)
+    onnx         the exported ONNX model through onnxruntime on CPU
+    openvino     the exported ONNX model through onnxruntime's OpenVINO execution provider
+
+The ONNX backends never import torch, which keeps it out of the process entirely.
+Export the model with export_detector.py.
+"""
+import logging
+import os
+import pathlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS_DIR = pathlib.Path(__file__).resolve().parent.parent / "models" / "weights"
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "ultralytics").lower()
+DETECTION_ONNX_PATH = pathlib.Path(os.getenv("DETECTION_ONNX_PATH", str(WEIGHTS_DIR / "LP-detection.onnx")))
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0")) # 0 lets onnxruntime use every core
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "1")) # The detector graph is sequential
+DETECTION_MIN_CONFIDENCE = 0.25 # Same pre-NMS floor as ultralytics; the workers apply their own threshold on top
+DETECTION_NMS_IOU = 0.7 # Same as the ultralytics default
+
+DETECTOR_BACKENDS = ("ultralytics", "onnx", "openvino")
+
+
+class UltralyticsDetectorBackend:
+    """LP-detection.pt through ultralytics + PyTorch. torch is only imported when this backend loads."""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path: pathlib.Path):
+        self.model_path = model_path
+        self.model = None
+        self.fixed_imgsz = None # Any multiple of 32 works
+
+    def load(self):
+        from ultralytics import YOLO
+        self.model = YOLO(str(self.model_path)) # Load model
+        self.model.fuse() # Fuse model for faster inference
+
+    def set_threads(self, intra_op_threads: int):
+        if self.model is None: # Applied once loaded; torch is not imported before that
+            return
+        import torch
+        torch.set_num_threads(max(1, intra_op_threads))
+
+    def predict(self, batch: np.ndarray, imgsz: int) -> list:
+        import torch # Already loaded by ultralytics; only needed to wrap the batch without a copy
+        results = self.model(torch.from_numpy(batch), imgsz=imgsz, verbose=False)
+        return [
+            np.concatenate((result.boxes.xyxy.cpu().numpy(), result.boxes.conf.cpu().numpy()[:, None]), axis=1).astype(np.float32)
+            for result in results
+        ]
+
+
+class OnnxDetectorBackend:
+    """
+    The exported detector run through onnxruntime, with decoding and NMS done here.
+    Handles both raw YOLOv8 heads, [B, 4 + classes, anchors], and end-to-end exports with
+    NMS built in, [B, max_detections, 6].
+    """
+
+    name = "onnx"
+    providers = ["CPUExecutionProvider"]
+
+    def __init__(self, model_path: pathlib.Path, intra_op_threads: int = ONNX_INTRA_OP_THREADS, inter_op_threads: int = ONNX_INTER_OP_THREADS):
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.session = None
+        self.input_name = None
+        self.fixed_imgsz = None # Set when the model was exported with static spatial dims
+        self.fixed_batch = None # Set when the model was exported with a static batch size
+
+    def _session_options(self):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        return options
+
+    def load(self):
+        import onnxruntime as ort
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"{self.model_path} not found; create it with export_detector.py")
+        providers = [provider for provider in self.providers if provider in ort.get_available_providers()]
+        if not providers:
+            raise RuntimeError(f"None of {self.providers} is available in this onnxruntime build")
+        self.session = ort.InferenceSession(str(self.model_path), sess_options=self._session_options(), providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, height, width = model_input.shape
+        if isinstance(height, int) and isinstance(width, int):
+            self.fixed_imgsz = height
+        if isinstance(batch_dim, int):
+            self.fixed_batch = batch_dim
+        logger.info(f"Detector session on {providers[0]} (intra-op threads {self.intra_op_threads or 'auto'}, "
+                    f"input {model_input.shape}).")
+
+    def set_threads(self, intra_op_threads: int):
+        """Thread counts are fixed per session, so a change after loading rebuilds it (rare: only on rebalancing)."""
+        if intra_op_threads == self.intra_op_threads:
+            return
+        self.intra_op_threads = intra_op_threads
+        if self.session is not None:
+            self.load()
+
+    def predict(self, batch: np.ndarray, imgsz: int) -> list:
+        if self.fixed_batch == 1 and len(batch) > 1: # Static batch-1 export: run the images one by one
+            return [self.predict(batch[index:index + 1], imgsz)[0] for index in range(len(batch))]
+        output = self.session.run(None, {self.input_name: batch})[0]
+        if output.ndim == 3 and output.shape[2] == 6: # End-to-end export: (x1, y1, x2, y2, conf, class), NMS already applied
+            return [image[image[:, 4] >= DETECTION_MIN_CONFIDENCE, :5].astype(np.float32) for image in output]
+        return [self._decode(image) for image in output]
+
+    @staticmethod
+    def _decode(prediction: np.ndarray) -> np.ndarray:
+        """[4 + classes, anchors] raw head -> NMS-filtered [N, 5] (x1, y1, x2, y2, conf)."""
+        import cv2
+        prediction = prediction.T
+        scores = prediction[:, 4:].max(axis=1)
+        keep = scores >= DETECTION_MIN_CONFIDENCE
+        if not keep.any():
+            return np.zeros((0, 5), dtype=np.float32)
+        boxes_cxcywh, scores = prediction[keep, :4], scores[keep]
+        boxes_xywh = boxes_cxcywh.copy()
+        boxes_xywh[:, :2] -= boxes_cxcywh[:, 2:] / 2
+        indices = cv2.dnn.NMSBoxes(boxes_xywh.tolist(), scores.tolist(), DETECTION_MIN_CONFIDENCE, DETECTION_NMS_IOU)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        detections = np.empty((len(indices), 5), dtype=np.float32)
+        detections[:, :2] = boxes_xywh[indices, :2]
+        detections[:, 2:4] = boxes_xywh[indices, :2] + boxes_xywh[indices, 2:]
+        detections[:, 4] = scores[indices]
+        return detections
+
+
+class OpenVinoDetectorBackend(OnnxDetectorBackend):
+    """The exported detector through onnxruntime's OpenVINO execution provider (onnxruntime-openvino)."""
+
+    name = "openvino"
+    providers = ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+
+
+def create_detector_backend(name: str = DETECTOR_BACKEND, pt_model_path: pathlib.Path | None = None):
+    """Builds (without loading) the backend selected by DETECTOR_BACKEND."""
+    if name == "onnx":
+        return OnnxDetectorBackend(DETECTION_ONNX_PATH)
+    if name == "openvino":
+        return OpenVinoDetectorBackend(DETECTION_ONNX_PATH)
+    if name != "ultralytics":
+        logger.warning(f"Unknown DETECTOR_BACKEND '{name}', expected one of {DETECTOR_BACKENDS}; using ultralytics.")
+    return UltralyticsDetectorBackend(pt_model_path or WEIGHTS_DIR / "LP-detection.pt")
@@ -0,0 +1,115 @@
+import cv2
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+FRAME_RING_SIZE = int(os.getenv("FRAME_RING_SIZE", "1")) # Decoded frames kept per camera; 1 means latest-frame-wins
+RECONNECT_DELAY_SECONDS = 5
+
+
+class FrameGrabber(threading.Thread):
+    """
+    Reads a video stream on its own thread and keeps only the newest decoded frames.
+    Inference picks up the freshest frame with read_latest() instead of draining OpenCV's
+    internal buffer, so processed frames never drift behind real time when inference is slow.
+    """
+
+    def __init__(self, camera_id: int, rtsp_url: str, ring_size: int = FRAME_RING_SIZE, on_status=None):
+        super().__init__(name=f"frame-grabber-{camera_id}", daemon=True)
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.on_status = on_status # Called with "online"/"offline" when the stream reconnects or is lost
+        self.running = True
+        self.cap = None
+
+        self._condition = threading.Condition()
+        self._ring = deque(maxlen=max(1, ring_size)) # [(seq, frame, captured_at)], newest last
+        self._seq = 0
+        self._last_consumed_seq = 0
+
+        # Stats
+        self.frames_captured = 0
+        self.frames_dropped = 0 # Frames overwritten before inference picked them up
+        self.stream_fps = 0.0
+
+    def _open_capture(self) -> bool:
+        self.cap = cv2.VideoCapture(self.rtsp_url)
+        if not self.cap.isOpened():
+            return False
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1) # Best effort; not every backend honours it
+        return True
+
+    def open(self) -> bool:
+        """Opens the stream synchronously so the caller can report a bad URL before starting the thread."""
+        logger.info(f"Attempting to open video stream for camera {self.camera_id} from {self.rtsp_url}")
+        return self._open_capture()
+
+    def run(self):
+        fps_window_start = time.perf_counter()
+        fps_window_frames = 0
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                if not self.running:
+                    break
+                logger.warning(f"End of stream or cannot read frame for camera {self.camera_id}. Attempting to reconnect...")
+                self.cap.release()
+                time.sleep(RECONNECT_DELAY_SECONDS) # Wait before attempting to reconnect
+                if not self._open_capture():
+                    logger.error(f"Failed to reconnect to stream for camera {self.camera_id}.")
+                    if self.on_status:
+                        self.on_status("offline")
+                    break # Exit if reconnection fails
+                logger.info(f"Successfully reconnected to stream for camera {self.camera_id}.")
+                if self.on_status:
+                    self.on_status("online")
+                continue
+
+            captured_at = time.time()
+            with self._condition:
+                self._seq += 1
+                if self._ring and self._ring[-1][0] > self._last_consumed_seq:
+                    self.frames_dropped += 1 # The previous newest frame was never picked up
+                self._ring.append((self._seq, frame, captured_at))
+                self.frames_captured += 1
+                self._condition.notify_all()
+
+            fps_window_frames += 1
+            elapsed = time.perf_counter() - fps_window_start
+            if elapsed >= 2.0:
+                self.stream_fps = fps_window_frames / elapsed
+                fps_window_start = time.perf_counter()
+                fps_window_frames = 0
+
+        self.running = False
+        self.cap.release()
+        with self._condition:
+            self._condition.notify_all() # Wake any reader so it can see the grabber has stopped
+        logger.info(f"Frame grabber for camera {self.camera_id} finished.")
+
+    def read_latest(self, min_seq: int = 1, timeout: float = 1.0):
+        """
+        Waits until a frame with sequence number >= min_seq is available and returns the newest one
+        as (seq, frame, captured_at). Returns None on timeout or once the grabber has stopped.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.running and (not self._ring or self._ring[-1][0] < min_seq):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            if not self._ring or self._ring[-1][0] < min_seq:
+                return None
+            seq, frame, captured_at = self._ring[-1]
+            self._last_consumed_seq = seq
+            return seq, frame, captured_at
+
+    def stop(self):
+        self.running = False
+        with self._condition:
+            self._condition.notify_all()
@@ -0,0 +1,86 @@
+import os
+
+import cv2
+
+from processing.frame_ring import FRAME_RING_SLOT_BYTES, RENDITION_NAMES
+
+PLATE_COLOR = (0, 255, 0) # Green: plate with a read
+NO_OCR_COLOR = (0, 165, 255) # Orange: detected plate without a read yet
+
+# Widest "full" rendition; frame ring slots are sized to hold it (0 keeps the camera's resolution,
+# with FRAME_RING_SLOT_BYTES slots that larger frames may not fit)
+RENDITION_FULL_MAX_WIDTH = int(os.getenv("RENDITION_FULL_MAX_WIDTH", "1920"))
+JPEG_BYTES_PER_PIXEL = 0.5 # Generous upper bound for a q90 JPEG of a busy street scene
+FRAME_META_BYTES = 64 * 1024 # Room left in a slot for the frame's JSON metadata
+
+# Shared JPEG renditions, smallest first. Every viewer is served one of these, so a wall of
+# thumbnails costs one small encode per camera instead of a full-size encode per viewer.
+RENDITION_LADDER = {
+    "thumb": {"max_width": 320, "quality": 60},
+    "medium": {"max_width": 800, "quality": 75},
+    "full": {"max_width": RENDITION_FULL_MAX_WIDTH or None, "quality": 90},
+}
+
+
+def frame_slot_bytes() -> int:
+    """
+    Frame ring slot size that holds every rendition of a 4:3 frame at once, plus its metadata.
+    Never below FRAME_RING_SLOT_BYTES, so that setting can still raise it.
+    """
+    if any(rung["max_width"] is None for rung in RENDITION_LADDER.values()):
+        return FRAME_RING_SLOT_BYTES
+    rendition_bytes = sum(int(rung["max_width"] * rung["max_width"] * 3 // 4 * JPEG_BYTES_PER_PIXEL) for rung in RENDITION_LADDER.values())
+    return max(FRAME_RING_SLOT_BYTES, rendition_bytes + FRAME_META_BYTES)
+
+
+def select_rendition(max_width: int | None = None, quality: int | None = None) -> str:
+    """Smallest rendition at least max_width wide and at least the requested quality; "full" if nothing is asked."""
+    for name, rung in RENDITION_LADDER.items():
+        wide_enough = rung["max_width"] is None or (max_width is not None and rung["max_width"] >= max_width)
+        if wide_enough and rung["quality"] >= (quality or 0):
+            return name
+    return "full"
+
+
+def annotate_frame(frame, plates: list, roi=None):
+    """
+    Draws the plates published in a frame's metadata (and the camera's ROI) onto a copy of the frame.
+    Only called when somebody will see the result, so frames nobody watches are never copied or drawn on.
+    """
+    annotated_frame = frame.copy()
+    if roi is not None:
+        roi.draw(annotated_frame)
+    for plate in plates:
+        x1, y1, x2, y2 = plate["box"]
+        if plate["plate_text"] != "N/A":
+            label, color = f"{plate['plate_text']} ({plate['confidence']:.2f})", PLATE_COLOR
+        else:
+            label, color = f"No OCR ({plate['confidence']:.2f})", NO_OCR_COLOR
+        cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+    return annotated_frame
+
+def encode_renditions(annotated_frame, names: list[str]) -> tuple[list, dict]:
+    """
+    JPEG-encodes the requested renditions of an annotated frame.
+    Returns (buffers, {name: [offset, length]}) with offsets into the buffers laid back to back.
+    """
+    buffers = []
+    spans = {}
+    offset = 0
+    height, width = annotated_frame.shape[:2]
+    for name in RENDITION_NAMES: # Fixed order, so spans are stable across frames
+        if name not in names:
+            continue
+        rung = RENDITION_LADDER[name]
+        image = annotated_frame
+        if rung["max_width"] is not None and width > rung["max_width"]:
+            scale = rung["max_width"] / width
+            image = cv2.resize(annotated_frame, (rung["max_width"], max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        success, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, rung["quality"]])
+        if not success:
+            continue
+        buffers.append(buffer)
+        spans[name] = [offset, len(buffer)]
+        offset += len(buffer)
+    return buffers, spans
@@ -0,0 +1,262 @@
+import errno
+import json
+import logging
+import os
+import struct
+import time
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+
+logger = logging.getLogger(__name__)
+
+FRAME_RING_SLOTS = int(os.getenv("FRAME_RING_SLOTS", "4"))
+FRAME_RING_SLOT_BYTES = int(os.getenv("FRAME_RING_SLOT_BYTES", str(1024 * 1024))) # Room for one encoded frame plus its metadata
+
+SHM_DIR = "/dev/shm" # Where POSIX shared memory lives on Linux; Docker caps it at 64 MB unless shm_size is set
+
+# JPEG renditions a slot can carry, smallest first; see processing/frame_renderer.py for the ladder
+RENDITION_NAMES = ("thumb", "medium", "full")
+
+# Ring header: magic, slot_count, slot_bytes, latest_seq, viewers per rendition
+_RING_HEADER = struct.Struct(f"<4sIIQ{len(RENDITION_NAMES)}I")
+_RING_MAGIC = b"OPFR"
+_LATEST_SEQ_OFFSET = 12
+_VIEWERS = struct.Struct(f"<{len(RENDITION_NAMES)}I") # Set by the API process; the writer only encodes renditions someone wants
+_VIEWERS_OFFSET = 20
+# Slot header: seq, timestamp, image_len, meta_len. seq is 0 while the slot is being written.
+_SLOT_HEADER = struct.Struct("<QdII")
+
+
+def shm_available_bytes() -> int | None:
+    """Free space in /dev/shm, or None where shared memory is not backed by it (e.g. macOS, Windows)."""
+    try:
+        stats = os.statvfs(SHM_DIR)
+    except (AttributeError, OSError):
+        return None
+    return stats.f_bavail * stats.f_frsize
+
+
+class FramePacket:
+    """
+    One frame read from a FrameRing. image is a zero-copy view into shared memory that stays
+    valid until the writer laps the ring; check is_valid() after using it if that matters.
+    """
+    __slots__ = ("seq", "timestamp", "image", "meta", "_ring", "_offset")
+
+    def __init__(self, seq: int, timestamp: float, image, meta: dict, ring=None, offset: int = 0):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.image = image
+        self.meta = meta
+        self._ring = ring
+        self._offset = offset
+
+    def rendition(self, name: str):
+        """View of one rendition's JPEG within image, or None if this frame was not encoded at that size."""
+        renditions = self.meta.get("renditions")
+        if renditions is None: # Published as a single image
+            return self.image if len(self.image) else None
+        span = renditions.get(name)
+        if span is None:
+            return None
+        start, length = span
+        return self.image[start:start + length]
+
+    def is_valid(self) -> bool:
+        """True while the slot still holds this frame, i.e. the view was not overwritten."""
+        if self._ring is None:
+            return True
+        return self._ring._slot_seq(self._offset) == self.seq
+
+
+class FrameRing:
+    """
+    Fixed-size ring of encoded frames and their metadata in shared memory.
+    There is a single writer (the camera's StreamWorker, in whichever process it runs) and any number
+    of readers. Each slot is guarded by its sequence number, so readers never block the writer and
+    detect a slot that was overwritten while they were reading it.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._buf = shm.buf
+        magic, self.slot_count, self.slot_bytes, *_ = _RING_HEADER.unpack_from(self._buf, 0)
+        if magic != _RING_MAGIC:
+            raise ValueError(f"Shared memory block {shm.name} is not a frame ring.")
+        self.frames_too_large = 0 # Frames this writer dropped because they did not fit a slot
+
+    @classmethod
+    def create(cls, camera_id: int, slot_count: int = FRAME_RING_SLOTS, slot_bytes: int = FRAME_RING_SLOT_BYTES) -> "FrameRing":
+        """Allocates a new ring. The creating process owns it and is responsible for unlink()."""
+        name = f"opitya_cam{camera_id}_{uuid.uuid4().hex[:8]}"
+        size = _RING_HEADER.size + slot_count * slot_bytes
+        # The block is sparse until written, so a full /dev/shm shows up as SIGBUS on a later write; refuse up front
+        available = shm_available_bytes()
+        if available is not None and size > available:
+            raise OSError(errno.ENOSPC, f"Frame ring for camera {camera_id} needs {size} bytes but {SHM_DIR} has {available} free; raise the container's shm_size or lower the ring sizes")
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _RING_HEADER.pack_into(shm.buf, 0, _RING_MAGIC, slot_count, slot_bytes, 0, *(0 for _ in RENDITION_NAMES))
+        for index in range(slot_count):
+            _SLOT_HEADER.pack_into(shm.buf, _RING_HEADER.size + index * slot_bytes, 0, 0.0, 0, 0)
+        logger.info(f"Created frame ring {name} for camera {camera_id} ({slot_count} slots x {slot_bytes} bytes).")
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        """Attaches to a ring created by another process."""
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            # Only the owner may unlink the block; stop this process's tracker from doing it at exit
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def latest_seq(self) -> int:
+        buf = self._buf
+        if buf is None: # Ring was closed
+            return 0
+        return struct.unpack_from("<Q", buf, _LATEST_SEQ_OFFSET)[0]
+
+    @property
+    def viewers(self) -> dict[str, int]:
+        buf = self._buf
+        if buf is None:
+            return {}
+        return dict(zip(RENDITION_NAMES, _VIEWERS.unpack_from(buf, _VIEWERS_OFFSET)))
+
+    def set_viewers(self, viewers: dict[str, int]):
+        """Records how many viewers the API process is streaming each rendition of this camera to."""
+        buf = self._buf
+        if buf is not None:
+            _VIEWERS.pack_into(buf, _VIEWERS_OFFSET, *(max(0, viewers.get(name, 0)) for name in RENDITION_NAMES))
+
+    def wanted_renditions(self) -> list[str]:
+        """Renditions anyone will look at in the next frame; empty means the frame need not be encoded at all."""
+        return [name for name, count in self.viewers.items() if count > 0]
+
+    def _slot_offset(self, seq: int) -> int:
+        return _RING_HEADER.size + (seq % self.slot_count) * self.slot_bytes
+
+    def _slot_seq(self, offset: int) -> int:
+        buf = self._buf
+        if buf is None: # Ring was closed
+            return 0
+        return struct.unpack_from("<Q", buf, offset)[0]
+
+    def publish(self, image, meta: dict, timestamp: float | None = None) -> int:
+        """
+        Writes an encoded frame and its metadata into the next slot and returns its sequence number (0 if it did not fit).
+        image may be a list of buffers, written back to back (e.g. several renditions; see FramePacket.rendition()).
+        An empty image publishes the metadata alone, for frames nobody is watching.
+        """
+        parts = image if isinstance(image, (list, tuple)) else [image]
+        # Accept bytes or the (N, 1) uint8 arrays from cv2.imencode without copying
+        parts = [memoryview(part).cast("B") for part in parts]
+        meta_bytes = json.dumps(meta, default=str).encode("utf-8")
+        image_len = sum(part.nbytes for part in parts)
+        if _SLOT_HEADER.size + image_len + len(meta_bytes) > self.slot_bytes:
+            self.frames_too_large += 1
+            logger.warning(f"Frame of {image_len} bytes does not fit frame ring {self.name} slots of {self.slot_bytes} bytes; dropping it.")
+            return 0
+
+        seq = self.latest_seq + 1
+        offset = self._slot_offset(seq)
+        _SLOT_HEADER.pack_into(self._buf, offset, 0, 0.0, 0, 0) # Mark the slot as being written
+        data_offset = offset + _SLOT_HEADER.size
+        part_offset = data_offset
+        for part in parts:
+            self._buf[part_offset:part_offset + part.nbytes] = part
+            part_offset += part.nbytes
+        self._buf[data_offset + image_len:data_offset + image_len + len(meta_bytes)] = meta_bytes
+        _SLOT_HEADER.pack_into(self._buf, offset, seq, timestamp or time.time(), image_len, len(meta_bytes))
+        struct.pack_into("<Q", self._buf, _LATEST_SEQ_OFFSET, seq) # Publish: readers now see the new slot
+        return seq
+
+    def _read_slot(self, buf, seq: int, copy: bool) -> FramePacket | None:
+        """Reads frame seq from its slot, or None if the slot holds another frame or was overwritten mid-read."""
+        offset = self._slot_offset(seq)
+        slot_seq, timestamp, image_len, meta_len = _SLOT_HEADER.unpack_from(buf, offset)
+        if slot_seq != seq:
+            return None
+        data_offset = offset + _SLOT_HEADER.size
+        image = buf[data_offset:data_offset + image_len]
+        if copy:
+            image = bytes(image)
+        meta_bytes = bytes(buf[data_offset + image_len:data_offset + image_len + meta_len])
+        if self._slot_seq(offset) != seq:
+            return None
+        return FramePacket(seq, timestamp, image, json.loads(meta_bytes), ring=None if copy else self, offset=offset)
+
+    def read_latest(self, min_seq: int = 1, copy: bool = False) -> FramePacket | None:
+        """
+        Returns the newest frame if its sequence number is at least min_seq, else None.
+        The image is a view into the ring unless copy=True; metadata is always decoded.
+        """
+        buf = self._buf # Local reference, so a concurrent close() cannot pull it out from under us
+        for _ in range(3): # Retry if the writer lapped us mid-read
+            seq = self.latest_seq
+            if buf is None or seq < min_seq or seq == 0:
+                return None
+            packet = self._read_slot(buf, seq, copy)
+            if packet is not None:
+                return packet
+        return None
+
+    def _slot_times(self, buf) -> list[tuple[int, float]]:
+        """[(seq, timestamp)] of every filled slot, in no particular order."""
+        times = []
+        for index in range(self.slot_count):
+            slot_seq, timestamp, _, _ = _SLOT_HEADER.unpack_from(buf, _RING_HEADER.size + index * self.slot_bytes)
+            if slot_seq:
+                times.append((slot_seq, timestamp))
+        return times
+
+    def read_nearest(self, timestamp: float, copy: bool = True) -> FramePacket | None:
+        """
+        Returns the frame whose timestamp is closest to the given one among those still in the ring, or None if it is empty.
+        Copies by default: an older slot is the next one the writer overwrites.
+        """
+        buf = self._buf
+        for _ in range(3):
+            if buf is None:
+                return None
+            times = self._slot_times(buf)
+            if not times:
+                return None
+            seq, _ = min(times, key=lambda slot: abs(slot[1] - timestamp))
+            packet = self._read_slot(buf, seq, copy)
+            if packet is not None:
+                return packet
+        return None
+
+    def recorded_range(self) -> tuple[float, float] | None:
+        """(oldest, newest) timestamp of the frames still in the ring, or None if it is empty."""
+        buf = self._buf
+        times = [timestamp for _, timestamp in self._slot_times(buf)] if buf is not None else []
+        return (min(times), max(times)) if times else None
+
+    def close(self):
+        self._buf = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A reader still holds a view; the mapping is released once that view is garbage collected
+            logger.debug(f"Frame ring {self.name} closed while views were still held.")
+        except Exception as e:
+            logger.warning(f"Error closing frame ring {self.name}: {e}")
+
+    def unlink(self):
+        """Closes and removes the shared memory block. Only the owning process should call this."""
+        self.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,198 @@
+import contextlib
+import inspect
+import logging
+import os
+import pathlib
+import threading
+
+from fast_plate_ocr import LicensePlateRecognizer
+
+from processing.detector_backends import create_detector_backend
+from processing.letterbox import LetterboxBuffer, normalize_imgsz
+
+logger = logging.getLogger(__name__)
+
+# Construct absolute path to the model file
+BASE_DIR = pathlib.Path(__file__).resolve().parent.parent.parent # Go up from processing to opitya_insight
+DETECTION_MODEL_PATH = BASE_DIR / "opitya_insight" / "models" / "weights" / "LP-detection.pt"
+OCR_MODEL_NAME = "cct-xs-v1-global-model"
+DEFAULT_DETECTION_IMGSZ = normalize_imgsz(os.getenv("DETECTION_IMGSZ", "640"), 640) # Used when a camera sets no meta["imgsz"]
+# Longest wait for an inference slot. A worker process that dies while holding a slot never gives it back,
+# so past this the call runs without one rather than blocking every camera forever.
+INFERENCE_SLOT_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_SLOT_TIMEOUT_SECONDS", "2.0"))
+
+
+class InferenceEngine:
+    """
+    Process-wide owner of the plate detection and OCR models.
+    The models are loaded once and shared by every StreamWorker, so adding a camera
+    only costs its stream buffers instead of another copy of YOLO and the OCR session.
+    """
+
+    def __init__(self, detection_model_path: pathlib.Path = DETECTION_MODEL_PATH, ocr_model_name: str = OCR_MODEL_NAME):
+        self.detection_model_path = detection_model_path
+        self.ocr_model_name = ocr_model_name
+        self.detector = None # Backend chosen by DETECTOR_BACKEND, see processing/detector_backends.py
+        self.ocr_model = None
+        self._loaded = False
+        self._load_lock = threading.Lock() # Guards one-time model loading
+        self._detection_lock = threading.Lock() # The ultralytics predictor keeps per-call state and is not thread-safe; also guards the letterbox buffers
+        self._ocr_lock = threading.Lock() # Serialize calls into the shared ONNX session
+        self._letterboxes: dict[int, LetterboxBuffer] = {} # imgsz -> preallocated preprocessing buffers, used under _detection_lock
+        self.intra_op_threads: int | None = None # Set by the CPU budget governor; None keeps the runtime defaults
+        self._inference_slots = None # Semaphore shared by all worker processes capping concurrent inference calls
+        self.inference_slot_timeouts = 0 # Calls that ran without a slot because none freed up in time
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> bool:
+        """Loads both models if they are not loaded yet. Safe to call from any number of threads."""
+        if self._loaded:
+            return True
+
+        with self._load_lock:
+            if self._loaded: # Another thread finished loading while we were waiting
+                return True
+
+            detector = create_detector_backend(pt_model_path=self.detection_model_path)
+            logger.info(f"Loading shared detection model with the {detector.name} backend...")
+            try:
+                if self.intra_op_threads:
+                    detector.set_threads(self.intra_op_threads) # Before load, so an ONNX session is built only once
+                detector.load()
+                if self.intra_op_threads:
+                    detector.set_threads(self.intra_op_threads)
+                logger.info("Shared detection model loaded successfully.")
+            except Exception as e:
+                logger.error(f"Error loading shared detection model: {e}")
+                logger.error("The detection model failed to load. This might be due to a corrupted or missing model file, or an incompatibility with the installed ultralytics/PyTorch/onnxruntime versions. Please ensure your environment is consistent with when the model was working.")
+                return False
+
+            logger.info(f"Initializing shared OCR model {self.ocr_model_name}...")
+            try:
+                ocr_model = LicensePlateRecognizer(self.ocr_model_name, **self._ocr_session_kwargs())
+                logger.info("Shared OCR model initialized successfully.")
+            except Exception as e:
+                logger.error(f"Error initializing shared OCR model: {e}")
+                return False
+
+            self.detector = detector
+            self.ocr_model = ocr_model
+            self._loaded = True
+            return True
+
+    def _ocr_session_kwargs(self) -> dict:
+        """Applies the thread budget to the OCR session where this fast_plate_ocr version accepts session options."""
+        if not self.intra_op_threads or "sess_options" not in inspect.signature(LicensePlateRecognizer).parameters:
+            return {}
+        import onnxruntime as ort
+        sess_options = ort.SessionOptions()
+        sess_options.intra_op_num_threads = self.intra_op_threads
+        sess_options.inter_op_num_threads = 1
+        return {"sess_options": sess_options}
+
+    def set_threads(self, intra_op_threads: int):
+        """
+        Sets the intra-op threads of each inference call. Applied to the detector right away; the OCR
+        session picks the value up when it is created, so set it before load() where possible.
+        """
+        if intra_op_threads == self.intra_op_threads:
+            return
+        self.intra_op_threads = intra_op_threads
+        with self._detection_lock:
+            if self.detector is not None:
+                self.detector.set_threads(intra_op_threads)
+        logger.info(f"Inference intra-op threads set to {intra_op_threads}.")
+
+    def set_inference_slots(self, inference_slots):
+        """Shares a (multiprocessing) semaphore that every detection and OCR call must hold while it runs."""
+        self._inference_slots = inference_slots
+
+    @contextlib.contextmanager
+    def _inference_slot(self):
+        inference_slots = self._inference_slots
+        if inference_slots is None:
+            yield
+            return
+        if not inference_slots.acquire(timeout=INFERENCE_SLOT_TIMEOUT_SECONDS):
+            self.inference_slot_timeouts += 1
+            logger.warning(f"No inference slot freed up in {INFERENCE_SLOT_TIMEOUT_SECONDS}s (a worker process may have died holding one); running without a slot.")
+            yield
+            return
+        try:
+            yield
+        finally:
+            inference_slots.release()
+
+    def detect(self, frame, imgsz: int = DEFAULT_DETECTION_IMGSZ):
+        """Runs plate detection on a single frame. See detect_batch() for the result format."""
+        return self.detect_batch([(frame, imgsz)])[0]
+
+    def detect_batch(self, requests: list) -> list:
+        """
+        Runs plate detection on [(frame, imgsz)] requests; frames with the same imgsz share one forward pass.
+        Returns a float32 [N, 5] array of (x1, y1, x2, y2, conf) in frame coordinates per request.
+        """
+        groups: dict[int, list[int]] = {}
+        for index, (_, imgsz) in enumerate(requests):
+            # A model exported with static spatial dims runs at its own size whatever the camera asks for
+            imgsz = self.detector.fixed_imgsz or normalize_imgsz(imgsz, DEFAULT_DETECTION_IMGSZ)
+            groups.setdefault(imgsz, []).append(index)
+
+        outputs = [None] * len(requests)
+        with self._detection_lock:
+            for imgsz, indices in groups.items():
+                letterbox = self._letterboxes.get(imgsz)
+                if letterbox is None:
+                    letterbox = self._letterboxes[imgsz] = LetterboxBuffer(imgsz)
+                frames = [requests[index][0] for index in indices]
+                # Resize, pad and normalize into reused buffers instead of letting ultralytics allocate per frame
+                batch, transforms = letterbox.prepare(frames)
+                with self._inference_slot():
+                    predictions = self.detector.predict(batch, imgsz)
+                for index, frame, transform, detections in zip(indices, frames, transforms, predictions):
+                    outputs[index] = LetterboxBuffer.to_frame_coordinates(detections, transform, frame.shape)
+        return outputs
+
+    def recognize_batch(self, plate_crops: list) -> list:
+        """
+        Runs OCR on a list of plate crops in one ONNX call.
+        Returns (plate_text or None, per-character confidences or None) per crop.
+        """
+        with self._ocr_lock, self._inference_slot():
+            ocr_output = self.ocr_model.run(plate_crops, return_confidence=True)
+        return _parse_ocr_output(ocr_output)
+
+
+def _parse_ocr_output(ocr_output) -> list:
+    """Normalizes the recognizer output across fast_plate_ocr versions to [(plate_text, char_confidences)]."""
+    if isinstance(ocr_output, tuple): # (plates, char_probs) from return_confidence=True
+        plate_texts, char_probs = ocr_output
+    else: # Prediction objects carrying .plate / .char_probs, or bare strings
+        plate_texts = [getattr(prediction, "plate", prediction) for prediction in ocr_output]
+        char_probs = [getattr(prediction, "char_probs", None) for prediction in ocr_output]
+
+    results = []
+    for plate_text, probs in zip(plate_texts, char_probs):
+        if not plate_text:
+            results.append((None, None))
+            continue
+        # Padding slots come after the plate characters, so the first len(plate_text) probabilities are the plate's
+        char_confidences = [float(prob) for prob in probs[:len(plate_text)]] if probs is not None else None
+        results.append((plate_text, char_confidences))
+    return results
+
+
+_inference_engine: InferenceEngine | None = None
+_inference_engine_lock = threading.Lock()
+
+def get_inference_engine() -> InferenceEngine:
+    """Returns the process-wide InferenceEngine, creating it on first use. Models are loaded by InferenceEngine.load()."""
+    global _inference_engine
+    if _inference_engine is None:
+        with _inference_engine_lock:
+            if _inference_engine is None:
+                _inference_engine = InferenceEngine()
+    return _inference_engine
@@ -0,0 +1,78 @@
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LETTERBOX_PAD_VALUE = 114 # Grey padding, as the detector was trained with
+SUPPORTED_IMGSZ = (320, 384, 416, 480, 512, 640) # Multiples of the detector's 32 px stride
+
+
+def normalize_imgsz(imgsz, default: int) -> int:
+    """Rounds a requested inference size to a multiple of 32 within the supported range."""
+    try:
+        imgsz = int(imgsz)
+    except (TypeError, ValueError):
+        return default
+    return min(SUPPORTED_IMGSZ[-1], max(SUPPORTED_IMGSZ[0], round(imgsz / 32) * 32))
+
+
+class LetterboxBuffer:
+    """
+    Resizes, letterboxes and normalizes frames for one inference size into preallocated arrays.
+    The padded canvas, the resize target and the float NCHW batch tensor are allocated once and
+    reused for every frame, so steady-state preprocessing does not allocate. Not thread-safe;
+    the InferenceEngine only uses it under its detection lock.
+    """
+
+    def __init__(self, imgsz: int):
+        self.imgsz = imgsz
+        self._canvas = np.full((imgsz, imgsz, 3), LETTERBOX_PAD_VALUE, dtype=np.uint8)
+        self._resized: dict[tuple[int, int], np.ndarray] = {} # (width, height) -> resize target, one per source resolution
+        self._batch = np.empty((0, 3, imgsz, imgsz), dtype=np.float32)
+
+    def _ensure_batch(self, batch_size: int):
+        if self._batch.shape[0] < batch_size:
+            self._batch = np.empty((batch_size, 3, self.imgsz, self.imgsz), dtype=np.float32)
+            logger.debug(f"Letterbox buffer for imgsz={self.imgsz} grown to batch size {batch_size}.")
+
+    def _placement(self, frame_shape) -> tuple:
+        height, width = frame_shape[:2]
+        scale = min(self.imgsz / height, self.imgsz / width)
+        new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+        pad_x, pad_y = (self.imgsz - new_width) // 2, (self.imgsz - new_height) // 2
+        return scale, new_width, new_height, pad_x, pad_y
+
+    def prepare(self, frames: list) -> tuple[np.ndarray, list[tuple]]:
+        """
+        Letterboxes a list of BGR frames into the shared float32 RGB NCHW batch (values 0..1).
+        Returns (batch view, [(scale, pad_x, pad_y)] per frame). The batch is overwritten by the next call.
+        """
+        self._ensure_batch(len(frames))
+        transforms = []
+        for index, frame in enumerate(frames):
+            scale, new_width, new_height, pad_x, pad_y = self._placement(frame.shape)
+            resized = self._resized.get((new_width, new_height))
+            if resized is None:
+                resized = self._resized[(new_width, new_height)] = np.empty((new_height, new_width, 3), dtype=np.uint8)
+            cv2.resize(frame, (new_width, new_height), dst=resized, interpolation=cv2.INTER_LINEAR)
+
+            canvas = self._canvas
+            canvas[:] = LETTERBOX_PAD_VALUE
+            canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized
+            # BGR HWC uint8 -> RGB CHW float in one pass, straight into the preallocated batch slot
+            np.multiply(canvas[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=self._batch[index], casting="unsafe")
+            transforms.append((scale, pad_x, pad_y))
+        return self._batch[:len(frames)], transforms
+
+    @staticmethod
+    def to_frame_coordinates(boxes: np.ndarray, transform: tuple, frame_shape) -> np.ndarray:
+        """Maps [N, 4+] xyxy boxes from letterbox space back to the original frame, in place."""
+        scale, pad_x, pad_y = transform
+        if len(boxes):
+            boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / scale
+            boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad_y) / scale
+            boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_shape[1])
+            boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_shape[0])
+        return boxes
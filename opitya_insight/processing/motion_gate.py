@@ -0,0 +1,86 @@
+import logging
+import os
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+MOTION_GATE_ENABLED = os.getenv("MOTION_GATE_ENABLED", "true").lower() == "true"
+MOTION_DOWNSCALE_WIDTH = int(os.getenv("MOTION_DOWNSCALE_WIDTH", "160")) # Motion is measured on a frame this wide
+MOTION_PIXEL_THRESHOLD = int(os.getenv("MOTION_PIXEL_THRESHOLD", "25")) # Grayscale change that counts as a moving pixel
+MOTION_MIN_AREA_RATIO = float(os.getenv("MOTION_MIN_AREA_RATIO", "0.005")) # Share of the region that must move
+MOTION_HOLD_SECONDS = float(os.getenv("MOTION_HOLD_SECONDS", "1.5")) # Keep detecting this long after motion stops
+MOTION_FORCED_CHECK_SECONDS = float(os.getenv("MOTION_FORCED_CHECK_SECONDS", "5")) # Detect at least this often regardless
+
+
+class MotionGate:
+    """
+    Cheap frame-differencing gate in front of plate detection.
+    Each frame is shrunk to a small blurred grayscale image and compared with the previous one inside
+    the configured region. Detection runs only while something moves there (plus a short hold for
+    vehicles that come to a stop), and at least every forced_check_seconds so a missed change
+    is caught eventually. Only used from its StreamWorker's thread, apart from get_stats().
+    """
+
+    def __init__(self, enabled: bool = MOTION_GATE_ENABLED, region=None,
+                 min_area_ratio: float = MOTION_MIN_AREA_RATIO, forced_check_seconds: float = MOTION_FORCED_CHECK_SECONDS):
+        self.enabled = enabled
+        self.region = region # (x1, y1, x2, y2) as fractions of the frame, or None for the whole frame
+        self.min_area_ratio = min_area_ratio
+        self.forced_check_seconds = forced_check_seconds
+        self._previous = None
+        self._last_motion_at = 0.0
+        self._last_detection_at = 0.0
+        self.frames_checked = 0
+        self.frames_gated = 0
+
+    def configure(self, enabled: bool | None = None, region=None, min_area_ratio: float | None = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if region is not None:
+            self.region = tuple(region) if region else None
+            self._previous = None # The region changed, so the previous image is no longer comparable
+        if min_area_ratio is not None:
+            self.min_area_ratio = min_area_ratio
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        if self.region:
+            x1, y1, x2, y2 = self.region
+            frame = frame[int(y1 * height):int(y2 * height), int(x1 * width):int(x2 * width)]
+            height, width = frame.shape[:2]
+        if width == 0 or height == 0:
+            return None
+        scale = min(1.0, MOTION_DOWNSCALE_WIDTH / width)
+        small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0) # Smooth out sensor noise and compression artefacts
+
+    def has_motion(self, frame) -> bool:
+        current = self._prepare(frame)
+        previous, self._previous = self._previous, current
+        if current is None or previous is None or previous.shape != current.shape:
+            return True # Nothing to compare with yet: assume motion so the first frames are checked
+        _, moving = cv2.threshold(cv2.absdiff(current, previous), MOTION_PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(moving) >= self.min_area_ratio * moving.size
+
+    def should_detect(self, frame, timestamp: float) -> bool:
+        """True if detection should run on this frame."""
+        if not self.enabled:
+            return True
+        self.frames_checked += 1
+        if self.has_motion(frame):
+            self._last_motion_at = timestamp
+        if timestamp - self._last_motion_at <= MOTION_HOLD_SECONDS or timestamp - self._last_detection_at >= self.forced_check_seconds:
+            self._last_detection_at = timestamp
+            return True
+        self.frames_gated += 1
+        return False
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "frames_checked": self.frames_checked,
+            "frames_gated": self.frames_gated,
+            "gated_ratio": round(self.frames_gated / self.frames_checked, 3) if self.frames_checked else 0.0,
+        }
@@ -0,0 +1,70 @@
+import logging
+import os
+
+import cv2
+
+from processing.plate_tracker import box_iou
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_TTL_SECONDS = float(os.getenv("OCR_CACHE_TTL_SECONDS", "5")) # A cached read is trusted for this long after the OCR call
+OCR_CACHE_MAX_HAMMING = int(os.getenv("OCR_CACHE_MAX_HAMMING", "4")) # Differing bits (of 64) still treated as the same crop
+OCR_CACHE_MIN_IOU = float(os.getenv("OCR_CACHE_MIN_IOU", "0.7")) # The box must have stayed (nearly) in place
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "64"))
+
+
+def crop_signature(plate_crop) -> int:
+    """64-bit difference hash of a plate crop: grayscale, shrunk to 9x8, one bit per horizontal gradient sign."""
+    gray = cv2.cvtColor(plate_crop, cv2.COLOR_BGR2GRAY) if plate_crop.ndim == 3 else plate_crop
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    signature = 0
+    for bit in bits:
+        signature = (signature << 1) | int(bit)
+    return signature
+
+
+class OCRResultCache:
+    """
+    Per-camera cache of OCR reads keyed by box position and crop signature.
+    A parked or queued car yields a near-identical crop in the same place frame after frame; such
+    crops reuse the earlier (plate_text, char_confidences) instead of another OCR call. Entries
+    expire ttl_seconds after the read that created them, so a static scene is still re-read
+    periodically. Only used from its StreamWorker's thread, apart from get_stats().
+    """
+
+    def __init__(self, ttl_seconds: float = OCR_CACHE_TTL_SECONDS, max_hamming: int = OCR_CACHE_MAX_HAMMING,
+                 min_iou: float = OCR_CACHE_MIN_IOU, max_entries: int = OCR_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_hamming = max_hamming
+        self.min_iou = min_iou
+        self.max_entries = max_entries
+        self._entries: list[tuple] = [] # [(box, signature, result, created_at)]
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, box, signature: int, timestamp: float):
+        """Returns the cached (plate_text, char_confidences) for a matching crop, or None."""
+        self._entries = [entry for entry in self._entries if timestamp - entry[3] < self.ttl_seconds]
+        for cached_box, cached_signature, result, _ in self._entries:
+            if (cached_signature ^ signature).bit_count() <= self.max_hamming and box_iou(cached_box, box) >= self.min_iou:
+                self.hits += 1
+                return result
+        self.misses += 1
+        return None
+
+    def store(self, box, signature: int, result: tuple, timestamp: float):
+        if not result[0]: # Failed reads are retried next frame rather than cached
+            return
+        self._entries.append((box, signature, result, timestamp))
+        if len(self._entries) > self.max_entries:
+            del self._entries[0]
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,179 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", 0.3)) # Minimum overlap to continue a track
+TRACK_CENTROID_DISTANCE = float(os.getenv("TRACK_CENTROID_DISTANCE", 1.5)) # Fallback match distance, in box diagonals, for fast movers
+TRACK_MAX_AGE_SECONDS = float(os.getenv("TRACK_MAX_AGE_SECONDS", 2.0)) # Drop a track missing from a detection pass and not seen for this long
+TRACK_MIN_VOTE_SHARE = float(os.getenv("TRACK_MIN_VOTE_SHARE", 0.5)) # Share of the votes the leading read needs to stabilize
+TRACK_OCR_SKIP_SHARE = float(os.getenv("TRACK_OCR_SKIP_SHARE", 0.8)) # Stable tracks at or above this share stop running OCR
+TRACK_OCR_REFRESH_SECONDS = float(os.getenv("TRACK_OCR_REFRESH_SECONDS", 1.0)) # ...except for one confirming read this often
+
+
+def box_iou(box_a, box_b) -> float:
+    x1, y1 = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    x2, y2 = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    if intersection == 0:
+        return 0.0
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return intersection / float(area_a + area_b - intersection)
+
+def _centroid_distance(box_a, box_b) -> float:
+    """Distance between box centres, in units of box_a's diagonal."""
+    dx = (box_a[0] + box_a[2] - box_b[0] - box_b[2]) / 2
+    dy = (box_a[1] + box_a[3] - box_b[1] - box_b[3]) / 2
+    diagonal = max(1.0, ((box_a[2] - box_a[0]) ** 2 + (box_a[3] - box_a[1]) ** 2) ** 0.5)
+    return (dx * dx + dy * dy) ** 0.5 / diagonal
+
+
+class PlateTrack:
+    """One plate followed across frames, with the OCR reads collected for it so far."""
+
+    def __init__(self, track_id: int, box, conf: float, timestamp: float):
+        self.track_id = track_id
+        self.box = box
+        self.conf = conf # Best detection confidence seen on this track
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.last_ocr_at = 0.0
+        self.reads = 0 # OCR reads that produced text
+        self.votes: dict[str, float] = {} # plate_text -> summed read weight
+        self.best_reads: dict[str, tuple] = {} # plate_text -> (weight, char_confidences) of its most confident read
+        self.logged = False # Set once the track's plate has been handed off for logging
+        self.watchlist_match: dict = {} # Watchlist fields of the logged detection, shown on later frames too
+
+    def add_read(self, plate_text: str | None, char_confidences: list[float] | None, timestamp: float):
+        self.last_ocr_at = timestamp
+        if not plate_text:
+            return
+        # Weigh each read by how sure the OCR was, so one clean read outvotes a couple of blurry ones
+        weight = sum(char_confidences) / len(char_confidences) if char_confidences else 1.0
+        self.reads += 1
+        self.votes[plate_text] = self.votes.get(plate_text, 0.0) + weight
+        if weight >= self.best_reads.get(plate_text, (0.0, None))[0]:
+            self.best_reads[plate_text] = (weight, char_confidences)
+
+    def add_cached_read(self, timestamp: float):
+        """
+        A confirming read answered by the OCR cache. It is the same crop the recognizer already read, so it is
+        not an independent vote; it only counts as a recent OCR. The worker only asks the cache for stable tracks.
+        """
+        self.last_ocr_at = timestamp
+
+    @property
+    def plate_text(self) -> str | None:
+        """The leading read, or None if OCR has not produced any text yet."""
+        return max(self.votes, key=self.votes.get) if self.votes else None
+
+    @property
+    def vote_share(self) -> float:
+        total = sum(self.votes.values())
+        return self.votes[self.plate_text] / total if total else 0.0
+
+    @property
+    def char_confidences(self) -> list[float] | None:
+        plate_text = self.plate_text
+        return self.best_reads[plate_text][1] if plate_text else None
+
+    def is_stable(self, min_reads: int) -> bool:
+        return self.reads >= min_reads and self.vote_share >= TRACK_MIN_VOTE_SHARE
+
+
+class PlateTracker:
+    """
+    Lightweight IoU tracker with a centroid-distance fallback, one per camera.
+    Gives each plate a track ID across frames so OCR reads can be voted per vehicle instead of
+    per exact string, and so tracks whose plate is already settled can skip OCR altogether.
+    Only used from its StreamWorker's thread, apart from get_stats().
+    """
+
+    def __init__(self, iou_threshold: float = TRACK_IOU_THRESHOLD, max_age_seconds: float = TRACK_MAX_AGE_SECONDS):
+        self.iou_threshold = iou_threshold
+        self.max_age_seconds = max_age_seconds
+        self.tracks: dict[int, PlateTrack] = {}
+        self._next_track_id = 1
+        self._stats_lock = threading.Lock()
+        self.ocr_runs = 0 # Crops sent to the recognizer; OCR cache hits are counted by the cache
+        self.ocr_skipped = 0
+        self.tracks_created = 0
+
+    def update(self, boxes: list, timestamp: float) -> list[PlateTrack]:
+        """
+        Matches this frame's detections, given as [(x1, y1, x2, y2, conf)], to tracks.
+        Returns the track of each detection in the same order, creating tracks for new plates.
+        Only call it for frames that ran detection: tracks age here, so a plate that stops and is only
+        re-detected by the motion gate's forced checks keeps its track and its votes.
+        """
+        assigned: list[PlateTrack | None] = [None] * len(boxes)
+        free_tracks = set(self.tracks)
+
+        # Greedy matching on overlap first, best pairs first
+        pairs = sorted(
+            ((box_iou(track.box, box[:4]), index, track_id) for index, box in enumerate(boxes) for track_id, track in self.tracks.items()),
+            reverse=True,
+        )
+        for iou, index, track_id in pairs:
+            if iou < self.iou_threshold:
+                break
+            if assigned[index] is None and track_id in free_tracks:
+                assigned[index] = self.tracks[track_id]
+                free_tracks.discard(track_id)
+
+        # Plates that moved further than their own width between processed frames are matched by centre distance
+        for index, box in enumerate(boxes):
+            if assigned[index] is not None or not free_tracks:
+                continue
+            distance, track_id = min((_centroid_distance(self.tracks[track_id].box, box[:4]), track_id) for track_id in free_tracks)
+            if distance <= TRACK_CENTROID_DISTANCE:
+                assigned[index] = self.tracks[track_id]
+                free_tracks.discard(track_id)
+
+        for index, box in enumerate(boxes):
+            track = assigned[index]
+            if track is None:
+                track = assigned[index] = PlateTrack(self._next_track_id, box[:4], box[4], timestamp)
+                self.tracks[track.track_id] = track
+                self._next_track_id += 1
+                self.tracks_created += 1
+            else:
+                track.box = box[:4]
+                track.conf = max(track.conf, box[4])
+                track.last_seen = timestamp
+        self.prune(timestamp)
+        return assigned
+
+    def needs_ocr(self, track: PlateTrack, min_reads: int, timestamp: float) -> bool:
+        """False for tracks whose plate is already settled, apart from an occasional confirming read."""
+        confident = track.is_stable(min_reads) and track.vote_share >= TRACK_OCR_SKIP_SHARE
+        needed = not confident or timestamp - track.last_ocr_at >= TRACK_OCR_REFRESH_SECONDS
+        if not needed:
+            with self._stats_lock:
+                self.ocr_skipped += 1
+        return needed
+
+    def count_ocr_runs(self, count: int):
+        """Records crops that actually went to the recognizer, i.e. needed OCR and missed the cache."""
+        with self._stats_lock:
+            self.ocr_runs += count
+
+    def prune(self, timestamp: float) -> list[PlateTrack]:
+        """Drops and returns the tracks not seen for max_age_seconds. Called by update()."""
+        stale = [track for track in self.tracks.values() if timestamp - track.last_seen > self.max_age_seconds]
+        for track in stale:
+            del self.tracks[track.track_id]
+        return stale
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            total = self.ocr_runs + self.ocr_skipped
+            return {
+                "active_tracks": len(self.tracks),
+                "tracks_created": self.tracks_created,
+                "ocr_runs": self.ocr_runs,
+                "ocr_skipped": self.ocr_skipped,
+                "ocr_skip_ratio": round(self.ocr_skipped / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,69 @@
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+TARGET_PROCESSING_FPS = float(os.getenv("TARGET_PROCESSING_FPS", "8"))
+CPU_BUDGET_PER_CAMERA = float(os.getenv("CPU_BUDGET_PER_CAMERA", "1.0")) # Fraction of wall time a camera may spend in detection+OCR
+MIN_FRAME_SKIP = 1
+MAX_FRAME_SKIP = int(os.getenv("MAX_FRAME_SKIP", "30"))
+
+
+class AdaptiveRateController:
+    """
+    Chooses a StreamWorker's frame skip from the measured detection+OCR time.
+    The processing rate is the lower of target_fps and what the camera's CPU budget allows
+    at the current per-frame cost, so adding cameras (slower, contended inference) raises the
+    skip gradually instead of letting latency pile up.
+    """
+
+    def __init__(self, target_fps: float = TARGET_PROCESSING_FPS, cpu_budget: float = CPU_BUDGET_PER_CAMERA,
+                 initial_skip: int = 3, smoothing: float = 0.2, max_skip: int = MAX_FRAME_SKIP):
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.smoothing = smoothing # EWMA weight of the newest measurement
+        self.max_skip = max(MIN_FRAME_SKIP, max_skip)
+        self.frame_skip = initial_skip
+        self.avg_processing_ms = None
+
+    def configure(self, target_fps: float | None = None, cpu_budget: float | None = None):
+        if target_fps is not None and target_fps > 0:
+            self.target_fps = target_fps
+        if cpu_budget is not None and cpu_budget > 0:
+            self.cpu_budget = cpu_budget
+
+    @property
+    def achievable_fps(self) -> float:
+        """Processing rate allowed by the current per-frame cost and CPU budget, capped at target_fps."""
+        if not self.avg_processing_ms:
+            return self.target_fps
+        return min(self.target_fps, self.cpu_budget * 1000 / self.avg_processing_ms)
+
+    def update(self, processing_ms: float, stream_fps: float) -> int:
+        """Feeds one measured detection+OCR time and returns the frame skip to use next."""
+        if self.avg_processing_ms is None:
+            self.avg_processing_ms = processing_ms
+        else:
+            self.avg_processing_ms += self.smoothing * (processing_ms - self.avg_processing_ms)
+
+        if stream_fps <= 0: # Source rate not measured yet, keep the current skip
+            return self.frame_skip
+
+        desired_skip = math.ceil(stream_fps / max(self.achievable_fps, 0.01))
+        desired_skip = max(MIN_FRAME_SKIP, min(self.max_skip, desired_skip))
+        # Move one step at a time so a single slow frame does not make the stream stutter
+        if desired_skip > self.frame_skip:
+            self.frame_skip += 1
+        elif desired_skip < self.frame_skip:
+            self.frame_skip -= 1
+        return self.frame_skip
+
+    def get_stats(self) -> dict:
+        return {
+            "frame_skip": self.frame_skip,
+            "target_fps": self.target_fps,
+            "cpu_budget": self.cpu_budget,
+            "avg_processing_ms": round(self.avg_processing_ms, 2) if self.avg_processing_ms is not None else None,
+            "achievable_fps": round(self.achievable_fps, 2),
+        }
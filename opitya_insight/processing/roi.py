@@ -0,0 +1,77 @@
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RegionOfInterest:
+    """
+    Part of a camera's frame that detection looks at, from Camera.meta["roi"].
+    Accepts a rectangle [x1, y1, x2, y2] or a polygon [[x, y], ...], both as fractions of the frame
+    so the setting survives resolution changes. Detection runs on the bounding rectangle only;
+    for polygons the pixels outside the polygon are blacked out as well.
+    """
+
+    def __init__(self, points: list[tuple[float, float]], is_polygon: bool):
+        self.points = points
+        self.is_polygon = is_polygon
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        self.bounds = (min(xs), min(ys), max(xs), max(ys)) # Fractional bounding rectangle
+        self._cached_shape = None
+        self._cached_rect = None
+        self._cached_mask = None
+
+    @classmethod
+    def from_meta(cls, spec) -> "RegionOfInterest | None":
+        """Parses meta["roi"]; returns None for a missing, whole-frame or malformed value."""
+        if not spec:
+            return None
+        try:
+            if all(isinstance(value, (int, float)) for value in spec):
+                x1, y1, x2, y2 = (min(1.0, max(0.0, float(value))) for value in spec)
+                points, is_polygon = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)], False
+            else:
+                points, is_polygon = [(min(1.0, max(0.0, float(x))), min(1.0, max(0.0, float(y)))) for x, y in spec], True
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring malformed ROI {spec!r}; expected [x1, y1, x2, y2] or [[x, y], ...] as fractions of the frame.")
+            return None
+        roi = cls(points, is_polygon)
+        x1, y1, x2, y2 = roi.bounds
+        if len(points) < 3 or x2 <= x1 or y2 <= y1:
+            logger.warning(f"Ignoring empty ROI {spec!r}.")
+            return None
+        if (x1, y1, x2, y2) == (0.0, 0.0, 1.0, 1.0) and not is_polygon:
+            return None
+        return roi
+
+    def _prepare(self, frame_shape):
+        """Pixel rectangle (and polygon mask) for one frame size, computed once per resolution."""
+        if frame_shape == self._cached_shape:
+            return self._cached_rect, self._cached_mask
+        height, width = frame_shape[:2]
+        x1, y1, x2, y2 = self.bounds
+        rect = (int(x1 * width), int(y1 * height), max(int(x1 * width) + 1, int(x2 * width)), max(int(y1 * height) + 1, int(y2 * height)))
+        mask = None
+        if self.is_polygon:
+            mask = np.zeros((rect[3] - rect[1], rect[2] - rect[0]), dtype=np.uint8)
+            polygon = np.array([(int(x * width) - rect[0], int(y * height) - rect[1]) for x, y in self.points], dtype=np.int32)
+            cv2.fillPoly(mask, [polygon], 255)
+        self._cached_shape, self._cached_rect, self._cached_mask = frame_shape, rect, mask
+        return rect, mask
+
+    def apply(self, frame):
+        """Returns (detection_frame, (offset_x, offset_y)). Add the offset to boxes found in detection_frame."""
+        (x1, y1, x2, y2), mask = self._prepare(frame.shape)
+        cropped = frame[y1:y2, x1:x2] # A view; no pixels are copied for rectangles
+        if mask is not None:
+            cropped = cv2.bitwise_and(cropped, cropped, mask=mask)
+        return cropped, (x1, y1)
+
+    def draw(self, frame, color=(255, 200, 0)):
+        """Outlines the region on an annotated frame."""
+        height, width = frame.shape[:2]
+        polygon = np.array([(int(x * width), int(y * height)) for x, y in self.points], dtype=np.int32)
+        cv2.polylines(frame, [polygon], True, color, 1)
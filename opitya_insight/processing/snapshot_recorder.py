@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+
+import cv2
+
+from processing.frame_ring import FRAME_RING_SLOT_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Raw (unannotated) frames kept per camera for snapshots, one every SNAPSHOT_INTERVAL_SECONDS, at most
+# SNAPSHOT_MAX_WIDTH wide (0 keeps the camera's resolution). The ring lives in shared memory (/dev/shm) and
+# takes SNAPSHOT_RING_SLOTS x snapshot_slot_bytes() per camera: about 3 MB at the defaults, or
+# FRAME_RING_SLOT_BYTES per slot uncapped. Frames whose JPEG does not fit a slot are not recorded.
+# With the live frame ring (see frame_slot_bytes()) that is about 10 MB of /dev/shm per camera; see shm_size in docker-compose.yml.
+SNAPSHOT_RING_SLOTS = int(os.getenv("SNAPSHOT_RING_SLOTS", "5"))
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "1.0")) # 0 disables snapshot recording
+SNAPSHOT_MAX_WIDTH = int(os.getenv("SNAPSHOT_MAX_WIDTH", "1280"))
+SNAPSHOT_JPEG_QUALITY = int(os.getenv("SNAPSHOT_JPEG_QUALITY", "85"))
+SNAPSHOT_ENCODER_NICENESS = int(os.getenv("SNAPSHOT_ENCODER_NICENESS", "10")) # Added to the encoder thread's nice value, so inference wins the CPU
+
+
+def snapshot_slot_bytes(max_width: int = SNAPSHOT_MAX_WIDTH) -> int:
+    """Slot size for a snapshot ring: room for a q85 JPEG of a 4:3 frame max_width wide, with margin."""
+    if max_width <= 0:
+        return FRAME_RING_SLOT_BYTES
+    return max_width * max_width * 3 // 8
+
+
+class SnapshotRecorder(threading.Thread):
+    """
+    Keeps a camera's recent history in its snapshot ring: the raw frame, JPEG-encoded and stamped with
+    its capture time, every interval_seconds. Snapshot requests, including "the frame at time T", are
+    then answered straight from shared memory by the API process without asking the worker for anything.
+    record() only hands the frame over; downscaling and encoding run on this low-priority thread so the
+    inference loop never pays for them. If the encoder falls behind, the older pending frame is dropped.
+    """
+
+    def __init__(self, ring, camera_id: int | None = None, interval_seconds: float = SNAPSHOT_INTERVAL_SECONDS,
+                 max_width: int = SNAPSHOT_MAX_WIDTH, quality: int = SNAPSHOT_JPEG_QUALITY):
+        super().__init__(name=f"snapshot-encoder-{camera_id}", daemon=True)
+        self.ring = ring
+        self.interval_seconds = interval_seconds
+        self.max_width = max_width
+        self.quality = quality
+        self.running = True
+        self.last_recorded_at = 0.0
+        self.snapshots_recorded = 0
+        self.snapshots_dropped = 0 # Replaced by a newer frame before the encoder got to them
+        self._condition = threading.Condition()
+        self._pending = None # (frame, captured_at) waiting to be encoded
+
+    @property
+    def enabled(self) -> bool:
+        return self.ring is not None and self.interval_seconds > 0
+
+    def record(self, frame, captured_at: float):
+        """Queues the frame if the last one is at least interval_seconds older. Called by the worker for every frame it picks up."""
+        if not self.enabled or captured_at - self.last_recorded_at < self.interval_seconds:
+            return
+        self.last_recorded_at = captured_at
+        with self._condition:
+            if self._pending is not None:
+                self.snapshots_dropped += 1
+            self._pending = (frame, captured_at) # Frames from the grabber are never modified, so no copy is needed
+            self._condition.notify()
+
+    def run(self):
+        if not self.enabled:
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), os.getpriority(os.PRIO_PROCESS, 0) + SNAPSHOT_ENCODER_NICENESS)
+        except (AttributeError, OSError): # Per-thread niceness is Linux-only
+            pass
+        while True:
+            with self._condition:
+                while self.running and self._pending is None:
+                    self._condition.wait()
+                if not self.running:
+                    return
+                frame, captured_at = self._pending
+                self._pending = None
+            self._encode(frame, captured_at)
+
+    def _encode(self, frame, captured_at: float):
+        height, width = frame.shape[:2]
+        if self.max_width > 0 and width > self.max_width:
+            height, width = max(1, height * self.max_width // width), self.max_width
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        success, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not success:
+            logger.warning("Failed to encode snapshot frame.")
+            return
+        if self.ring.publish(buffer, {"width": width, "height": height}, timestamp=captured_at):
+            self.snapshots_recorded += 1
+
+    def stop(self):
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+
+    def get_stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "max_width": self.max_width,
+            "snapshots_recorded": self.snapshots_recorded,
+            "snapshots_dropped": self.snapshots_dropped,
+        }
@@ -1,12 +1,8 @@
-import cv2
-from ultralytics import YOLO
-from fast_plate_ocr import LicensePlateRecognizer
 import logging
 import threading
 import time
 from datetime import datetime
 from queue import Queue
-import pathlib
 # Configure logging
 logging.basicConfig(level=logging.DEBUG) # Changed to DEBUG for detailed performance logging
 logger = logging.getLogger(__name__)
@@ -14,56 +10,116 @@ logger = logging.getLogger(__name__)
 logger.info("STREAM_WORKER_MODULE_LOADED: Version with 4 arguments for start_stream_worker.") # Added for debugging module loading
 
 from database import models, database
+from processing.inference_engine import get_inference_engine, DEFAULT_DETECTION_IMGSZ
+from processing.letterbox import normalize_imgsz
+from core.watchlist_index import watchlist_index
+from processing.batch_scheduler import get_detection_scheduler, get_ocr_scheduler
+from processing.frame_grabber import FrameGrabber
+from processing.rate_controller import AdaptiveRateController
+from processing.plate_tracker import PlateTracker
+from processing.ocr_cache import OCRResultCache, crop_signature
+from processing.motion_gate import MotionGate, MOTION_GATE_ENABLED
+from processing.roi import RegionOfInterest
+from processing.camera_meta import meta_flag, meta_number, motion_region
+from processing.frame_renderer import annotate_frame, encode_renditions
+from processing.snapshot_recorder import SnapshotRecorder
+from core.evidence_store import get_evidence_store, prepare_evidence
+
+DEFAULT_DETECTION_CONFIDENCE = 0.70
+DEFAULT_PLATE_COOLDOWN_SECONDS = 15
+DEFAULT_STABILIZATION_THRESHOLD = 3
+
+def camera_config_to_dict(camera: models.Camera) -> dict:
+    """Detached snapshot of the Camera fields a worker needs, safe to cache and to send to worker processes."""
+    return {
+        "owner_id": camera.owner_id,
+        "name": camera.name,
+        "site": camera.site,
+        "meta": dict(camera.meta or {}),
+    }
 
 class StreamWorker(threading.Thread):
-    def __init__(self, camera_id: int, rtsp_url: str, db_session_factory, shared_data: dict):
+    def __init__(self, camera_id: int, rtsp_url: str, db_session_factory, shared_data: dict, frame_ring=None, on_frame=None, snapshot_ring=None):
         super().__init__()
         self.camera_id = camera_id
         self.rtsp_url = rtsp_url
         self.db_session_factory = db_session_factory
         self.shared_data = shared_data # Shared dictionary to update with processed frames and data
+        self.frame_ring = frame_ring # Shared-memory ring that receives the encoded frames, in both thread and process mode
+        self.on_frame = on_frame # Called with the ring sequence number after each published frame (0 on status change)
+        self.snapshot_recorder = SnapshotRecorder(snapshot_ring, camera_id) # Raw frame history in shared memory, for snapshots; encodes on its own thread
         self.running = True
-        self.detection_model = None
-        self.ocr_model = None
-        self.frame_skip = 3 # Process every 3rd frame for a balance of smoothness and performance
+        self.inference_engine = get_inference_engine() # Models are shared by all workers in this process
+        self.detection_scheduler = None # Cross-camera batching schedulers, attached once the models are loaded
+        self.ocr_scheduler = None
+        self.DETECTION_TIMEOUT_SECONDS = 30 # Give up on a batch result rather than hang the worker forever
+        self.frame_skip = 3 # Initial skip; adjusted by the rate controller from measured processing time
+        self.rate_controller = AdaptiveRateController(initial_skip=self.frame_skip)
+        self.frame_grabber = None # Capture thread, created when the worker starts
         self.plate_log_queue = Queue() # Queue for asynchronous plate logging
         
         # Real-World Scenario Enhancements (moved from main.py)
-        self.PLATE_COOLDOWN_SECONDS = 15  # Cooldown to prevent re-logging the same plate.
-        self.STABILIZATION_THRESHOLD = 3  # Require a plate to be seen this many times to be considered stable.
-        self.CANDIDATE_PATIENCE_FRAMES = 10 # How many frames to wait before discarding an unstable candidate.
+        self.PLATE_COOLDOWN_SECONDS = DEFAULT_PLATE_COOLDOWN_SECONDS  # Cooldown to prevent re-logging the same plate.
+        self.STABILIZATION_THRESHOLD = DEFAULT_STABILIZATION_THRESHOLD  # Require a plate to be seen this many times to be considered stable.
+        self.DETECTION_CONFIDENCE_THRESHOLD = DEFAULT_DETECTION_CONFIDENCE # Detections below this are ignored
 
         # State Management (moved from main.py)
         self.recently_seen_plates = {} # Tracks the last time a confirmed plate was logged to enforce cooldown. {plate_text: timestamp}
-        self.candidate_plates = {} # Tracks potential plates that have not yet met the stabilization threshold. {plate_text: {'count': int, 'last_seen_frame': int}}
+        self.plate_tracker = PlateTracker() # Follows plates across frames and votes their OCR reads per track
+        self.ocr_cache = OCRResultCache() # Reuses reads of near-identical crops that stayed in place
+        self.motion_gate = MotionGate() # Idles detection while the scene is still
+        self.roi = None # RegionOfInterest from the camera config, or None for the full frame
+        self.imgsz = DEFAULT_DETECTION_IMGSZ # Detector input size for this camera
+        self.frames_encoded = 0
+        self.encodes_avoided = 0
+
+        # Camera config (owner, site, meta), loaded once when the worker starts and pushed on camera updates
+        self.camera_config = {}
+        self.owner_id = None
 
         logger.info(f"StreamWorker for camera {self.camera_id} initialized with URL: {self.rtsp_url}")
 
     def _initialize_models(self):
-        # Construct absolute path to the model file
-        base_dir = pathlib.Path(__file__).resolve().parent.parent.parent # Go up from processing to opitya_insight
-        model_path = base_dir / "opitya_insight" / "models" / "weights" / "LP-detection.pt"
-        
-        ocr_model_name = "cct-xs-v1-global-model"
-
-        logger.info(f"Loading detection model from {model_path} for camera {self.camera_id} with imgsz=320...")
-        try:
-            self.detection_model = YOLO(str(model_path)) # Load model
-            self.detection_model.fuse() # Fuse model for faster inference
-            logger.info(f"Detection model loaded successfully for camera {self.camera_id}.")
-        except Exception as e:
-            logger.error(f"Error loading detection model for camera {self.camera_id}: {e}")
-            logger.error("The YOLO model failed to load. This might be due to a corrupted model file or an incompatibility with the installed ultralytics/PyTorch versions. Please ensure your environment is consistent with when the model was working.")
+        # The shared engine loads the models only for the first worker; later workers return immediately
+        logger.info(f"Attaching camera {self.camera_id} to the shared inference engine...")
+        if not self.inference_engine.load():
+            logger.error(f"Shared inference engine is unavailable for camera {self.camera_id}.")
             return False
+        self.detection_scheduler = get_detection_scheduler()
+        self.ocr_scheduler = get_ocr_scheduler()
+        return True
 
-        logger.info(f"Initializing OCR model for camera {self.camera_id}...")
+    def _load_camera_config(self) -> bool:
+        db = self.db_session_factory()
         try:
-            self.ocr_model = LicensePlateRecognizer(ocr_model_name)
-            logger.info(f"OCR model initialized successfully for camera {self.camera_id}.")
+            camera = db.query(models.Camera).filter(models.Camera.id == self.camera_id).first()
+            if camera is None:
+                logger.error(f"Camera {self.camera_id} no longer exists; not starting its worker.")
+                return False
+            self.update_config(camera_config_to_dict(camera))
+            return True
         except Exception as e:
-            logger.error(f"Error initializing OCR model for camera {self.camera_id}: {e}")
+            logger.error(f"Error loading config for camera {self.camera_id}: {e}")
             return False
-        return True
+        finally:
+            db.close()
+
+    def update_config(self, config: dict):
+        """Applies a camera config from camera_config_to_dict(). Safe to call from another thread while running."""
+        meta = config.get("meta") or {}
+        # Camera meta is free-form JSON from the API; a bad value falls back to the default instead of stopping the worker
+        self.DETECTION_CONFIDENCE_THRESHOLD = meta_number(meta, "detection_confidence", DEFAULT_DETECTION_CONFIDENCE, float, 0.0, 1.0)
+        self.PLATE_COOLDOWN_SECONDS = meta_number(meta, "plate_cooldown_seconds", DEFAULT_PLATE_COOLDOWN_SECONDS, float, 0.0)
+        self.STABILIZATION_THRESHOLD = meta_number(meta, "stabilization_threshold", DEFAULT_STABILIZATION_THRESHOLD, int, 1)
+        # meta["imgsz"] trades recall on small, distant plates for speed; rounded to a multiple of 32
+        self.imgsz = normalize_imgsz(meta.get("imgsz"), DEFAULT_DETECTION_IMGSZ)
+        # meta["roi"] is [x1, y1, x2, y2] or [[x, y], ...] as fractions of the frame; detection only sees that region
+        self.roi = RegionOfInterest.from_meta(meta.get("roi"))
+        # meta["motion_region"] takes the same forms as meta["roi"] and defaults to it
+        self.motion_gate.configure(enabled=meta_flag(meta, "motion_gate", MOTION_GATE_ENABLED), region=motion_region(meta, self.roi))
+        self.owner_id = config.get("owner_id")
+        self.camera_config = config
+        logger.info(f"Camera {self.camera_id} config applied (owner {self.owner_id}, site {config.get('site')}, imgsz {self.imgsz}).")
 
     def _update_camera_status(self, status: str):
         db = self.db_session_factory()
@@ -81,20 +137,25 @@ class StreamWorker(threading.Thread):
         finally:
             db.close()
 
-    def _save_plate_logs_batch(self, plate_detections: list, user_id: int):
+    def _save_plate_logs_batch(self, plate_detections: list, user_id: int, evidence: list | None = None, captured_at: float | None = None):
         if not plate_detections:
             return
 
+        # Encoded and queued for the evidence writer here, off the inference thread; only the references go to the database
+        captured_at = datetime.utcfromtimestamp(captured_at) if captured_at else datetime.utcnow()
+        evidence_refs = get_evidence_store().store(evidence, captured_at) if evidence else [None] * len(plate_detections)
         db = self.db_session_factory()
         try:
             plate_logs = []
-            for detection in plate_detections:
+            for detection, refs in zip(plate_detections, evidence_refs):
                 plate_log = models.PlateLog(
                     camera_id=self.camera_id,
                     user_id=user_id,
                     plate_text=detection["plate_text"],
                     timestamp=datetime.utcnow(),
-                    confidence=int(detection["confidence"] * 100)
+                    confidence=int(detection["confidence"] * 100),
+                    image_snapshot_ref=refs["context"] if refs else None,
+                    extra_metadata={"evidence": refs} if refs else None,
                 )
                 plate_logs.append(plate_log)
             
@@ -111,8 +172,8 @@ class StreamWorker(threading.Thread):
     def _log_plates_from_queue(self):
         while self.running or not self.plate_log_queue.empty():
             try:
-                plate_detections_batch, user_id = self.plate_log_queue.get(timeout=1) # Wait for 1 second
-                self._save_plate_logs_batch(plate_detections_batch, user_id)
+                plate_detections_batch, user_id, evidence, captured_at = self.plate_log_queue.get(timeout=1) # Wait for 1 second
+                self._save_plate_logs_batch(plate_detections_batch, user_id, evidence, captured_at)
                 self.plate_log_queue.task_done()
             except Exception as e:
                 # This can happen if queue is empty and timeout occurs, which is fine during shutdown
@@ -121,20 +182,24 @@ class StreamWorker(threading.Thread):
             time.sleep(0.1) # Small sleep to prevent busy-waiting
 
     def run(self):
-        if not self._initialize_models():
+        if not self._load_camera_config() or not self._initialize_models():
             self._update_camera_status("offline")
             return
+        if self.owner_id:
+            watchlist_index.preload(self.owner_id) # Builds in the background while the stream opens
 
-        logger.info(f"Attempting to open video stream for camera {self.camera_id} from {self.rtsp_url}")
-        cap = cv2.VideoCapture(self.rtsp_url)
-
-        if not cap.isOpened():
+        self.frame_grabber = FrameGrabber(self.camera_id, self.rtsp_url, on_status=self._update_camera_status)
+        if not self.frame_grabber.open():
             logger.error(f"Error: Could not open video stream for camera {self.camera_id} from {self.rtsp_url}. Please check the RTSP URL and camera availability.")
             self._update_camera_status("offline")
             return
 
         logger.info(f"Successfully opened video stream for camera {self.camera_id}.")
         self._update_camera_status("online")
+        self.frame_grabber.start() # Capture runs on its own thread and keeps only the newest frames
+        self.snapshot_recorder.start()
+        self.detection_scheduler.register(self.camera_id) # Batches now wait for this camera's frames too
+        self.ocr_scheduler.register(self.camera_id)
         
         # Start the asynchronous logging thread
         logging_thread = threading.Thread(target=self._log_plates_from_queue, daemon=True)
@@ -143,51 +208,56 @@ class StreamWorker(threading.Thread):
 
         frame_count = 0
         while self.running:
-            frame_read_start_time = time.perf_counter()
-            ret, frame = cap.read()
-            frame_read_end_time = time.perf_counter()
-            # logger.debug(f"Camera {self.camera_id} - Frame {frame_count} Read took {(frame_read_end_time - frame_read_start_time) * 1000:.2f} ms")
-
-            if not ret:
-                logger.warning(f"End of stream or cannot read frame for camera {self.camera_id}. Attempting to reconnect...")
-                cap.release()
-                time.sleep(5) # Wait before attempting to reconnect
-                cap = cv2.VideoCapture(self.rtsp_url)
-                if not cap.isOpened():
-                    logger.error(f"Failed to reconnect to stream for camera {self.camera_id}.")
-                    self._update_camera_status("offline")
-                    break # Exit if reconnection fails
-                else:
-                    logger.info(f"Successfully reconnected to stream for camera {self.camera_id}.")
-                    self._update_camera_status("online")
+            # Wait for a frame at least frame_skip newer than the last one processed, but always take the freshest
+            packet = self.frame_grabber.read_latest(min_seq=frame_count + self.frame_skip, timeout=1.0)
+            if packet is None:
+                if not self.frame_grabber.is_alive():
+                    break # Stream was lost and could not be reconnected
                 continue
 
-            frame_count += 1
-            if frame_count % self.frame_skip != 0:
-                continue
+            frame_read_start_time = time.perf_counter()
+            frame_count, frame, captured_at = packet
+            frame_age_ms = (time.time() - captured_at) * 1000 # How stale the frame was when inference picked it up
+            self.snapshot_recorder.record(frame, captured_at) # Before detection, so snapshots stay close to live
+            # logger.debug(f"Camera {self.camera_id} - Frame {frame_count} picked up {frame_age_ms:.2f} ms after capture")
 
-            annotated_frame = frame.copy()
+            roi = self.roi # Read once; update_config() may swap it from another thread
             
+            # Skip detection (and so OCR) while nothing moves in the camera's motion region
+            detected = self.motion_gate.should_detect(frame, captured_at)
+            results = []
+            offset_x, offset_y = 0, 0
             detection_start_time = time.perf_counter()
-            results = self.detection_model(frame)
+            if detected:
+                # Detect on the region of interest only; boxes are shifted back to full-frame coordinates below
+                detection_frame, (offset_x, offset_y) = roi.apply(frame) if roi is not None else (frame, (0, 0))
+                try:
+                    # Frames from all cameras are batched centrally; we get back the results for our frame only
+                    results = self.detection_scheduler.submit([(detection_frame, self.imgsz)], key=self.camera_id).result(timeout=self.DETECTION_TIMEOUT_SECONDS)
+                except Exception as e:
+                    logger.error(f"Camera {self.camera_id} - Detection failed for frame {frame_count}: {e}")
+                    continue
             detection_end_time = time.perf_counter()
             detection_time_ms = (detection_end_time - detection_start_time) * 1000
             # logger.debug(f"Camera {self.camera_id} - Frame {frame_count} Detection took {detection_time_ms:.2f} ms")
             
-            stabilized_plates_in_frame = []
+            plates_in_frame = [] # Every tracked plate in this frame, for the live view
+            plates_to_log = [] # Plates whose track stabilized on this frame; each vehicle is logged once
+            tracks_to_log = []
             current_time = time.time()
 
-            for result in results:
-                for box in result.boxes:
-                    xyxy = box.xyxy[0].tolist()
-                    conf = box.conf[0].item()
+            # Collect every confident plate box first so OCR runs once for the whole frame
+            plate_candidates = [] # [(x1, y1, x2, y2, conf, plate_crop)]
+            for detection in results:
+                for *xyxy, conf in detection.tolist(): # (x1, y1, x2, y2, conf) in detection_frame coordinates
                     
                     # Enforce 70% confidence threshold for detection
-                    if conf < 0.70:
-                        # logger.debug(f"Camera {self.camera_id} - Skipping detection due to low confidence ({conf:.2f} < 0.70)")
+                    if conf < self.DETECTION_CONFIDENCE_THRESHOLD:
+                        # logger.debug(f"Camera {self.camera_id} - Skipping detection due to low confidence ({conf:.2f} < {self.DETECTION_CONFIDENCE_THRESHOLD:.2f})")
                         continue # Skip this detection if confidence is too low
 
                     x1, y1, x2, y2 = map(int, xyxy)
+                    x1, y1, x2, y2 = x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y
                     plate_crop = frame[y1:y2, x1:x2]
 
                     # Ensure plate_crop is not empty before OCR
@@ -195,133 +265,184 @@ class StreamWorker(threading.Thread):
                         # logger.warning(f"Camera {self.camera_id} - Empty plate crop for detection with confidence {conf:.2f}. Skipping OCR.")
                         continue
 
-                    ocr_start_time = time.perf_counter()
-                    ocr_results = self.ocr_model.run(plate_crop)
-                    ocr_end_time = time.perf_counter()
-                    ocr_time_ms = (ocr_end_time - ocr_start_time) * 1000
-                    # logger.debug(f"Camera {self.camera_id} - Frame {frame_count} OCR took {ocr_time_ms:.2f} ms")
-
-                    if ocr_results:
-                        plate_text = ocr_results[0]
-                        
-                        # 1. Check if plate is on cooldown (already logged recently)
-                        if plate_text in self.recently_seen_plates and \
-                           (current_time - self.recently_seen_plates[plate_text] < self.PLATE_COOLDOWN_SECONDS):
-                            # Still draw the box, but don't process for logging.
-                            label = f"{plate_text} ({conf:.2f})"
-                            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                            cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                            continue
-
-                        # 2. Update candidate plates
-                        if plate_text in self.candidate_plates:
-                            self.candidate_plates[plate_text]['count'] += 1
-                            self.candidate_plates[plate_text]['last_seen_frame'] = frame_count
-                        else:
-                            # New candidate detected
-                            self.candidate_plates[plate_text] = {'count': 1, 'last_seen_frame': frame_count}
-                        
-                        # 3. Check for stabilization and promote if ready
-                        if self.candidate_plates[plate_text]['count'] >= self.STABILIZATION_THRESHOLD:
-                            stabilized_plates_in_frame.append(plate_text)
+                    plate_candidates.append((x1, y1, x2, y2, conf, plate_crop))
+
+            # Follow each plate across frames; OCR only runs for tracks whose plate is not settled yet.
+            # Gated frames leave the tracks alone, so a vehicle that stops keeps its track between forced checks.
+            tracks = self.plate_tracker.update([candidate[:5] for candidate in plate_candidates], captured_at) if detected else []
+            ocr_indices = []
+            ocr_signatures = []
+            for index, track in enumerate(tracks):
+                if not self.plate_tracker.needs_ocr(track, self.STABILIZATION_THRESHOLD, captured_at):
+                    continue
+                # A crop that looks the same, in the same place, as one read recently reuses that read.
+                # Cached reads are not votes, so tracks still stabilizing always get a real read.
+                signature = crop_signature(plate_candidates[index][5])
+                if track.is_stable(self.STABILIZATION_THRESHOLD) and self.ocr_cache.lookup(plate_candidates[index][:4], signature, captured_at) is not None:
+                    track.add_cached_read(captured_at)
+                    continue
+                ocr_indices.append(index)
+                ocr_signatures.append(signature)
+            self.plate_tracker.count_ocr_runs(len(ocr_indices))
+
+            ocr_time_ms = 0.0
+            if ocr_indices:
+                ocr_start_time = time.perf_counter()
+                try:
+                    # One batched OCR call for all crops, also batched with other cameras by the OCR scheduler
+                    ocr_results = self.ocr_scheduler.submit([plate_candidates[index][5] for index in ocr_indices], key=self.camera_id).result(timeout=self.DETECTION_TIMEOUT_SECONDS)
+                except Exception as e:
+                    logger.error(f"Camera {self.camera_id} - OCR failed for frame {frame_count}: {e}")
+                    ocr_results = [(None, None)] * len(ocr_indices)
+                ocr_end_time = time.perf_counter()
+                ocr_time_ms = (ocr_end_time - ocr_start_time) * 1000
+                # logger.debug(f"Camera {self.camera_id} - Frame {frame_count} OCR of {len(ocr_indices)} crops took {ocr_time_ms:.2f} ms")
+                for index, signature, ocr_result in zip(ocr_indices, ocr_signatures, ocr_results):
+                    tracks[index].add_read(*ocr_result, captured_at) # Vote the read into the plate's track
+                    self.ocr_cache.store(plate_candidates[index][:4], signature, ocr_result, captured_at)
+
+            # Adapt how many frames we skip to the measured inference cost and the source frame rate.
+            # Gated frames cost next to nothing and would pull the skip down just before motion brings real load.
+            if detected:
+                self.frame_skip = self.rate_controller.update(detection_time_ms + ocr_time_ms, self.frame_grabber.stream_fps)
+
+            # Map the voted track results back to their boxes
+            for (x1, y1, x2, y2, conf, _), track in zip(plate_candidates, tracks):
+                plate_text = track.plate_text
+                if plate_text:
+                    # Store the detection with bounding box and confidence
+                    plate_detection = {
+                        "plate_text": plate_text,
+                        "confidence": conf,
+                        "char_confidences": track.char_confidences,
+                        "box": [x1, y1, x2, y2],
+                        "track_id": track.track_id,
+                        "vote_share": round(track.vote_share, 3),
+                    }
+                    plate_detection.update(track.watchlist_match)
+                    plates_in_frame.append(plate_detection)
+
+                    # Promote the track once enough reads agree, and log it once per vehicle
+                    if not track.logged and track.is_stable(self.STABILIZATION_THRESHOLD):
+                        track.logged = True
+                        # A plate re-acquired as a new track shortly after being logged is not logged again
+                        if current_time - self.recently_seen_plates.get(plate_text, 0) >= self.PLATE_COOLDOWN_SECONDS:
                             self.recently_seen_plates[plate_text] = current_time  # Start cooldown
-                            del self.candidate_plates[plate_text] # Remove from candidates
-
-                        # Always draw the box for visual feedback
-                        label = f"{plate_text} ({conf:.2f})"
-                        cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                        cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                        
-                        # Store the detection with bounding box and confidence
-                        stabilized_plates_in_frame.append({
-                            "plate_text": plate_text,
-                            "confidence": conf,
-                            "box": [x1, y1, x2, y2]
-                        })
-                    else:
-                        # If OCR fails, still draw detection box if confidence is high enough
-                        label = f"No OCR ({conf:.2f})"
-                        cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 165, 255), 2) # Orange for no OCR
-                        cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
-                        
-                        # Store the detection even if OCR failed, but with N/A plate text
-                        stabilized_plates_in_frame.append({
-                            "plate_text": "N/A",
-                            "confidence": conf,
-                            "box": [x1, y1, x2, y2]
-                        })
-
-
-            # --- Prune stale candidates ---
-            stale_candidates = [
-                p for p, data in self.candidate_plates.items() 
-                if frame_count - data['last_seen_frame'] > self.CANDIDATE_PATIENCE_FRAMES
-            ]
-            for p in stale_candidates:
-                del self.candidate_plates[p]
+                            plate_detection["confidence"] = track.conf
+                            plates_to_log.append(plate_detection)
+                            tracks_to_log.append(track)
+                else:
+                    # Show the detection even if OCR failed, but with N/A plate text
+                    plates_in_frame.append({
+                        "plate_text": "N/A",
+                        "confidence": conf,
+                        "box": [x1, y1, x2, y2],
+                        "track_id": track.track_id,
+                    })
+
+            # --- Prune expired cooldowns (stale tracks are pruned by the tracker's update) ---
+            expired_plates = [p for p, seen_at in self.recently_seen_plates.items() if current_time - seen_at >= self.PLATE_COOLDOWN_SECONDS]
+            for p in expired_plates:
+                del self.recently_seen_plates[p]
 
             frame_end_time = time.perf_counter()
             processing_time_ms = (frame_end_time - frame_read_start_time) * 1000 # Total time from read to end
             # logger.debug(f"Camera {self.camera_id} - Frame {frame_count} total processing took {processing_time_ms:.2f} ms")
 
-            # --- Database Logging & Watchlist Check (Asynchronous) ---
-            if stabilized_plates_in_frame:
-                user_id = None 
-                db = self.db_session_factory()
+            # --- Watchlist Check & Database Logging (Asynchronous) ---
+            # The owner comes from the cached camera config, so this runs without touching the database
+            user_id = self.owner_id
+            if plates_to_log and user_id:
                 try:
-                    camera_obj = db.query(models.Camera).filter(models.Camera.id == self.camera_id).first()
-                    if camera_obj:
-                        user_id = camera_obj.owner_id
-
-                    if user_id:
-                        watchlist_entries = db.query(models.Watchlist).filter(models.Watchlist.owner_id == user_id).all()
-                        watchlist_plates = {entry.plate_text for entry in watchlist_entries}
-
-                        for plate_detection in stabilized_plates_in_frame:
-                            plate_text = plate_detection["plate_text"]
-                            # confidence = plate_detection["confidence"] # Confidence is now part of the detection dict
-
-                            if plate_text != "N/A" and plate_text in watchlist_plates:
-                                logger.warning(f"** WATCHLIST ALERT ** Plate '{plate_text}' detected on camera '{self.camera_id}' for user '{user_id}'.")
-                                matched_entry = next((entry for entry in watchlist_entries if entry.plate_text == plate_text), None)
-                                if matched_entry:
-                                    if matched_entry.notify_email:
-                                        print(f"Sending email alert for {plate_text} to user {user_id}")
-                                    if matched_entry.notify_sms:
-                                        print(f"Sending SMS alert for {plate_text} to user {user_id}")
-
-                        # Push all stabilized plates for this frame to the queue for batch logging
-                        if stabilized_plates_in_frame:
-                            self.plate_log_queue.put((stabilized_plates_in_frame, user_id))
-                            logger.info(f"Frame {frame_count}: Pushed {len(stabilized_plates_in_frame)} stabilized plates to queue for camera {self.camera_id}.")
+                    for plate_detection, track in zip(plates_to_log, tracks_to_log):
+                        plate_text = plate_detection["plate_text"]
+
+                        # Exact lookup first, then the fuzzy index to tolerate OCR confusions; no watchlist query per frame
+                        match = watchlist_index.match(user_id, plate_text, plate_detection.get("char_confidences"))
+                        matched_entry, match_score = match if match else (None, 0.0)
+                        plate_detection["is_watchlist_hit"] = matched_entry is not None
+                        if matched_entry:
+                            plate_detection["watchlist_plate_text"] = matched_entry["plate_text"]
+                            plate_detection["watchlist_match_score"] = round(match_score, 3)
+                            logger.warning(f"** WATCHLIST ALERT ** Plate '{plate_text}' matched watchlist plate '{matched_entry['plate_text']}' (score {match_score:.2f}) on camera '{self.camera_id}' for user '{user_id}'.")
+                            if matched_entry["notify_email"]:
+                                print(f"Sending email alert for {plate_text} to user {user_id}")
+                            if matched_entry["notify_sms"]:
+                                print(f"Sending SMS alert for {plate_text} to user {user_id}")
+                        # Keep the result on the track so the live view shows it for the rest of the vehicle's pass
+                        track.watchlist_match = {key: plate_detection[key] for key in ("is_watchlist_hit", "watchlist_plate_text", "watchlist_match_score") if key in plate_detection}
+
+                    # Push the newly stabilized plates to the queue for batch logging, with their evidence images cut out of
+                    # this frame; encoding and storing them happens on the logging and evidence writer threads
+                    evidence = prepare_evidence(frame, [plate_detection["box"] for plate_detection in plates_to_log])
+                    self.plate_log_queue.put((plates_to_log, user_id, evidence, captured_at))
+                    logger.info(f"Frame {frame_count}: Pushed {len(plates_to_log)} stabilized plates to queue for camera {self.camera_id}.")
                 except Exception as e:
-                    logger.error(f"Error in main loop's DB/Watchlist check for camera {self.camera_id}: {e}")
-                finally:
-                    db.close()
-
-            success, buffer = cv2.imencode('.jpg', annotated_frame)
+                    logger.error(f"Error in main loop's watchlist check for camera {self.camera_id}: {e}")
+
+            # Annotate and encode only the renditions a viewer or snapshot is waiting for; otherwise publish the detections alone
+            wanted_renditions = self.frame_ring.wanted_renditions() if self.frame_ring is not None else []
+            if wanted_renditions:
+                buffers, renditions = encode_renditions(annotate_frame(frame, plates_in_frame, roi), wanted_renditions)
+                self.frames_encoded += 1
+            else:
+                buffers, renditions = [], {}
+                self.encodes_avoided += 1
+            success = bool(renditions) or not wanted_renditions
             if success:
-                # Update the shared data dictionary
-                self.shared_data[self.camera_id] = {
-                    "image": buffer.tobytes(),
-                    "plates": stabilized_plates_in_frame, # Now contains list of dicts with plate_text, confidence, box
+                frame_data = {
+                    "plates": plates_in_frame, # List of dicts with plate_text, confidence, box and track_id
                     "frame": frame_count,
                     "timestamp": datetime.utcnow(),
                     "status": "online", # Update status in shared data
                     "health": 100, # Placeholder, ideally calculated
-                    "latency": processing_time_ms # Report actual processing time as latency
+                    "latency": processing_time_ms, # Report actual processing time as latency
+                    "frame_age_ms": frame_age_ms, # Capture-to-pickup delay of this frame
+                    "frames_dropped": self.frame_grabber.frames_dropped, # Captured frames never processed
+                    "frames_captured": self.frame_grabber.frames_captured,
+                    "frame_skip": self.frame_skip,
+                    "rate_controller": self.rate_controller.get_stats(), # Why frame_skip is what it is: measured cost vs target rate and CPU budget
+                    "stream_fps": self.frame_grabber.stream_fps,
+                    "tracking": self.plate_tracker.get_stats(), # Active tracks and OCR calls skipped on settled tracks
+                    "ocr_cache": self.ocr_cache.get_stats(), # OCR calls answered from the crop-hash cache
+                    "motion_gate": self.motion_gate.get_stats(), # Frames that skipped detection because nothing moved
+                    "snapshots": self.snapshot_recorder.get_stats(), # Raw frames recorded for snapshot lookups
+                    "renditions": renditions, # {name: [offset, length]} of each JPEG in the slot; empty when it carries detections only
+                    "frames_encoded": self.frames_encoded,
+                    "encodes_avoided": self.encodes_avoided, # Frames not annotated and encoded because nobody was watching
+                    "frames_too_large": self.frame_ring.frames_too_large if self.frame_ring is not None else 0, # Encoded frames that did not fit a ring slot
                 }
+                # The encoded frame (if any) goes into the shared-memory ring without a bytes copy; shared_data only keeps metadata
+                seq = self.frame_ring.publish(buffers, frame_data) if self.frame_ring is not None else 0
+                if not seq and buffers:
+                    # Too large for a slot: still publish the detections and status so viewers see the stream is alive
+                    frame_data["frames_too_large"] = self.frame_ring.frames_too_large
+                    frame_data["renditions"] = {}
+                    seq = self.frame_ring.publish([], frame_data)
+                frame_data["seq"] = seq
+                self.shared_data[self.camera_id] = frame_data
+                if seq and self.on_frame:
+                    self.on_frame(seq)
 
         # --- Cleanup ---
-        cap.release()
+        self.detection_scheduler.unregister(self.camera_id)
+        self.ocr_scheduler.unregister(self.camera_id)
+        self.frame_grabber.stop()
+        self.frame_grabber.join(timeout=10)
+        self.snapshot_recorder.stop()
+        self.snapshot_recorder.join(timeout=10) # Before the owner closes the snapshot ring
         self._update_camera_status("offline")
         # Also update shared data to reflect offline status
         if self.camera_id in self.shared_data:
             self.shared_data[self.camera_id]["status"] = "offline"
-            self.shared_data[self.camera_id]["image"] = b'' # Clear image
             self.shared_data[self.camera_id]["plates"] = [] # Clear plates
+        if self.on_frame:
+            self.on_frame(0) # No new frame (seq 0), but wake viewers so they see the offline status
         logger.info(f"Stream processing for camera {self.camera_id} finished.")
 
+    def set_cpu_budget(self, cpu_budget: float):
+        self.rate_controller.configure(cpu_budget=cpu_budget)
+
     def stop(self):
         self.running = False
         logger.info(f"StreamWorker for camera {self.camera_id} stopping. Waiting for logging queue to empty...")
@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from processing.batch_scheduler import BatchScheduler
+
+TIMEOUT = 5
+
+
+class RecordingBatch:
+    """batch_fn that records each batch it is given and doubles every item."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        return [item * 2 for item in items]
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(batch_fn, max_batch_size=4, max_wait_ms=1000.0, start=True):
+        scheduler = BatchScheduler("test", batch_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        schedulers.append(scheduler)
+        if start:
+            scheduler.start()
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.stop()
+        if scheduler.is_alive():
+            scheduler.join(TIMEOUT)
+
+def test_batch_is_dispatched_once_every_registered_camera_submitted(make_scheduler):
+    batch_fn = RecordingBatch()
+    scheduler = make_scheduler(batch_fn, max_wait_ms=60_000) # Only the all-cameras rule can dispatch in time
+    scheduler.register(1)
+    scheduler.register(2)
+    first = scheduler.submit([1], key=1)
+    second = scheduler.submit([2], key=2)
+
+    assert first.result(TIMEOUT) == [2]
+    assert second.result(TIMEOUT) == [4]
+    assert batch_fn.batches == [[1, 2]]
+
+def test_oldest_request_is_dispatched_after_max_wait(make_scheduler):
+    batch_fn = RecordingBatch()
+    scheduler = make_scheduler(batch_fn, max_wait_ms=20)
+    scheduler.register(1)
+    scheduler.register(2) # Never submits
+    assert scheduler.submit([3], key=1).result(TIMEOUT) == [6]
+
+def test_batches_never_exceed_max_batch_size(make_scheduler):
+    batch_fn = RecordingBatch()
+    scheduler = make_scheduler(batch_fn, max_batch_size=2, start=False)
+    futures = [scheduler.submit([item], key=item) for item in range(5)]
+    scheduler.start()
+
+    assert [future.result(TIMEOUT) for future in futures] == [[0], [2], [4], [6], [8]]
+    assert all(len(batch) <= 2 for batch in batch_fn.batches)
+    assert scheduler.get_stats()["items_total"] == 5
+
+def test_newer_frame_from_the_same_camera_supersedes_the_pending_one(make_scheduler):
+    scheduler = make_scheduler(RecordingBatch(), start=False)
+    stale = scheduler.submit([1], key=1)
+    fresh = scheduler.submit([5], key=1)
+    scheduler.start()
+
+    assert fresh.result(TIMEOUT) == [10]
+    with pytest.raises(CancelledError):
+        stale.result(TIMEOUT)
+    assert scheduler.get_stats()["superseded_total"] == 1
+
+def test_batch_errors_reach_every_waiting_camera(make_scheduler):
+    def failing_batch(items):
+        raise ValueError("model crashed")
+
+    scheduler = make_scheduler(failing_batch, max_wait_ms=0)
+    with pytest.raises(ValueError):
+        scheduler.submit([1], key=1).result(TIMEOUT)
+
+def test_stopping_fails_pending_requests(make_scheduler):
+    release = threading.Event()
+
+    def blocking_batch(items):
+        release.wait(TIMEOUT)
+        return items
+
+    scheduler = make_scheduler(blocking_batch, max_wait_ms=0)
+    running = scheduler.submit([1], key=1)
+    while scheduler.get_stats()["pending_requests"]: # Wait until the first batch is running
+        time.sleep(0.001)
+    pending = scheduler.submit([2], key=2)
+    scheduler.stop()
+    release.set()
+
+    assert running.result(TIMEOUT) == [1]
+    with pytest.raises(RuntimeError):
+        pending.result(TIMEOUT)
+    assert isinstance(scheduler.submit([3]).exception(TIMEOUT), RuntimeError)
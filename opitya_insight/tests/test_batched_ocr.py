@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from processing.batch_scheduler import BatchScheduler
+from processing.inference_engine import InferenceEngine, _parse_ocr_output
+
+TIMEOUT = 5
+
+
+class FakeRecognizer:
+    """Stands in for LicensePlateRecognizer: reads each crop's first pixel as the index of its plate."""
+
+    def __init__(self, plates):
+        self.plates = plates
+        self.calls = []
+
+    def run(self, plate_crops, return_confidence=False):
+        self.calls.append(len(plate_crops))
+        plates = [self.plates[int(crop[0, 0, 0])] for crop in plate_crops]
+        char_probs = np.full((len(plate_crops), 10), 0.9, dtype=np.float32)
+        return plates, char_probs
+
+
+def make_crop(index):
+    return np.full((40, 120, 3), index, dtype=np.uint8)
+
+
+@pytest.fixture
+def engine():
+    engine = InferenceEngine()
+    engine.ocr_model = FakeRecognizer(["ABC1234", "", "XYZ987"])
+    return engine
+
+def test_all_crops_of_a_frame_are_read_in_one_call(engine):
+    results = engine.recognize_batch([make_crop(0), make_crop(1), make_crop(2)])
+
+    assert engine.ocr_model.calls == [3]
+    assert [text for text, _ in results] == ["ABC1234", None, "XYZ987"]
+
+def test_crops_from_several_cameras_share_one_call(engine):
+    scheduler = BatchScheduler("ocr", engine.recognize_batch, max_batch_size=32, max_wait_ms=60_000)
+    scheduler.register(1)
+    scheduler.register(2)
+    scheduler.start()
+    try:
+        first = scheduler.submit([make_crop(0), make_crop(1)], key=1)
+        second = scheduler.submit([make_crop(2)], key=2)
+
+        assert [text for text, _ in first.result(TIMEOUT)] == ["ABC1234", None]
+        assert [text for text, _ in second.result(TIMEOUT)] == ["XYZ987"]
+        assert engine.ocr_model.calls == [3]
+    finally:
+        scheduler.stop()
+        scheduler.join(TIMEOUT)
+
+def test_confidences_exclude_padding_slots():
+    plates = ["AB12", "ABC1234"]
+    char_probs = np.array([[0.9, 0.8, 0.7, 0.6, 0.1, 0.1, 0.1], [0.5] * 7], dtype=np.float32)
+
+    results = _parse_ocr_output((plates, char_probs))
+
+    assert results[0] == ("AB12", pytest.approx([0.9, 0.8, 0.7, 0.6]))
+    assert len(results[1][1]) == 7
+
+def test_prediction_objects_and_bare_strings_are_parsed():
+    class Prediction:
+        def __init__(self, plate, char_probs):
+            self.plate = plate
+            self.char_probs = char_probs
+
+    assert _parse_ocr_output([Prediction("AB12", [0.9] * 6), Prediction("", [0.1] * 6)]) == [
+        ("AB12", pytest.approx([0.9] * 4)),
+        (None, None),
+    ]
+    assert _parse_ocr_output(["AB12", ""]) == [("AB12", None), (None, None)]
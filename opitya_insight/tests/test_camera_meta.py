@@ -0,0 +1,33 @@
+import numpy as np
+
+from processing.camera_meta import meta_flag, meta_number, motion_region
+from processing.motion_gate import MotionGate
+from processing.roi import RegionOfInterest
+
+
+def test_malformed_numbers_fall_back_to_defaults():
+    assert meta_number({"detection_confidence": "high"}, "detection_confidence", 0.7, float, 0.0, 1.0) == 0.7
+    assert meta_number({"stabilization_threshold": "2.5"}, "stabilization_threshold", 3, int, 1) == 3
+    assert meta_number({}, "plate_cooldown_seconds", 15, float, 0.0) == 15
+
+def test_numbers_are_parsed_and_clamped():
+    assert meta_number({"value": "0.8"}, "value", 0.7, float, 0.0, 1.0) == 0.8
+    assert meta_number({"value": 1.5}, "value", 0.7, float, 0.0, 1.0) == 1.0
+    assert meta_number({"value": 0}, "value", 3, int, 1) == 1
+
+def test_flags_accept_strings():
+    assert meta_flag({"motion_gate": "false"}, "motion_gate", True) is False
+    assert meta_flag({"motion_gate": True}, "motion_gate", False) is True
+    assert meta_flag({}, "motion_gate", True) is True
+
+def test_polygon_motion_region_is_reduced_to_its_bounds():
+    region = motion_region({"motion_region": [[0.1, 0.2], [0.9, 0.3], [0.5, 0.8]]}, None)
+    assert region == [0.1, 0.2, 0.9, 0.8]
+    gate = MotionGate(region=region) # Must not trip over the region, as a polygon used to
+    assert gate.has_motion(np.zeros((90, 160, 3), np.uint8))
+
+def test_motion_region_defaults_to_the_roi_and_ignores_malformed_values():
+    roi = RegionOfInterest.from_meta([0.0, 0.5, 1.0, 1.0])
+    assert motion_region({}, roi) == [0.0, 0.5, 1.0, 1.0]
+    assert motion_region({"motion_region": []}, roi) == []
+    assert motion_region({"motion_region": "left half"}, roi) == []
@@ -0,0 +1,88 @@
+import gc
+
+import numpy as np
+import pytest
+
+from processing import frame_renderer
+from processing.frame_ring import FRAME_RING_SLOT_BYTES, FrameRing
+
+SLOT_BYTES = 4096
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(camera_id=0, slot_count=3, slot_bytes=SLOT_BYTES)
+    yield ring
+    gc.collect() # Drop packet views into the block before closing it
+    ring.unlink()
+
+def test_latest_frame_round_trips(ring):
+    assert ring.read_latest() is None
+
+    seq = ring.publish(b"jpeg-1", {"plates": ["ABC1234"]}, timestamp=10.0)
+    packet = ring.read_latest(copy=True)
+
+    assert seq == 1
+    assert (packet.seq, packet.timestamp, packet.image, packet.meta) == (1, 10.0, b"jpeg-1", {"plates": ["ABC1234"]})
+    assert ring.read_latest(min_seq=2) is None
+
+def test_attached_reader_sees_the_writers_frames(ring):
+    ring.publish(np.frombuffer(b"jpeg-1", dtype=np.uint8).reshape(-1, 1), {}, timestamp=1.0)
+    reader = FrameRing.attach(ring.name)
+    try:
+        assert reader.read_latest(copy=True).image == b"jpeg-1"
+    finally:
+        reader.close()
+
+def test_a_view_is_invalidated_once_the_writer_laps_it(ring):
+    ring.publish(b"first", {}, timestamp=1.0)
+    packet = ring.read_latest()
+    assert bytes(packet.image) == b"first"
+    assert packet.is_valid()
+
+    for index in range(ring.slot_count):
+        ring.publish(b"later", {}, timestamp=2.0 + index)
+
+    assert not packet.is_valid()
+    del packet
+
+def test_renditions_are_sliced_from_one_slot(ring):
+    ring.publish([b"thumb", b"full-size"], {"renditions": {"thumb": [0, 5], "full": [5, 9]}}, timestamp=1.0)
+    packet = ring.read_latest(copy=True)
+
+    assert packet.rendition("thumb") == b"thumb"
+    assert packet.rendition("full") == b"full-size"
+    assert packet.rendition("medium") is None
+
+def test_nearest_frame_is_found_by_timestamp(ring):
+    for timestamp in (10.0, 11.0, 12.0, 13.0): # The first frame is lapped out
+        ring.publish(str(timestamp).encode(), {}, timestamp=timestamp)
+
+    assert ring.recorded_range() == (11.0, 13.0)
+    assert ring.read_nearest(11.4).image == b"11.0"
+    assert ring.read_nearest(12.6).image == b"13.0"
+    assert ring.read_nearest(0.0).image == b"11.0"
+
+def test_frames_that_do_not_fit_are_dropped_and_counted(ring):
+    ring.publish(b"small", {}, timestamp=1.0)
+
+    assert ring.publish(b"x" * SLOT_BYTES, {}, timestamp=2.0) == 0
+    assert ring.frames_too_large == 1
+    assert ring.read_latest(copy=True).image == b"small"
+
+def test_viewers_select_the_wanted_renditions(ring):
+    assert ring.wanted_renditions() == []
+
+    ring.set_viewers({"thumb": 3, "full": 1, "medium": -1})
+
+    assert ring.viewers == {"thumb": 3, "medium": 0, "full": 1}
+    assert ring.wanted_renditions() == ["thumb", "full"]
+
+def test_slots_are_sized_for_every_rendition(monkeypatch):
+    slot_bytes = frame_renderer.frame_slot_bytes()
+    rendition_bytes = sum(rung["max_width"] ** 2 * 3 // 4 * frame_renderer.JPEG_BYTES_PER_PIXEL
+                          for rung in frame_renderer.RENDITION_LADDER.values())
+    assert slot_bytes >= rendition_bytes + frame_renderer.FRAME_META_BYTES
+
+    monkeypatch.setitem(frame_renderer.RENDITION_LADDER, "full", {"max_width": None, "quality": 90})
+    assert frame_renderer.frame_slot_bytes() == FRAME_RING_SLOT_BYTES
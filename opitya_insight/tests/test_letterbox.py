@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from processing.letterbox import LETTERBOX_PAD_VALUE, LetterboxBuffer, normalize_imgsz
+
+
+@pytest.mark.parametrize(("requested", "expected"), [
+    (640, 640),
+    (500, 512), # Rounded to the 32 px stride
+    ("416", 416),
+    (100, 320), # Clamped to the supported range
+    (4096, 640),
+    (None, 480), # Unparseable: the default
+    ("large", 480),
+])
+def test_normalize_imgsz(requested, expected):
+    assert normalize_imgsz(requested, 480) == expected
+
+def test_frame_is_scaled_and_padded_into_the_batch():
+    letterbox = LetterboxBuffer(320)
+    frame = np.zeros((180, 320, 3), dtype=np.uint8)
+    frame[:, :, 2] = 255 # Pure red in BGR
+
+    batch, transforms = letterbox.prepare([frame])
+
+    assert batch.shape == (1, 3, 320, 320)
+    assert batch.dtype == np.float32
+    assert transforms == [(1.0, 0, 70)]
+    assert batch[0, :, 160, 160].tolist() == [1.0, 0.0, 0.0] # Converted to RGB, scaled to 0..1
+    assert batch[0, 0, 0, 0] == pytest.approx(LETTERBOX_PAD_VALUE / 255)
+
+def test_buffers_are_reused_across_calls():
+    letterbox = LetterboxBuffer(320)
+    frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(3)]
+
+    first, _ = letterbox.prepare(frames)
+    second, _ = letterbox.prepare(frames[:2])
+
+    assert second.shape[0] == 2
+    assert np.shares_memory(first, second)
+    assert len(letterbox._resized) == 1
+
+def test_boxes_map_back_to_frame_coordinates():
+    letterbox = LetterboxBuffer(640)
+    frame_shape = (720, 1280, 3)
+    _, transforms = letterbox.prepare([np.zeros(frame_shape, dtype=np.uint8)])
+    scale, pad_x, pad_y = transforms[0]
+    # A box at (100, 200)-(300, 260) in the frame, as the detector would see it
+    boxes = np.array([[100 * scale + pad_x, 200 * scale + pad_y, 300 * scale + pad_x, 260 * scale + pad_y, 0.9],
+                      [-5.0, -5.0, 700.0, 700.0, 0.5]], dtype=np.float32)
+
+    mapped = LetterboxBuffer.to_frame_coordinates(boxes, transforms[0], frame_shape)
+
+    assert mapped[0, :4] == pytest.approx([100, 200, 300, 260], abs=0.01)
+    assert mapped[0, 4] == pytest.approx(0.9)
+    assert mapped[1, :4].tolist() == [0, 0, 1280, 720] # Clipped to the frame
+    assert len(LetterboxBuffer.to_frame_coordinates(np.empty((0, 5), dtype=np.float32), transforms[0], frame_shape)) == 0
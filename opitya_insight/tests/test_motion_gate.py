@@ -0,0 +1,63 @@
+import numpy as np
+
+from processing.motion_gate import MOTION_HOLD_SECONDS, MotionGate
+
+HEIGHT, WIDTH = 240, 320
+
+
+def empty_frame():
+    return np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+def frame_with_car(x, y=100):
+    frame = empty_frame()
+    frame[y:y + 40, x:x + 80] = 255
+    return frame
+
+def test_static_scene_is_gated_after_the_hold():
+    gate = MotionGate(enabled=True, forced_check_seconds=60)
+    frame = empty_frame()
+
+    assert gate.should_detect(frame, 0.0) # Nothing to compare with yet
+    assert gate.should_detect(frame, MOTION_HOLD_SECONDS) # Still holding after the first frame
+    assert not gate.should_detect(frame, MOTION_HOLD_SECONDS + 0.1)
+    assert gate.get_stats()["frames_gated"] == 1
+
+def test_moving_vehicle_is_detected():
+    gate = MotionGate(enabled=True, forced_check_seconds=60)
+    gate.should_detect(empty_frame(), 0.0)
+    assert not gate.should_detect(empty_frame(), 10.0)
+
+    assert gate.should_detect(frame_with_car(40), 10.1)
+    assert gate.should_detect(frame_with_car(60), 10.2)
+
+def test_static_scene_is_still_checked_periodically():
+    gate = MotionGate(enabled=True, forced_check_seconds=5)
+    frame = empty_frame()
+    gate.should_detect(frame, 0.0)
+    gate.should_detect(frame, 1.0) # Last detection within the hold
+
+    assert not gate.should_detect(frame, 5.9)
+    assert gate.should_detect(frame, 6.0) # Forced check, 5 s after the last detection
+    assert not gate.should_detect(frame, 10.9)
+    assert gate.should_detect(frame, 11.0)
+
+def test_motion_outside_the_region_is_ignored():
+    gate = MotionGate(enabled=True, region=(0.5, 0.0, 1.0, 1.0), forced_check_seconds=60)
+    gate.should_detect(empty_frame(), 0.0)
+
+    assert not gate.should_detect(frame_with_car(20), 10.0) # Left half only
+    assert gate.should_detect(frame_with_car(200), 10.1)
+
+def test_region_change_resets_the_comparison():
+    gate = MotionGate(enabled=True, forced_check_seconds=60)
+    gate.should_detect(empty_frame(), 0.0)
+    gate.configure(region=[0.0, 0.5, 1.0, 1.0])
+
+    assert gate.region == (0.0, 0.5, 1.0, 1.0)
+    assert gate.has_motion(empty_frame())
+
+def test_disabled_gate_passes_every_frame():
+    gate = MotionGate(enabled=False)
+
+    assert all(gate.should_detect(empty_frame(), timestamp) for timestamp in range(10))
+    assert gate.get_stats()["frames_checked"] == 0
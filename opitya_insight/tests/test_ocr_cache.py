@@ -0,0 +1,58 @@
+import numpy as np
+
+from processing.ocr_cache import OCRResultCache, crop_signature
+
+BOX = (100, 100, 220, 140)
+RESULT = ("ABC1234", [0.95] * 7)
+
+
+def make_crop(seed):
+    return np.random.default_rng(seed).integers(0, 256, (40, 120, 3), dtype=np.uint8)
+
+def test_signature_tolerates_small_pixel_changes():
+    crop = make_crop(0)
+    noisy = np.clip(crop.astype(np.int16) + np.random.default_rng(1).integers(-2, 3, crop.shape), 0, 255).astype(np.uint8)
+
+    assert crop_signature(crop) == crop_signature(crop.copy())
+    assert (crop_signature(crop) ^ crop_signature(noisy)).bit_count() <= 4
+    assert (crop_signature(crop) ^ crop_signature(make_crop(2))).bit_count() > 4
+    assert crop_signature(crop[:, :, 0]) < 2 ** 64 # Grayscale crops are accepted too
+
+def test_same_crop_in_the_same_place_hits():
+    cache = OCRResultCache(ttl_seconds=5)
+    signature = crop_signature(make_crop(0))
+    cache.store(BOX, signature, RESULT, 0.0)
+
+    assert cache.lookup((102, 101, 222, 141), signature ^ 0b11, 1.0) == RESULT
+    assert cache.get_stats()["hits"] == 1
+
+def test_changed_crop_or_moved_box_misses():
+    cache = OCRResultCache(ttl_seconds=5, max_hamming=4)
+    signature = crop_signature(make_crop(0))
+    cache.store(BOX, signature, RESULT, 0.0)
+
+    assert cache.lookup(BOX, signature ^ 0b11111, 1.0) is None
+    assert cache.lookup((300, 100, 420, 140), signature, 1.0) is None
+    assert cache.get_stats()["misses"] == 2
+
+def test_entries_expire_after_the_ttl():
+    cache = OCRResultCache(ttl_seconds=5)
+    cache.store(BOX, 42, RESULT, 0.0)
+
+    assert cache.lookup(BOX, 42, 4.9) == RESULT
+    assert cache.lookup(BOX, 42, 5.0) is None
+    assert cache.get_stats()["entries"] == 0
+
+def test_failed_reads_are_not_cached():
+    cache = OCRResultCache()
+    cache.store(BOX, 42, (None, None), 0.0)
+
+    assert cache.lookup(BOX, 42, 0.1) is None
+
+def test_oldest_entry_is_evicted_when_full():
+    cache = OCRResultCache(max_entries=2)
+    for index in range(3):
+        cache.store((index * 200, 0, index * 200 + 120, 40), index, (f"PLATE{index}", None), 0.0)
+
+    assert cache.lookup((0, 0, 120, 40), 0, 0.1) is None
+    assert cache.lookup((400, 0, 520, 40), 2, 0.1) == ("PLATE2", None)
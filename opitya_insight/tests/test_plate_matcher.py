@@ -0,0 +1,42 @@
+import pytest
+
+from core.plate_matcher import FuzzyPlateIndex, weighted_edit_distance
+
+MAX_COST = 0.6 # WATCHLIST_FUZZY_MAX_COST default
+MIN_SCORE = 0.8 # WATCHLIST_FUZZY_MIN_SCORE default
+CONFIDENT = [0.99] * 7
+
+WATCHLIST = [
+    {"id": 1, "plate_text": "ABC1234"},
+    {"id": 2, "plate_text": "XYZ9876"},
+]
+
+
+def best_match(plate_text, char_confidences=None):
+    matches = FuzzyPlateIndex(WATCHLIST).search(plate_text, char_confidences, MAX_COST)
+    if matches and matches[0][1] >= MIN_SCORE:
+        return matches[0][0]["plate_text"]
+    return None
+
+@pytest.mark.parametrize("read, confidences", [
+    ("ABC1234", CONFIDENT), # Exact
+    ("A8C1234", CONFIDENT), # B/8 confusion
+    ("XYZ98T6", CONFIDENT), # 7/T confusion
+    ("A8C1Z34", CONFIDENT), # Two confusions
+    ("ABC1235", [0.99] * 6 + [0.4]), # The differing character was an unsure read
+])
+def test_confusions_and_unsure_characters_match(read, confidences):
+    assert best_match(read, confidences) is not None
+
+@pytest.mark.parametrize("read, confidences", [
+    ("ABC1235", CONFIDENT), # A confident substitution is a different plate
+    ("ABC1235", None),
+    ("ABC123", CONFIDENT), # Missing character
+    ("ABC12345", CONFIDENT), # Extra character
+    ("XBC1235", [0.4] * 7), # Two non-confusable differences, even when unsure
+])
+def test_confident_differences_do_not_match(read, confidences):
+    assert best_match(read, confidences) is None
+
+def test_confusable_substitution_is_cheaper_than_an_edit():
+    assert weighted_edit_distance("ABC1234", "A8C1234") < MAX_COST < weighted_edit_distance("ABC1235", "ABC1234")
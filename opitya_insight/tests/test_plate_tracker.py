@@ -0,0 +1,106 @@
+from processing.plate_tracker import TRACK_OCR_REFRESH_SECONDS, PlateTracker, box_iou
+
+BOX = (100, 100, 220, 140, 0.9)
+CONFIDENCES = [0.95] * 7
+
+
+def test_cache_hits_do_not_stabilize_a_track():
+    tracker = PlateTracker()
+    track = tracker.update([BOX], 0.0)[0]
+    track.add_read("ABC1234", CONFIDENCES, 0.0)
+    for frame in range(1, 20):
+        track = tracker.update([BOX], frame * 0.1)[0]
+        track.add_cached_read(frame * 0.1)
+
+    assert track.reads == 1
+    assert not track.is_stable(3)
+    assert track.plate_text == "ABC1234"
+    assert track.last_ocr_at == 19 * 0.1
+
+def test_independent_reads_stabilize_a_track():
+    tracker = PlateTracker()
+    for frame in range(3):
+        track = tracker.update([BOX], frame * 0.1)[0]
+        track.add_read("ABC1234", CONFIDENCES, frame * 0.1)
+
+    assert track.is_stable(3)
+    assert track.plate_text == "ABC1234"
+
+def test_only_recognizer_calls_count_as_ocr_runs():
+    tracker = PlateTracker()
+    track = tracker.update([BOX], 0.0)[0]
+    assert tracker.needs_ocr(track, 3, 0.0) # Deciding to read a crop is not a run yet; it may still hit the cache
+    assert tracker.get_stats()["ocr_runs"] == 0
+    tracker.count_ocr_runs(1)
+    assert tracker.get_stats()["ocr_runs"] == 1
+
+def test_settled_track_skips_ocr_until_refresh():
+    tracker = PlateTracker()
+    for frame in range(3):
+        track = tracker.update([BOX], frame * 0.1)[0]
+        track.add_read("ABC1234", CONFIDENCES, frame * 0.1)
+
+    assert not tracker.needs_ocr(track, 3, 0.5)
+    assert tracker.needs_ocr(track, 3, 0.2 + TRACK_OCR_REFRESH_SECONDS)
+    assert tracker.get_stats()["ocr_skipped"] == 1
+
+def test_stopped_plate_stabilizes_across_forced_checks():
+    # A stopped vehicle is only re-detected every MOTION_FORCED_CHECK_SECONDS; its track must survive the gaps
+    tracker = PlateTracker(max_age_seconds=2.0)
+    first_track = None
+    for timestamp in (0.0, 5.0, 10.0):
+        track = tracker.update([BOX], timestamp)[0]
+        first_track = first_track or track
+        track.add_read("ABC1234", CONFIDENCES, timestamp)
+
+    assert track is first_track
+    assert track.is_stable(3)
+
+def test_plate_that_left_is_pruned_on_the_next_detection_pass():
+    tracker = PlateTracker(max_age_seconds=2.0)
+    tracker.update([BOX], 0.0)
+    tracker.update([], 5.0)
+    assert not tracker.tracks
+
+def test_box_iou():
+    assert box_iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert box_iou((0, 0, 10, 10), (5, 0, 15, 10)) == 50 / 150
+    assert box_iou((0, 0, 10, 10), (20, 20, 30, 30)) == 0.0
+
+def test_overlapping_detection_continues_its_track():
+    tracker = PlateTracker()
+    first = tracker.update([BOX], 0.0)[0]
+    second = tracker.update([(110, 102, 230, 142, 0.8)], 0.1)[0]
+
+    assert second is first
+    assert second.box == (110, 102, 230, 142)
+    assert second.conf == 0.9 # Best confidence seen is kept
+    assert tracker.get_stats()["tracks_created"] == 1
+
+def test_fast_plate_is_matched_by_centroid_distance():
+    tracker = PlateTracker()
+    first = tracker.update([BOX], 0.0)[0]
+    # Moved by its full width: no overlap, but within TRACK_CENTROID_DISTANCE diagonals
+    assert tracker.update([(220, 100, 340, 140, 0.9)], 0.1)[0] is first
+    assert tracker.update([(1000, 600, 1120, 640, 0.9)], 0.2)[0] is not first
+
+def test_separate_plates_keep_separate_tracks():
+    tracker = PlateTracker()
+    left, right = tracker.update([BOX, (600, 100, 720, 140, 0.9)], 0.0)
+    # Same plates listed in the other order on the next frame
+    tracks = tracker.update([(605, 100, 725, 140, 0.9), (105, 100, 225, 140, 0.9)], 0.1)
+
+    assert tracks == [right, left]
+    assert left.track_id != right.track_id
+
+def test_confident_read_outvotes_blurry_ones():
+    track = PlateTracker().update([BOX], 0.0)[0]
+    track.add_read("ABC1234", [0.95] * 7, 0.0)
+    track.add_read("A8C1234", [0.3] * 7, 0.1)
+    track.add_read("A8C1234", [0.3] * 7, 0.2)
+    track.add_read(None, None, 0.3) # Empty reads do not vote
+
+    assert track.reads == 3
+    assert track.plate_text == "ABC1234"
+    assert track.char_confidences == [0.95] * 7
+    assert not track.is_stable(4)
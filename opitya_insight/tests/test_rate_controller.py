@@ -0,0 +1,54 @@
+import pytest
+
+from processing.rate_controller import AdaptiveRateController
+
+
+def test_skip_rises_one_step_at_a_time_when_processing_is_slow():
+    controller = AdaptiveRateController(target_fps=8, cpu_budget=1.0, initial_skip=3, smoothing=1.0)
+    # 500 ms per frame allows 2 fps, so a 30 fps stream needs a skip of 15
+    skips = [controller.update(500, stream_fps=30) for _ in range(15)]
+
+    assert skips[:3] == [4, 5, 6]
+    assert skips[-1] == 15
+    assert controller.achievable_fps == pytest.approx(2.0)
+
+def test_skip_falls_back_when_processing_speeds_up():
+    controller = AdaptiveRateController(target_fps=10, cpu_budget=1.0, initial_skip=12, smoothing=1.0)
+    for _ in range(20):
+        skip = controller.update(10, stream_fps=30)
+
+    assert skip == 3 # Capped by target_fps, not by the 100 fps the CPU would allow
+    assert controller.achievable_fps == 10
+
+def test_skip_stays_within_bounds():
+    controller = AdaptiveRateController(initial_skip=1, smoothing=1.0, max_skip=5)
+    for _ in range(20):
+        skip = controller.update(10_000, stream_fps=30)
+
+    assert skip == 5
+
+def test_skip_is_kept_until_the_stream_rate_is_known():
+    controller = AdaptiveRateController(initial_skip=3)
+
+    assert controller.update(500, stream_fps=0) == 3
+    assert controller.avg_processing_ms == 500
+
+def test_cpu_budget_scales_the_achievable_rate():
+    controller = AdaptiveRateController(target_fps=30, cpu_budget=1.0, smoothing=1.0)
+    controller.update(100, stream_fps=0)
+    assert controller.achievable_fps == pytest.approx(10)
+
+    controller.configure(cpu_budget=0.5)
+    assert controller.achievable_fps == pytest.approx(5)
+
+    controller.configure(target_fps=0, cpu_budget=-1) # Ignored
+    assert controller.cpu_budget == 0.5
+    assert controller.target_fps == 30
+
+def test_processing_time_is_smoothed():
+    controller = AdaptiveRateController(smoothing=0.5)
+    controller.update(100, stream_fps=0)
+    controller.update(200, stream_fps=0)
+
+    assert controller.get_stats()["avg_processing_ms"] == 150
+    assert AdaptiveRateController().get_stats()["avg_processing_ms"] is None
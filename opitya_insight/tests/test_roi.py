@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from processing.roi import RegionOfInterest
+
+
+def test_rectangle_is_parsed_and_clamped():
+    roi = RegionOfInterest.from_meta([0.25, -0.5, 1.5, 0.75])
+
+    assert not roi.is_polygon
+    assert roi.bounds == (0.25, 0.0, 1.0, 0.75)
+
+def test_polygon_is_parsed():
+    roi = RegionOfInterest.from_meta([[0.1, 0.2], [0.9, 0.2], [0.5, 0.8]])
+
+    assert roi.is_polygon
+    assert roi.bounds == (0.1, 0.2, 0.9, 0.8)
+
+@pytest.mark.parametrize("spec", [
+    None,
+    [],
+    [0.0, 0.0, 1.0, 1.0], # Whole frame
+    [0.5, 0.5, 0.5, 0.9], # Zero width
+    [[0.1, 0.1], [0.9, 0.9]], # Too few points
+    ["left", 0, 1, 1],
+    [[0.1, 0.1], [0.9], [0.5, 0.5]],
+])
+def test_missing_whole_frame_or_malformed_region_is_ignored(spec):
+    assert RegionOfInterest.from_meta(spec) is None
+
+def test_rectangle_crops_a_view_and_reports_its_offset():
+    frame = np.arange(100 * 200 * 3, dtype=np.uint32).astype(np.uint8).reshape(100, 200, 3)
+    roi = RegionOfInterest.from_meta([0.25, 0.5, 0.75, 1.0])
+
+    cropped, offset = roi.apply(frame)
+
+    assert offset == (50, 50)
+    assert cropped.shape == (50, 100, 3)
+    assert np.shares_memory(cropped, frame)
+    assert (cropped[0, 0] == frame[50, 50]).all()
+
+def test_polygon_blacks_out_pixels_outside_it():
+    frame = np.full((100, 100, 3), 255, dtype=np.uint8)
+    roi = RegionOfInterest.from_meta([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]]) # Upper-left triangle
+
+    cropped, offset = roi.apply(frame)
+
+    assert offset == (0, 0)
+    assert cropped[10, 10].tolist() == [255, 255, 255]
+    assert cropped[90, 90].tolist() == [0, 0, 0]
+    assert frame[90, 90].tolist() == [255, 255, 255] # The source frame is untouched
+
+def test_region_follows_resolution_changes():
+    roi = RegionOfInterest.from_meta([0.5, 0.5, 1.0, 1.0])
+
+    assert roi.apply(np.zeros((100, 200, 3), dtype=np.uint8))[1] == (100, 50)
+    assert roi.apply(np.zeros((720, 1280, 3), dtype=np.uint8))[1] == (640, 360)
@@ -0,0 +1,58 @@
+import threading
+from types import SimpleNamespace
+
+from core.watchlist_index import WatchlistIndex
+
+
+class FakeSession:
+    """Returns the given rows for any query; query_started/release let a test hold the index build."""
+
+    def __init__(self, rows, release=None):
+        self.rows = rows
+        self.release = release
+
+    def query(self, model):
+        return self
+
+    def filter(self, *conditions):
+        return self
+
+    def all(self):
+        if self.release is not None:
+            self.release.wait(5)
+        return self.rows
+
+    def first(self):
+        return None
+
+    def close(self):
+        pass
+
+
+def row(entry_id, plate_text):
+    return SimpleNamespace(id=entry_id, owner_id=1, plate_text=plate_text, description=None, notify_email=False, notify_sms=False)
+
+def wait_loaded(index, owner_id):
+    for thread in threading.enumerate():
+        if thread.name == f"watchlist-load-{owner_id}":
+            thread.join(5)
+    assert index.entries(owner_id) is not None
+
+def test_index_builds_in_the_background_and_matches_fuzzily():
+    index = WatchlistIndex(lambda: FakeSession([row(1, "ABC1234")]))
+    index.preload(1)
+    wait_loaded(index, 1)
+    assert index.match(1, "A8C1234", [0.99] * 7)[0]["id"] == 1
+    assert index.match(1, "ABC1235", [0.99] * 7) is None
+
+def test_changes_made_while_loading_are_applied():
+    release = threading.Event()
+    index = WatchlistIndex(lambda: FakeSession([row(1, "ABC1234"), row(2, "XYZ9876")], release))
+    index.preload(1)
+    assert index.entries(1) is None # Still loading; lookups do not wait for it
+    index.upsert({"id": 3, "owner_id": 1, "plate_text": "NEW0001"})
+    index.remove(1, "XYZ9876", 2)
+    release.set()
+    wait_loaded(index, 1)
+    assert set(index.entries(1)) == {"ABC1234", "NEW0001"}
+    assert index.match(1, "NEWO001")[0]["id"] == 3